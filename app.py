@@ -1,12 +1,17 @@
 import os
 import sys
 import re
+import json
+import queue
+import hashlib
 import sqlite3
 import shutil
-from datetime import datetime
+from datetime import datetime, timezone
+from functools import wraps
+from werkzeug.http import is_resource_modified
 from werkzeug.utils import secure_filename
 
-from flask import Flask, render_template, request, send_file, abort, jsonify, redirect, url_for
+from flask import Flask, Response, render_template, stream_template, request, send_file, send_from_directory, abort, jsonify, redirect, url_for, make_response
 
 # Importar todos os handlers
 from utils.db_handler import (
@@ -18,16 +23,55 @@ from utils.db_handler import (
     atualizar_bem,
     excluir_bem,
     criar_novo_bem,
-    buscar_bens_por_nome,
     contar_bens,  # Certifique-se que esta função existe!
-    obter_bens_paginados
+    iterar_bens,
+    obter_versao_escrita,
+    listar_bens,
+    listar_locais_bens,
+    sugerir_locais,
+    relatorio_leituras,
+    AGRUPAMENTOS_LEITURAS,
+    cache_bens
 )
 
-from utils.excel_importer import importar_excel_para_sqlite, verificar_estrutura_excel
+from utils.excel_importer import (importar_fontes, montar_fontes, verificar_estrutura_excel, listar_inconsistencias,
+                                  TIPOS_INCONSISTENCIA, EXTENSOES_IMPORTACAO)
+from utils.campanhas import (
+    listar_campanhas,
+    obter_campanha_ativa,
+    criar_campanha,
+    ativar_campanha,
+    arquivar_campanha
+)
 from utils.logger import logger
+from utils.eventos import difusor
+from utils.compressao import comprimir_resposta
+from utils.backup import AgendadorBackup
+from utils.busca import buscar_bens as buscar_bens_aproximado, cache_buscas
+from utils.offline import obter_snapshot, obter_alteracoes, aplicar_leituras
+from utils.filtro_numeros import filtro_numeros
+from utils.supressor_leituras import supressor_leituras
+from utils.snapshot import gerar_snapshot, formatos_disponiveis, TABELAS_SNAPSHOT
+from utils.conciliacao import (
+    conciliar_locais,
+    iterar_itens_conciliacao,
+    gerar_csv,
+    salvar_xlsx,
+    COLUNAS_RESUMO,
+    COLUNAS_ITENS,
+    CATEGORIAS as CATEGORIAS_CONCILIACAO
+)
+from utils.manutencao import AgendadorManutencao, obter_status_manutencao
 
 app = Flask(__name__)
 
+# Remove quebras de linha/indentação deixadas pelas tags {% %} no HTML gerado
+app.jinja_env.trim_blocks = True
+app.jinja_env.lstrip_blocks = True
+
+# Tamanho mínimo de cada parte enviada nas páginas renderizadas em fluxo
+TAMANHO_BLOCO_STREAM = 16 * 1024
+
 # ==============================
 # Filtros personalizados para Jinja2
 # ==============================
@@ -62,19 +106,166 @@ def caminho_relativo(pasta: str) -> str:
 # ▶️ Agora a FONTE é o BANCO (não mais Excel)
 DB_PATH = os.path.join(caminho_relativo("relatorios"), "controle_patrimonial.db")
 
+# Processos que leem as planilhas de uma importação com várias abas/arquivos em paralelo
+PROCESSOS_IMPORTACAO = int(os.environ.get('IMPORTACAO_PROCESSOS', os.cpu_count() or 1))
+
+# Processo em que os agendadores de fundo já foram iniciados
+_servicos_pid = None
+
+def iniciar_servicos():
+    """
+    Inicia os agendadores de fundo deste processo: backup online periódico (BACKUP_INTERVALO_HORAS=0
+    desativa) e manutenção do SQLite em horário ocioso (MANUTENCAO_AUTOMATICA=0 desativa).
+    Nunca na importação do módulo: com gunicorn --preload o master importa o app antes do fork
+    (as threads não passariam aos workers), e scripts/linha de comando que importam o app não
+    devem fazer backups nem manutenção. Cada worker chama no primeiro request; idempotente.
+    """
+    global _servicos_pid
+    if _servicos_pid == os.getpid():
+        return
+    _servicos_pid = os.getpid()
+
+    intervalo_backup = float(os.environ.get('BACKUP_INTERVALO_HORAS', '24'))
+    if intervalo_backup > 0:
+        AgendadorBackup(
+            DB_PATH,
+            intervalo_horas=intervalo_backup,
+            manter=int(os.environ.get('BACKUP_MANTER', '14')),
+            pasta=os.path.join(caminho_relativo("relatorios"), "backups")
+        ).iniciar()
+
+    # Manutenção do SQLite (optimize, incremental_vacuum limitado, checkpoint passivo) em horário ocioso
+    if os.environ.get('MANUTENCAO_AUTOMATICA', '1') != '0':
+        AgendadorManutencao(DB_PATH).iniciar()
+
+@app.before_request
+def _iniciar_servicos_do_processo():
+    if not app.testing:
+        iniciar_servicos()
+
+# ==============================
+# Cache HTTP (ETag / Last-Modified)
+# ==============================
+CACHE_ESTATICOS_SEGUNDOS = 365 * 24 * 3600
+
+def _calcular_versao_app() -> str:
+    """Impressão digital dos templates: um deploy novo invalida os ETags antigos"""
+    pasta = os.path.join(app.root_path, 'templates')
+    try:
+        mtimes = [os.path.getmtime(os.path.join(pasta, nome)) for nome in sorted(os.listdir(pasta))]
+    except OSError:
+        mtimes = []
+    return hashlib.sha1(repr(mtimes).encode()).hexdigest()[:8]
+
+_VERSAO_APP = _calcular_versao_app()
+_HASH_ESTATICOS = {}
+
+def resposta_condicional(view):
+    """
+    Responde 304 Not Modified enquanto a versão de escrita do banco não mudar.
+    O ETag combina a versão do banco, a versão da aplicação e a URL completa.
+    """
+    @wraps(view)
+    def wrapper(*args, **kwargs):
+        if request.method not in ('GET', 'HEAD') or not os.path.exists(DB_PATH):
+            return view(*args, **kwargs)
+
+        versao, atualizado_em = obter_versao_escrita(DB_PATH)
+        etag = hashlib.sha1(f"{_VERSAO_APP}:{versao}:{request.full_path}".encode()).hexdigest()[:20]
+        ultima_escrita = None
+        if atualizado_em:
+            ultima_escrita = datetime.strptime(atualizado_em, '%Y-%m-%d %H:%M:%S').replace(tzinfo=timezone.utc)
+
+        if not is_resource_modified(request.environ, etag=etag, last_modified=ultima_escrita):
+            resposta = make_response('', 304)
+        else:
+            resposta = make_response(view(*args, **kwargs))
+            if resposta.status_code != 200:
+                return resposta
+
+        resposta.set_etag(etag)
+        resposta.last_modified = ultima_escrita
+        # Pode ser guardada por navegador/proxy, mas sempre revalidada
+        resposta.cache_control.no_cache = True
+        return resposta
+
+    return wrapper
+
+@app.url_defaults
+def _versionar_estaticos(endpoint, values):
+    """Acrescenta ?v=<hash do conteúdo> às URLs de arquivos estáticos"""
+    if endpoint != 'static' or 'filename' not in values:
+        return
+    filename = values['filename']
+    caminho = os.path.join(app.static_folder, filename)
+    try:
+        mtime = os.path.getmtime(caminho)
+    except OSError:
+        return
+
+    chave = (filename, mtime)
+    if chave not in _HASH_ESTATICOS:
+        with open(caminho, 'rb') as arquivo:
+            _HASH_ESTATICOS[chave] = hashlib.sha1(arquivo.read()).hexdigest()[:10]
+    values['v'] = _HASH_ESTATICOS[chave]
+
+@app.after_request
+def _cache_estaticos(resposta):
+    """URLs versionadas de estáticos nunca mudam: cache longo e imutável"""
+    if request.endpoint == 'static' and request.args.get('v') and resposta.status_code in (200, 304):
+        resposta.cache_control.public = True
+        resposta.cache_control.max_age = CACHE_ESTATICOS_SEGUNDOS
+        resposta.cache_control.immutable = True
+        resposta.cache_control.no_cache = None
+    return resposta
+
+@app.after_request
+def _comprimir(resposta):
+    """Comprime HTML/JSON grandes (gzip, ou brotli se instalado)"""
+    return comprimir_resposta(resposta, request.headers.get('Accept-Encoding', ''))
+
+def _renderizar_em_fluxo(template: str, **contexto):
+    """
+    Renderiza o template em partes: o navegador começa a desenhar a página
+    antes de a tabela inteira ser gerada.
+    """
+    def agrupar(partes):
+        buffer, tamanho = [], 0
+        for parte in partes:
+            buffer.append(parte)
+            tamanho += len(parte)
+            if tamanho >= TAMANHO_BLOCO_STREAM:
+                yield ''.join(buffer)
+                buffer, tamanho = [], 0
+        if buffer:
+            yield ''.join(buffer)
+
+    return Response(agrupar(stream_template(template, **contexto)), mimetype='text/html')
+
 # ==============================
 # Funções auxiliares
 # ==============================
+# Última contagem calculada neste processo: (versão de escrita, contagens, campanha ativa)
+_cache_contagens = (None, None, None)
+
 def _carregar_dados_bancos():
     """Carrega contagens do banco de forma otimizada"""
+    global _cache_contagens
     try:
-        contagens = contar_bens(DB_PATH)
+        versao, _ = obter_versao_escrita(DB_PATH)
+        if _cache_contagens[0] == versao and versao:
+            contagens, campanha = _cache_contagens[1], _cache_contagens[2]
+        else:
+            contagens = contar_bens(DB_PATH)
+            campanha = obter_campanha_ativa(DB_PATH)
+            _cache_contagens = (versao, contagens, campanha)
         
         # Retornar apenas as contagens para a página principal
         return {
             'localizados_count': contagens['localizados'],
             'nao_localizados_count': contagens['nao_localizados'],
-            'total_count': contagens['total']
+            'total_count': contagens['total'],
+            'campanha_nome': campanha['nome'] if campanha else None
         }
     except Exception as e:
         logger.error(f"Erro ao carregar contagens do banco: {str(e)}")
@@ -83,6 +274,21 @@ def _carregar_dados_bancos():
 def _processar_bem(numero_bem: str, localizacao: str = None):
     """Processa a localização de um bem"""
     try:
+        # Disparo repetido do leitor (mesmo número e local há instantes): mesmo resultado, sem nova gravação
+        repetida = supressor_leituras.obter(numero_bem, localizacao)
+        if repetida is not None:
+            return repetida
+        localizacao_informada = localizacao
+
+        # Número certamente fora do cadastro (filtro em memória): responde sem consultar o banco
+        if not filtro_numeros.talvez_exista(DB_PATH, numero_bem):
+            return {
+                'mensagem': 'Bem não encontrado',
+                'bem_detalhes': None,
+                'localizacao_informada': localizacao,
+                'show_modal': True
+            }
+
         # Se localização NÃO foi informada → tenta completar a partir do próprio DB
         if not localizacao:
             localizacao = buscar_localizacao_existente(numero_bem, DB_PATH)
@@ -93,17 +299,23 @@ def _processar_bem(numero_bem: str, localizacao: str = None):
             # Marca como localizado (e atualiza localização se houver)
             mensagem = marcar_bem_localizado(numero_bem, DB_PATH, localizacao)
         else:
+            if not erro or erro == 'Bem não encontrado':
+                filtro_numeros.registrar_ausente(DB_PATH, numero_bem)
             mensagem = erro or 'Bem não encontrado.'
             
         # Buscar detalhes do bem para exibir no modal
         bem_detalhes = _buscar_detalhes_bem(numero_bem, localizacao)
         
-        return {
+        resultado = {
             'mensagem': mensagem,
             'bem_detalhes': bem_detalhes,
             'localizacao_informada': localizacao,
             'show_modal': True
         }
+        # Só leituras gravadas: falhas seguem para o banco na próxima tentativa
+        if encontrado and bem_detalhes and mensagem.startswith('✅'):
+            supressor_leituras.guardar(numero_bem, localizacao_informada, resultado)
+        return resultado
         
     except Exception as e:
         logger.error(f"Erro ao processar bem {numero_bem}: {str(e)}")
@@ -120,10 +332,10 @@ def _buscar_detalhes_bem(numero_bem: str, localizacao: str = None):
         bem = obter_bem_por_numero(DB_PATH, numero_bem)
         
         if bem:
-            # Usar a localização fornecida pelo usuário se disponível
+            # Grafia canônica gravada no dicionário de locais; a informada só se ainda não houver
             localizacao_final = (
-                localizacao or 
                 bem['localizacao'] or 
+                localizacao or 
                 'Não informada'
             )
             
@@ -144,10 +356,19 @@ def _buscar_detalhes_bem(numero_bem: str, localizacao: str = None):
         logger.error(f"Erro ao buscar detalhes do bem {numero_bem}: {str(e)}")
         return None
     
+def _validar_numero_bem(numero_bem: str):
+    """Valida o número digitado/lido; retorna a mensagem de erro ou None"""
+    if not numero_bem:
+        return 'Por favor, digite o número do bem.'
+    if not re.match(r'^[A-Za-z0-9-]+$', numero_bem):
+        return 'O número do bem deve conter apenas letras, números ou hífen.'
+    return None
+    
 # ==============================
 # Rotas Principais
 # ==============================
 @app.route('/', methods=['GET', 'POST'])
+@resposta_condicional
 def index():
     """Página inicial do sistema"""
     # Obter mensagem de sucesso se existir
@@ -165,14 +386,10 @@ def index():
         localizacao = request.form.get('localizacao', '').strip()
         
         # Validações
-        if not numero_bem:
+        erro = _validar_numero_bem(numero_bem)
+        if erro:
             return render_template('index.html', 
-                                 mensagem='Por favor, digite o número do bem.',
-                                 **_carregar_dados_bancos())
-        
-        if not re.match(r'^[A-Za-z0-9-]+$', numero_bem):
-            return render_template('index.html',
-                                 mensagem='O número do bem deve conter apenas letras, números ou hífen.',
+                                 mensagem=erro,
                                  **_carregar_dados_bancos())
         
         # Processar o bem
@@ -189,194 +406,488 @@ def index():
                          **_carregar_dados_bancos())
 
 @app.route('/visualizar/<tipo>')
+@resposta_condicional
 def visualizar(tipo: str):
-    """Página de visualização de bens com paginação"""
+    """Página de visualização de bens (tabela virtual alimentada por /api/bens)"""
+    titulos = {
+        'localizados': 'Bens Localizados',
+        'nao-localizados': 'Bens Não Localizados',
+        'todos': 'Todos os Bens'
+    }
+    titulo = titulos.get(tipo, 'Visualização')
+
     if not os.path.exists(DB_PATH):
         return render_template('visualizar.html', 
-                             titulo='Visualização', 
+                             titulo=titulo, 
                              tipo=tipo,
-                             paginacao={
-                                 'dados': [],
-                                 'pagina_atual': 1,
-                                 'por_pagina': 200,
-                                 'total_registros': 0,
-                                 'total_paginas': 0
-                             },
+                             total_registros=0,
                              mensagem="Banco de dados não encontrado.")
 
-    try:
-        # Obter parâmetros de paginação
-        pagina = request.args.get('pagina', 1, type=int)
-        por_pagina = request.args.get('por_pagina', 200, type=int)
-        
-        # Validar parâmetros
-        pagina = max(1, pagina)
-        por_pagina = max(50, min(por_pagina, 1000))
-        
-        # Obter dados paginados
-        paginacao = obter_bens_paginados(DB_PATH, tipo, pagina, por_pagina)
-        
-        # Definir título
-        if tipo == 'localizados':
-            titulo = 'Bens Localizados'
-        elif tipo == 'nao-localizados':
-            titulo = 'Bens Não Localizados'
-        else:
-            titulo = 'Visualização'
-            paginacao['dados'] = []
-        
-        return render_template('visualizar.html', 
+    if tipo not in titulos:
+        return render_template('visualizar.html',
                              titulo=titulo,
                              tipo=tipo,
-                             paginacao=paginacao)
-            
-    except Exception as e:
-        logger.error(f"Erro em /visualizar/{tipo}: {str(e)}")
-        return render_template('visualizar.html', 
-                             titulo='Erro',
-                             tipo=tipo,
-                             paginacao={
-                                 'dados': [],
-                                 'pagina_atual': 1,
-                                 'por_pagina': 200,
-                                 'total_registros': 0,
-                                 'total_paginas': 0
-                             },
-                             mensagem=f"Erro ao carregar dados: {str(e)}")
+                             total_registros=0,
+                             mensagem="Tipo de visualização inválido.")
+
+    contagens = _carregar_dados_bancos()
+    total_registros = {
+        'localizados': contagens['localizados_count'],
+        'nao-localizados': contagens['nao_localizados_count'],
+        'todos': contagens['total_count']
+    }[tipo]
+
+    return _renderizar_em_fluxo('visualizar.html', 
+                                titulo=titulo,
+                                tipo=tipo,
+                                total_registros=total_registros)
+
+@app.route('/api/bens')
+@resposta_condicional
+def api_listar_bens():
+    """API da tabela virtual: janela de bens com ordenação e filtros no servidor"""
+    if not os.path.exists(DB_PATH):
+        return jsonify({'success': False, 'message': 'Banco de dados não encontrado'}), 404
+
+    inicio = max(0, request.args.get('inicio', 0, type=int))
+    quantidade = max(1, min(request.args.get('quantidade', 200, type=int), 1000))
+
+    resultado = listar_bens(
+        DB_PATH,
+        tipo=request.args.get('tipo', 'todos'),
+        ordenar=request.args.get('ordenar', 'numero'),
+        direcao=request.args.get('direcao', 'asc'),
+        localizacao=request.args.get('localizacao', '').strip() or None,
+        situacao=request.args.get('situacao', '').strip() or None,
+        inicio=inicio,
+        quantidade=quantidade,
+        # O total só é necessário na primeira janela de cada consulta
+        contar=inicio == 0 or request.args.get('contar') == '1'
+    )
+    return jsonify({'success': True, **resultado})
+
+@app.route('/api/bens/locais')
+@resposta_condicional
+def api_locais_bens():
+    """API com as localizações distintas para o filtro da listagem"""
+    if not os.path.exists(DB_PATH):
+        return jsonify({'success': False, 'data': []}), 404
+    return jsonify({'success': True, 'data': listar_locais_bens(DB_PATH, request.args.get('tipo', 'todos'))})
+
+@app.route('/api/locais')
+@resposta_condicional
+def api_locais():
+    """Autocompletar de locais pelo prefixo digitado (?q=sala 1&limite=10)"""
+    if not os.path.exists(DB_PATH):
+        return jsonify({'success': False, 'data': []}), 404
+    limite = min(max(request.args.get('limite', 10, type=int), 1), 50)
+    return jsonify({'success': True, 'data': sugerir_locais(DB_PATH, request.args.get('q', ''), limite)})
+
+# Colunas das planilhas de /exportar (na ordem de sempre)
+COLUNAS_EXPORTACAO = ['nome', 'numero', 'situacao', 'localizacao']
 
 @app.route('/exportar/<tipo>')
 def exportar(tipo: str):
-    """Exporta relatórios para Excel - versão otimizada"""
+    """Exporta relatórios para Excel - gravação em fluxo, sem montar a lista de bens em memória"""
     if not os.path.exists(DB_PATH):
         abort(404, description="Banco de dados não encontrado.")
 
-    try:
-        # Usar a função paginada mas com limite muito alto para exportar tudo
-        resultado = obter_bens_paginados(DB_PATH, tipo, 1, 1000000)
-        
-        if tipo == 'localizados':
-            registros = resultado['dados']
-            nome_base = 'bens_localizados'
-        elif tipo == 'nao-localizados':
-            registros = resultado['dados']
-            nome_base = 'bens_nao_localizados'
-        else:
-            abort(400, description="Tipo inválido.")
-            
-    except Exception as e:
-        logger.error(f"Falha ao preparar dados para exportação: {str(e)}")
-        abort(500, description="Erro ao preparar dados para exportação.")
+    if tipo == 'localizados':
+        nome_base = 'bens_localizados'
+    elif tipo == 'nao-localizados':
+        nome_base = 'bens_nao_localizados'
+    else:
+        abort(400, description="Tipo inválido.")
 
     # Exportar para Excel
     try:
-        import pandas as pd
         ts = datetime.now().strftime("%Y%m%d-%H%M%S")
         out_dir = caminho_relativo("relatorios")
         os.makedirs(out_dir, exist_ok=True)
         out_path = os.path.join(out_dir, f"{nome_base}_{ts}.xlsx")
 
-        df = pd.DataFrame(registros)
-        if 'numero' in df.columns:
-            df = df.sort_values(by='numero')
-        df.to_excel(out_path, index=False)
+        # RegistroBem -> linha da planilha, um bem por vez
+        linhas = ((bem.nome, bem.numero, bem.situacao, bem.localizacao)
+                  for bem in iterar_bens(DB_PATH, tipo, ordenar='numero'))
+        total = salvar_xlsx(out_path, COLUNAS_EXPORTACAO, linhas, titulo='Sheet1')
         
-        logger.info(f"Relatório exportado: {out_path} ({len(registros)} registros)")
+        logger.info(f"Relatório exportado: {out_path} ({total} registros)")
         return send_file(out_path, as_attachment=True)
         
     except Exception as e:
         logger.error(f"Falha ao exportar Excel: {str(e)}")
         abort(500, description="Erro ao exportar Excel.")
 
+_ARQUIVO_SNAPSHOT = re.compile(r'^(?P<tabela>[a-z]+)(?:-v(?P<versao>\d+))?\.(?P<formato>parquet|csv\.gz)$')
+
+@app.route('/exportar/snapshot/<arquivo>')
+def exportar_snapshot(arquivo: str):
+    """
+    Snapshot colunar para ferramentas de análise: bens.parquet|bens.csv.gz e leituras.parquet|leituras.csv.gz.
+    A URL sem versão redireciona para a da versão atual (bens-v123.csv.gz), que nunca muda e pode ficar em cache.
+    """
+    partes = _ARQUIVO_SNAPSHOT.match(arquivo)
+    if not partes or partes['tabela'] not in TABELAS_SNAPSHOT:
+        abort(404, description="Use: " + ", ".join(f"{tabela}.{formato}" for tabela in TABELAS_SNAPSHOT
+                                                  for formato in ('parquet', 'csv.gz')))
+    if partes['formato'] not in formatos_disponiveis():
+        abort(404, description="Formato Parquet indisponível (instale pyarrow). Use .csv.gz")
+    if not os.path.exists(DB_PATH):
+        abort(404, description="Banco de dados não encontrado.")
+
+    pasta = os.path.join(caminho_relativo("relatorios"), "snapshots")
+    caminho = os.path.join(pasta, arquivo)
+    if not partes['versao'] or not os.path.exists(caminho):
+        try:
+            caminho, versao = gerar_snapshot(DB_PATH, partes['tabela'], partes['formato'], pasta)
+        except Exception as e:
+            logger.error(f"Falha ao gerar snapshot: {str(e)}")
+            abort(500, description="Erro ao gerar snapshot.")
+
+        if partes['versao'] != str(versao):
+            # Sem versão ou versão já descartada: aponta para o arquivo da versão atual
+            resposta = redirect(url_for('exportar_snapshot', arquivo=os.path.basename(caminho)))
+            resposta.cache_control.no_cache = True
+            return resposta
+
+    resposta = send_file(caminho, as_attachment=True, conditional=True,
+                         mimetype='application/vnd.apache.parquet' if partes['formato'] == 'parquet' else 'application/gzip')
+    resposta.cache_control.public = True
+    resposta.cache_control.max_age = CACHE_ESTATICOS_SEGUNDOS
+    resposta.cache_control.immutable = True
+    resposta.cache_control.no_cache = None
+    return resposta
+
 @app.route('/importar-excel', methods=['POST'])
 def importar_excel():
-    """Rota para importar dados do Excel para o SQLite"""
+    """Rota para importar dados do Excel (uma ou mais planilhas/abas, ou CSV/TSV) para o SQLite"""
+    temp_paths = []
     try:
         # Verificar se arquivo foi enviado
-        if 'excel_file' not in request.files:
+        arquivos = [arquivo for arquivo in request.files.getlist('excel_file') if arquivo.filename]
+        if not arquivos:
             return render_template('index.html', 
                                  mensagem='Nenhum arquivo selecionado',
                                  **_carregar_dados_bancos())
         
-        arquivo = request.files['excel_file']
-        
-        # Verificar se o arquivo tem nome
-        if arquivo.filename == '':
-            return render_template('index.html',
-                                 mensagem='Nenhum arquivo selecionado',
-                                 **_carregar_dados_bancos())
-        
         # Verificar extensão
-        if not arquivo.filename.lower().endswith(('.xlsx', '.xls')):
-            return render_template('index.html',
-                                 mensagem='Formato de arquivo inválido. Use .xlsx ou .xls',
-                                 **_carregar_dados_bancos())
+        for arquivo in arquivos:
+            if not arquivo.filename.lower().endswith(EXTENSOES_IMPORTACAO):
+                return render_template('index.html',
+                                     mensagem=f"Formato de arquivo inválido ({arquivo.filename}). Use {', '.join(EXTENSOES_IMPORTACAO)}",
+                                     **_carregar_dados_bancos())
         
-        # Salvar arquivo temporariamente
-        filename = secure_filename(arquivo.filename)
-        temp_path = os.path.join('temp', filename)
+        # Salvar arquivos temporariamente (prefixo evita colisão entre nomes iguais)
         os.makedirs('temp', exist_ok=True)
-        arquivo.save(temp_path)
+        for indice, arquivo in enumerate(arquivos):
+            temp_path = os.path.join('temp', f"{indice}_{secure_filename(arquivo.filename)}")
+            arquivo.save(temp_path)
+            temp_paths.append(temp_path)
         
-        # Obter parâmetros do formulário
+        # Obter parâmetros do formulário: abas separadas por vírgula ou '*' (todas)
         aba_nome = request.form.get('aba_nome', 'Estoque')
         criar_backup = request.form.get('backup') == 'on'
-        
-        # Primeiro verificar a estrutura
-        valido, mensagem_verificacao = verificar_estrutura_excel(temp_path, aba_nome)
-        
-        if not valido:
-            # Mostrar colunas disponíveis para ajudar o usuário
-            from utils.excel_importer import obter_colunas_excel
-            colunas_disponiveis = obter_colunas_excel(temp_path, aba_nome)
-            mensagem_erro = f"{mensagem_verificacao}. Colunas disponíveis: {', '.join(colunas_disponiveis)}"
-            
-            # Limpar arquivo temporário
-            try:
-                os.remove(temp_path)
-            except:
-                pass
-            
+        fontes = montar_fontes(temp_paths, aba_nome)
+        if not fontes:
             return render_template('index.html',
-                                 mensagem=mensagem_erro,
+                                 mensagem='Nenhuma aba encontrada nas planilhas enviadas',
                                  **_carregar_dados_bancos())
         
-        # Executar importação
-        sucesso, mensagem = importar_excel_para_sqlite(
-            temp_path, aba_nome, DB_PATH, criar_backup
-        )
+        # Primeiro verificar a estrutura de cada fonte
+        for temp_path, aba in fontes:
+            valido, mensagem_verificacao = verificar_estrutura_excel(temp_path, aba)
+            
+            if not valido:
+                # Mostrar colunas disponíveis para ajudar o usuário
+                from utils.excel_importer import obter_colunas_excel
+                colunas_disponiveis = obter_colunas_excel(temp_path, aba)
+                origem = os.path.basename(temp_path).split('_', 1)[1] + (f" (aba '{aba}')" if aba else '')
+                mensagem_erro = f"{origem}: {mensagem_verificacao}. Colunas disponíveis: {', '.join(colunas_disponiveis)}"
+                return render_template('index.html',
+                                     mensagem=mensagem_erro,
+                                     **_carregar_dados_bancos())
         
-        # Limpar arquivo temporário
-        try:
-            os.remove(temp_path)
-        except:
-            pass
+        # Executar importação (fontes lidas em paralelo, gravação única)
+        sucesso, mensagem, _ = importar_fontes(fontes, DB_PATH, criar_backup, processos=PROCESSOS_IMPORTACAO)
         
         # Recarregar dados do banco
         dados_banco = _carregar_dados_bancos()
+        total_inconsistencias = sum(listar_inconsistencias(DB_PATH, limite=0)['totais'].values()) if sucesso else 0
         
         return render_template('index.html',
                              mensagem=mensagem,
                              show_modal=False,
+                             total_inconsistencias=total_inconsistencias,
                              **dados_banco)
         
     except Exception as e:
         logger.error(f"Erro na rota de importação: {str(e)}")
-        
-        # Limpar arquivo temporário em caso de erro
-        try:
-            if 'temp_path' in locals():
-                os.remove(temp_path)
-        except:
-            pass
-        
         return render_template('index.html',
                              mensagem=f'Erro durante a importação: {str(e)}',
                              **_carregar_dados_bancos())
+    finally:
+        # Limpar arquivos temporários
+        for temp_path in temp_paths:
+            try:
+                os.remove(temp_path)
+            except OSError:
+                pass
+
+@app.route('/importacao/inconsistencias')
+@resposta_condicional
+def inconsistencias_importacao():
+    """Duplicados, variantes de número, números malformados e nomes semelhantes da última importação"""
+    tipo = request.args.get('tipo') or None
+    if tipo and tipo not in TIPOS_INCONSISTENCIA:
+        abort(400, description="Tipo inválido. Use: " + ", ".join(TIPOS_INCONSISTENCIA))
+    if not os.path.exists(DB_PATH):
+        abort(404, description="Banco de dados não encontrado.")
+
+    resultado = listar_inconsistencias(DB_PATH, tipo)
+    if request.args.get('formato') == 'json':
+        return jsonify({'success': True, **resultado})
+    return render_template('inconsistencias.html', tipos=TIPOS_INCONSISTENCIA, tipo=tipo, **resultado)
+
+@app.route('/api/leitura', methods=['POST'])
+def api_leitura():
+    """Registra a leitura de um bem e devolve apenas o resultado em JSON"""
+    if not os.path.exists(DB_PATH):
+        return jsonify({'success': False,
+                        'mensagem': 'Banco de dados não encontrado. Execute a migração do Excel para SQLite antes de usar o sistema.'}), 503
+
+    dados = request.get_json(silent=True) or request.form
+    numero_bem = (dados.get('numero_bem') or '').strip()
+    localizacao = (dados.get('localizacao') or '').strip()
+
+    erro = _validar_numero_bem(numero_bem)
+    if erro:
+        return jsonify({'success': False, 'mensagem': erro}), 400
+
+    resultado = _processar_bem(numero_bem, localizacao)
+    contagens = _carregar_dados_bancos()
+
+    return jsonify({
+        'success': resultado['bem_detalhes'] is not None,
+        'mensagem': resultado['mensagem'],
+        'bem': resultado['bem_detalhes'],
+        'localizacao_informada': resultado['localizacao_informada'],
+        'contadores': {
+            'total': contagens['total_count'],
+            'localizados': contagens['localizados_count'],
+            'nao_localizados': contagens['nao_localizados_count']
+        }
+    })
+
+# ==============================
+# Modo offline (service worker + fila local)
+# ==============================
+@app.route('/sw.js')
+def service_worker():
+    """Service worker servido na raiz da aplicação para controlar todas as páginas"""
+    resposta = send_from_directory(app.static_folder, 'sw.js', mimetype='application/javascript', max_age=0)
+    # Raiz da montagem (ex.: /estoque/ atrás do Apache), não a raiz do servidor
+    resposta.headers['Service-Worker-Allowed'] = url_for('index')
+    resposta.cache_control.no_cache = True
+    return resposta
+
+@app.route('/api/offline/snapshot')
+@resposta_condicional
+def api_offline_snapshot():
+    """Números, nomes e situação de todos os bens para validar leituras sem rede"""
+    if not os.path.exists(DB_PATH):
+        return jsonify({'success': False, 'bens': []}), 404
+    return jsonify({'success': True, **obter_snapshot(DB_PATH)})
+
+@app.route('/api/offline/alteracoes')
+@resposta_condicional
+def api_offline_alteracoes():
+    """Bens alterados desde a versão do cliente (?desde=N); completo=true pede novo snapshot"""
+    if not os.path.exists(DB_PATH):
+        return jsonify({'success': False}), 404
+    desde = request.args.get('desde', type=int)
+    if desde is None:
+        return jsonify({'success': False, 'message': 'Informe a versão em ?desde='}), 400
+    return jsonify({'success': True, **obter_alteracoes(DB_PATH, desde)})
+
+@app.route('/api/offline/leituras', methods=['POST'])
+def api_offline_leituras():
+    """Aplica em lote as leituras feitas sem rede (idempotente pelo id de cada leitura)"""
+    if not os.path.exists(DB_PATH):
+        return jsonify({'success': False, 'message': 'Banco de dados não encontrado'}), 503
+
+    dados = request.get_json(silent=True) or {}
+    leituras = dados.get('leituras')
+    if not isinstance(leituras, list) or not all(isinstance(leitura, dict) for leitura in leituras):
+        return jsonify({'success': False, 'message': 'Envie {"leituras": [...]}'}), 400
+
+    try:
+        resultado = aplicar_leituras(DB_PATH, leituras)
+    except ValueError as e:
+        return jsonify({'success': False, 'message': str(e)}), 413
+    except Exception as e:
+        logger.error(f"Erro ao aplicar leituras offline: {str(e)}")
+        return jsonify({'success': False, 'message': 'Erro ao aplicar leituras'}), 500
+
+    contagens = _carregar_dados_bancos()
+    return jsonify({
+        'success': True,
+        **resultado,
+        'contadores': {
+            'total': contagens['total_count'],
+            'localizados': contagens['localizados_count'],
+            'nao_localizados': contagens['nao_localizados_count']
+        }
+    })
+
+@app.route('/api/relatorios/leituras/<agrupamento>')
+@resposta_condicional
+def api_relatorio_leituras(agrupamento: str):
+    """Leituras agrupadas por hora, local ou campanha (lidas do resumo incremental)"""
+    if agrupamento not in AGRUPAMENTOS_LEITURAS:
+        abort(404, description="Agrupamento inválido. Use: " + ", ".join(AGRUPAMENTOS_LEITURAS))
+    if not os.path.exists(DB_PATH):
+        return jsonify({'success': False, 'data': []}), 404
+
+    dados = relatorio_leituras(
+        DB_PATH,
+        agrupar_por=agrupamento,
+        campanha_id=request.args.get('campanha', type=int),
+        desde=request.args.get('desde') or None,
+        ate=request.args.get('ate') or None
+    )
+    return jsonify({'success': True, 'agrupamento': agrupamento, 'data': dados})
+
+@app.route('/relatorios/conciliacao')
+@resposta_condicional
+def relatorio_conciliacao():
+    """
+    Conciliação por local (esperados x encontrados x em outro local x faltando).
+    ?formato=html|csv|xlsx; nas planilhas, ?detalhe=1 lista bem a bem (filtros: local, categoria).
+    """
+    formato = request.args.get('formato', 'html')
+    if formato not in ('html', 'csv', 'xlsx'):
+        abort(400, description="Formato inválido. Use: html, csv ou xlsx")
+    if not os.path.exists(DB_PATH):
+        abort(404, description="Banco de dados não encontrado.")
+
+    relatorio = conciliar_locais(DB_PATH)
+    if formato == 'html':
+        return render_template('conciliacao.html', relatorio=relatorio, categorias=CATEGORIAS_CONCILIACAO)
+
+    if request.args.get('detalhe') == '1':
+        categoria = request.args.get('categoria') or None
+        if categoria and categoria not in CATEGORIAS_CONCILIACAO:
+            abort(400, description="Categoria inválida. Use: " + ", ".join(CATEGORIAS_CONCILIACAO))
+        colunas, nome_base = COLUNAS_ITENS, 'conciliacao_itens'
+        linhas = iterar_itens_conciliacao(DB_PATH, request.args.get('local', type=int), categoria)
+    else:
+        colunas, nome_base = COLUNAS_RESUMO, 'conciliacao_locais'
+        linhas = relatorio['locais'] + [relatorio['totais']]
+
+    ts = datetime.now().strftime("%Y%m%d-%H%M%S")
+    if formato == 'csv':
+        resposta = Response(gerar_csv(colunas, linhas), mimetype='text/csv')
+        resposta.headers['Content-Disposition'] = f'attachment; filename="{nome_base}_{ts}.csv"'
+        return resposta
+
+    try:
+        out_dir = caminho_relativo("relatorios")
+        os.makedirs(out_dir, exist_ok=True)
+        out_path = os.path.join(out_dir, f"{nome_base}_{ts}.xlsx")
+        total = salvar_xlsx(out_path, colunas, linhas)
+        logger.info(f"Conciliação exportada: {out_path} ({total} linhas)")
+        return send_file(out_path, as_attachment=True)
+    except Exception as e:
+        logger.error(f"Falha ao exportar conciliação: {str(e)}")
+        abort(500, description="Erro ao exportar conciliação.")
+
+@app.route('/api/eventos')
+def api_eventos():
+    """Fluxo SSE com contadores e leituras recentes para o painel ao vivo"""
+    fila = difusor.assinar(DB_PATH)
+
+    def gerar():
+        try:
+            # Reconexão automática do EventSource após 5s
+            yield 'retry: 5000\n\n'
+            while True:
+                try:
+                    evento = fila.get(timeout=15)
+                except queue.Empty:
+                    # Comentário SSE para manter a conexão viva em proxies
+                    yield ': keep-alive\n\n'
+                    continue
+                yield f"event: {evento['tipo']}\ndata: {json.dumps(evento, ensure_ascii=False)}\n\n"
+        finally:
+            difusor.cancelar(fila)
+
+    return Response(gerar(), mimetype='text/event-stream', headers={
+        'Cache-Control': 'no-cache',
+        'X-Accel-Buffering': 'no'
+    })
+
+# ==============================
+# Campanhas de inventário
+# ==============================
+@app.route('/api/campanhas', methods=['GET', 'POST'])
+def api_campanhas():
+    """Lista as campanhas (GET) ou cria uma nova (POST com nome e ativar)"""
+    if not os.path.exists(DB_PATH):
+        return jsonify({'success': False, 'message': 'Banco de dados não encontrado'}), 404
+
+    if request.method == 'GET':
+        return jsonify({'success': True, 'data': listar_campanhas(DB_PATH)})
+
+    dados = request.get_json(silent=True) or request.form
+    ativar = str(dados.get('ativar', 'true')).lower() not in ('0', 'false', 'nao', 'não')
+    sucesso, mensagem = criar_campanha(DB_PATH, dados.get('nome'), ativar=ativar)
+    return jsonify({'success': sucesso, 'message': mensagem}), 200 if sucesso else 400
+
+@app.route('/api/campanhas/<int:campanha_id>/ativar', methods=['POST'])
+def api_ativar_campanha(campanha_id: int):
+    """Troca a campanha ativa"""
+    sucesso, mensagem = ativar_campanha(DB_PATH, campanha_id)
+    return jsonify({'success': sucesso, 'message': mensagem}), 200 if sucesso else 400
+
+@app.route('/api/campanhas/<int:campanha_id>/arquivar', methods=['POST'])
+def api_arquivar_campanha(campanha_id: int):
+    """Move uma campanha encerrada para um banco somente leitura"""
+    sucesso, mensagem = arquivar_campanha(DB_PATH, campanha_id)
+    return jsonify({'success': sucesso, 'message': mensagem}), 200 if sucesso else 400
+
+# ==============================
+# Manutenção do banco (administração)
+# ==============================
+@app.route('/api/manutencao')
+def api_manutencao():
+    """
+    Estado do banco e histórico de manutenção. A execução sob demanda é só pela linha de
+    comando (python -m utils.manutencao), no servidor: a API não tem autenticação
+    """
+    if not os.path.exists(DB_PATH):
+        return jsonify({'success': False, 'message': 'Banco de dados não encontrado'}), 404
+
+    return jsonify({'success': True, 'data': obter_status_manutencao(DB_PATH)})
+
+@app.route('/api/estatisticas/caches')
+def api_estatisticas_caches():
+    """Contadores dos caches em memória deste processo (cada worker tem os seus)"""
+    return jsonify({
+        'success': True,
+        'pid': os.getpid(),
+        'numeros_desconhecidos': filtro_numeros.estatisticas(),
+        'leituras_repetidas': supressor_leituras.estatisticas(),
+        'consultas': {
+            'bens': cache_bens.estatisticas(),
+            'buscas': cache_buscas.estatisticas()
+        }
+    })
 
 # ==============================
 # Rotas CRUD
 # ==============================
 @app.route('/api/bem/<numero_bem>')
+@resposta_condicional
 def api_obter_bem(numero_bem):
     """API para obter dados completos de um bem"""
     try:
@@ -453,16 +964,22 @@ def api_novo_bem():
         return jsonify({'success': False, 'message': str(e)})
 
 @app.route('/buscar')
+@resposta_condicional
 def buscar_bens():
     """Página de busca avançada"""
-    termo = request.args.get('q', '')
+    termo = request.args.get('q', '').strip()
+    pagina = request.args.get('pagina', 1, type=int)
     
-    resultados = buscar_bens_por_nome(DB_PATH, termo) if termo else []
+    busca = buscar_bens_aproximado(DB_PATH, termo, pagina=pagina)
     
-    return render_template('buscar.html', 
-                         resultados=resultados, 
-                         termo_busca=termo,
-                         total_resultados=len(resultados))
+    return _renderizar_em_fluxo('buscar.html', 
+                                resultados=busca['resultados'], 
+                                termo_busca=termo,
+                                total_resultados=busca['total'],
+                                resultados_limitados=busca['limitado'],
+                                sugestao=busca['sugestao'],
+                                pagina=busca['pagina'],
+                                total_paginas=busca['total_paginas'])
 
 @app.route('/novo-bem')
 def novo_bem():
@@ -211,7 +211,7 @@ cd /var/www/controle_estoque_db
 source venv/bin/activate
 export FLASK_APP=app.py
 export FLASK_ENV=production
-exec gunicorn --bind 127.0.0.1:5000 --workers 3 --timeout 120 wsgi:application
+exec gunicorn --bind 127.0.0.1:5000 --workers 3 --worker-class gthread --threads 16 --timeout 120 wsgi:application
 EOL
 
 chmod +x start_app.sh
@@ -274,6 +274,8 @@ cat > /etc/apache2/sites-available/controle-estoque.conf << EOL
     # Compressão
     <Location />
         SetOutputFilter DEFLATE
+        # Fluxo SSE do painel ao vivo: o DEFLATE seguraria os eventos no buffer
+        SetEnvIfNoCase Request_URI /api/eventos$ no-gzip dont-vary
     </Location>
 </VirtualHost>
 EOL
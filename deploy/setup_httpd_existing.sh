@@ -114,7 +114,8 @@ cat > $CONF_DIR/controle-estoque.conf << EOL
 # Usando servidor httpd existente
 
 # Configuração WSGI para aplicação em subdiretório
-WSGIDaemonProcess controle_estoque python-path=$APP_DIR python-home=$APP_DIR/venv
+# Cada painel aberto (/api/eventos, SSE) ocupa uma thread enquanto a página estiver aberta
+WSGIDaemonProcess controle_estoque python-path=$APP_DIR python-home=$APP_DIR/venv threads=25
 WSGIScriptAlias /estoque $APP_DIR/wsgi.py
 # Configuração de diretórios para aplicação em subdiretório
 <Directory $APP_DIR>
@@ -152,6 +153,8 @@ Alias /estoque/relatorios $APP_DIR/relatorios
     SetOutputFilter DEFLATE
     SetEnvIfNoCase Request_URI \.(?:gif|jpe?g|png)$ no-gzip dont-vary
     SetEnvIfNoCase Request_URI \.(?:exe|t?gz|zip|bz2|sit|rar)$ no-gzip dont-vary
+    # Fluxo SSE do painel ao vivo: o DEFLATE seguraria os eventos no buffer
+    SetEnvIfNoCase Request_URI /api/eventos$ no-gzip dont-vary
 </Location>
 
 # Cache para arquivos estáticos da aplicação
@@ -1,4 +1,4 @@
-from app import app
+from app import app, iniciar_servicos
 import webbrowser
 import threading
 
@@ -6,5 +6,6 @@ def abrir_navegador():
     webbrowser.open("http://127.0.0.1:5000")
 
 if __name__ == '__main__':
+    iniciar_servicos()
     threading.Timer(1.5, abrir_navegador).start()
     app.run()
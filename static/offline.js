@@ -0,0 +1,179 @@
+// Modo offline das leituras: snapshot dos bens e fila de leituras no IndexedDB,
+// sincronizados com /api/offline/* (alterações desde a versão N e envio em lote).
+(function () {
+  const NOME_BANCO = 'controle-patrimonial';
+  const LOTE_ENVIO = 500;
+  let urls = {};
+  let bancoPromessa = null;
+  let pronto = false;
+  let pendentes = 0;
+  let enviando = null;
+
+  function abrirBanco() {
+    if (!bancoPromessa) {
+      bancoPromessa = new Promise((resolve, reject) => {
+        const pedido = indexedDB.open(NOME_BANCO, 1);
+        pedido.onupgradeneeded = () => {
+          const banco = pedido.result;
+          banco.createObjectStore('bens', { keyPath: 'numero' });
+          banco.createObjectStore('fila', { keyPath: 'id' });
+          banco.createObjectStore('meta', { keyPath: 'chave' });
+        };
+        pedido.onsuccess = () => resolve(pedido.result);
+        pedido.onerror = () => reject(pedido.error);
+      });
+    }
+    return bancoPromessa;
+  }
+
+  function concluir(transacao) {
+    return new Promise((resolve, reject) => {
+      transacao.oncomplete = () => resolve();
+      transacao.onerror = transacao.onabort = () => reject(transacao.error);
+    });
+  }
+
+  function ler(pedido) {
+    return new Promise((resolve, reject) => {
+      pedido.onsuccess = () => resolve(pedido.result);
+      pedido.onerror = () => reject(pedido.error);
+    });
+  }
+
+  async function obterMeta(chave) {
+    const banco = await abrirBanco();
+    const registro = await ler(banco.transaction('meta').objectStore('meta').get(chave));
+    return registro ? registro.valor : undefined;
+  }
+
+  function paraObjeto(colunas, linha) {
+    const bem = {};
+    colunas.forEach((coluna, i) => { bem[coluna] = linha[i]; });
+    return bem;
+  }
+
+  async function aplicarSnapshot(dados) {
+    const banco = await abrirBanco();
+    const transacao = banco.transaction(['bens', 'meta'], 'readwrite');
+    const bens = transacao.objectStore('bens');
+    bens.clear();
+    dados.bens.forEach((linha) => bens.put(paraObjeto(dados.colunas, linha)));
+    transacao.objectStore('meta').put({ chave: 'versao', valor: dados.versao });
+    await concluir(transacao);
+  }
+
+  async function aplicarAlteracoes(dados) {
+    const banco = await abrirBanco();
+    const transacao = banco.transaction(['bens', 'meta'], 'readwrite');
+    const bens = transacao.objectStore('bens');
+    dados.alterados.forEach((linha) => bens.put(paraObjeto(dados.colunas, linha)));
+    dados.removidos.forEach((numero) => bens.delete(numero));
+    transacao.objectStore('meta').put({ chave: 'versao', valor: dados.versao });
+    await concluir(transacao);
+  }
+
+  async function buscarJSON(url) {
+    const resposta = await fetch(url, { cache: 'no-cache' });
+    if (!resposta.ok) throw new Error(`HTTP ${resposta.status}`);
+    return resposta.json();
+  }
+
+  // Atualiza o snapshot local: só as alterações desde a última versão, ou tudo se necessário
+  async function sincronizarBens() {
+    const versao = await obterMeta('versao');
+    if (versao !== undefined) {
+      const alteracoes = await buscarJSON(`${urls.alteracoes}?desde=${versao}`);
+      if (!alteracoes.completo) {
+        if (alteracoes.versao !== versao) await aplicarAlteracoes(alteracoes);
+        pronto = true;
+        return;
+      }
+    }
+    await aplicarSnapshot(await buscarJSON(urls.snapshot));
+    pronto = true;
+  }
+
+  async function contarFila() {
+    const banco = await abrirBanco();
+    pendentes = await ler(banco.transaction('fila').objectStore('fila').count());
+    return pendentes;
+  }
+
+  function novoId() {
+    if (window.crypto && crypto.randomUUID) return crypto.randomUUID();
+    return `${Date.now().toString(36)}-${Math.random().toString(36).slice(2, 12)}`;
+  }
+
+  // Valida a leitura contra o snapshot e a coloca na fila (sem esperar a rede)
+  async function registrar(numero, localizacao) {
+    const banco = await abrirBanco();
+    const transacao = banco.transaction(['bens', 'fila'], 'readwrite');
+    const bens = transacao.objectStore('bens');
+    const bem = await ler(bens.get(numero));
+    if (!bem) {
+      transacao.abort();
+      return { sucesso: false, mensagem: `❌ Bem ${numero} não encontrado (verificação offline)` };
+    }
+
+    bem.localizado = 1;
+    if (localizacao) bem.localizacao = localizacao;
+    bens.put(bem);
+    transacao.objectStore('fila').put({
+      id: novoId(), numero, localizacao: localizacao || '', lida_em: new Date().toISOString()
+    });
+    await concluir(transacao);
+    pendentes += 1;
+
+    return {
+      sucesso: true,
+      bem,
+      mensagem: `✅ Bem ${numero} marcado como localizado${localizacao ? ` em '${localizacao}'` : ''} (offline, aguardando envio)`
+    };
+  }
+
+  // Envia a fila em lotes; leituras aplicadas, repetidas ou rejeitadas saem da fila
+  function enviarFila() {
+    if (enviando) return enviando;
+    enviando = (async () => {
+      let ultimaResposta = null;
+      const rejeitadas = [];
+      const banco = await abrirBanco();
+      while (true) {
+        const lote = await ler(banco.transaction('fila').objectStore('fila').getAll(null, LOTE_ENVIO));
+        if (!lote.length) break;
+
+        const resposta = await fetch(urls.leituras, {
+          method: 'POST',
+          headers: { 'Content-Type': 'application/json' },
+          body: JSON.stringify({ leituras: lote })
+        });
+        if (!resposta.ok) throw new Error(`HTTP ${resposta.status}`);
+        ultimaResposta = await resposta.json();
+
+        const transacao = banco.transaction('fila', 'readwrite');
+        const fila = transacao.objectStore('fila');
+        ultimaResposta.aplicadas.concat(ultimaResposta.ignoradas).forEach((id) => fila.delete(id));
+        ultimaResposta.rejeitadas.forEach((item) => { fila.delete(item.id); rejeitadas.push(item); });
+        await concluir(transacao);
+        if (lote.length < LOTE_ENVIO) break;
+      }
+      await contarFila();
+      return ultimaResposta && Object.assign(ultimaResposta, { rejeitadas });
+    })().finally(() => { enviando = null; });
+    return enviando;
+  }
+
+  window.LeiturasOffline = {
+    disponivel: () => 'indexedDB' in window,
+    configurar: (novasUrls) => { urls = novasUrls; },
+    pronto: () => pronto,
+    pendentes: () => pendentes,
+    iniciar: async () => {
+      await contarFila();
+      pronto = (await obterMeta('versao')) !== undefined;
+    },
+    sincronizarBens,
+    registrar,
+    enviarFila
+  };
+})();
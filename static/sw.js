@@ -0,0 +1,60 @@
+// Service worker do modo offline: mantém a página de leitura e os arquivos estáticos em cache.
+// Os dados (snapshot de bens e fila de leituras) ficam no IndexedDB, geridos por static/offline.js.
+const CACHE = 'controle-patrimonial-v1';
+// Caminhos relativos ao escopo do registro: a aplicação pode estar montada em subdiretório (/estoque/)
+const PAGINA_INICIAL = new URL('./', self.registration.scope).pathname;
+const PREFIXO_ESTATICOS = new URL('static/', self.registration.scope).pathname;
+
+self.addEventListener('install', (evento) => {
+  evento.waitUntil(
+    caches.open(CACHE).then((cache) => cache.add(PAGINA_INICIAL)).then(() => self.skipWaiting())
+  );
+});
+
+self.addEventListener('activate', (evento) => {
+  evento.waitUntil(
+    caches.keys()
+      .then((nomes) => Promise.all(nomes.filter((nome) => nome !== CACHE).map((nome) => caches.delete(nome))))
+      .then(() => self.clients.claim())
+  );
+});
+
+function ehEstatico(url) {
+  // URLs versionadas (?v=hash) e CDNs não mudam: podem vir direto do cache
+  return (url.origin === self.location.origin && url.pathname.startsWith(PREFIXO_ESTATICOS))
+    || url.hostname === 'cdn.jsdelivr.net';
+}
+
+self.addEventListener('fetch', (evento) => {
+  const requisicao = evento.request;
+  if (requisicao.method !== 'GET') return;
+  const url = new URL(requisicao.url);
+
+  if (requisicao.mode === 'navigate' && url.pathname === PAGINA_INICIAL) {
+    // Rede primeiro (contadores atualizados); sem rede, a última versão guardada
+    evento.respondWith(
+      fetch(requisicao)
+        .then((resposta) => {
+          if (resposta.ok) {
+            const copia = resposta.clone();
+            caches.open(CACHE).then((cache) => cache.put(PAGINA_INICIAL, copia));
+          }
+          return resposta;
+        })
+        .catch(() => caches.match(PAGINA_INICIAL))
+    );
+    return;
+  }
+
+  if (ehEstatico(url)) {
+    evento.respondWith(
+      caches.match(requisicao).then((emCache) => emCache || fetch(requisicao).then((resposta) => {
+        if (resposta.ok || resposta.type === 'opaque') {
+          const copia = resposta.clone();
+          caches.open(CACHE).then((cache) => cache.put(requisicao, copia));
+        }
+        return resposta;
+      }))
+    );
+  }
+});
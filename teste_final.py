@@ -29,8 +29,9 @@ if os.path.exists(DB_PATH):
         # Testar a função gerar_planilhas_localizacao
         from utils.db_handler import gerar_planilhas_localizacao
         localizados, nao_localizados = gerar_planilhas_localizacao(DB_PATH)
+        localizados = list(localizados)
         print(f"Localizados: {len(localizados)}")
-        print(f"Não Localizados: {len(nao_localizados)}")
+        print(f"Não Localizados: {sum(1 for _ in nao_localizados)}")
         
         # Mostrar alguns localizados
         print("\nPrimeiros 3 localizados:")
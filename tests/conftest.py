@@ -0,0 +1,62 @@
+import os
+import sqlite3
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import app as aplicacao
+from utils.busca import cache_buscas
+from utils.db_handler import cache_bens, registrar_escrita
+from utils.excel_importer import importar_fontes
+from utils.supressor_leituras import supressor_leituras
+
+# Cadastro de teste: 20 bens, o primeiro já localizado
+BENS = [(f'1000{i:02d}', f'Mesa {i}', 'Sala 1', 'OK' if i == 0 else '') for i in range(20)]
+
+
+def escrever_csv(caminho, bens):
+    with open(caminho, 'w', encoding='utf-8') as arquivo:
+        arquivo.write('NÚMERO;DESCRIÇÃO;LOCALIZAÇÃO;SITUAÇÃO\n')
+        for bem in bens:
+            arquivo.write(';'.join(bem) + '\n')
+    return str(caminho)
+
+
+@pytest.fixture
+def banco(tmp_path):
+    """Banco temporário criado pela importação de um CSV"""
+    caminho = str(tmp_path / 'controle_patrimonial.db')
+    sucesso, mensagem, _ = importar_fontes([(escrever_csv(tmp_path / 'cadastro.csv', BENS), '')],
+                                           caminho, fazer_backup=False)
+    assert sucesso, mensagem
+    cache_bens.limpar()
+    cache_buscas.limpar()
+    supressor_leituras.descartar()
+    return caminho
+
+
+@pytest.fixture
+def cliente(banco, monkeypatch):
+    """Cliente de teste da aplicação apontando para o banco temporário (sem agendadores)"""
+    monkeypatch.setattr(aplicacao, 'DB_PATH', banco)
+    monkeypatch.setattr(aplicacao, '_cache_contagens', (None, None, None))
+    monkeypatch.setattr(aplicacao.app, 'testing', True)
+    return aplicacao.app.test_client()
+
+
+@pytest.fixture
+def outra_conexao(banco):
+    """Escreve como outro processo faria: sem passar por este processo nem limpar os seus caches"""
+    def escrever(sql, parametros=()):
+        conn = sqlite3.connect(banco, isolation_level=None)
+        try:
+            cursor = conn.cursor()
+            cursor.execute("BEGIN IMMEDIATE")
+            cursor.execute(sql, parametros)
+            registrar_escrita(cursor)
+            cursor.execute("COMMIT")
+        finally:
+            conn.close()
+    return escrever
@@ -0,0 +1,73 @@
+import threading
+from datetime import datetime
+
+import pytest
+
+from utils import backup as modulo
+from utils.backup import criar_backup, listar_backups, restaurar_backup
+from utils.db_handler import contar_bens, obter_bem_por_numero
+
+from conftest import BENS
+
+
+class _MesmoSegundo(datetime):
+    @classmethod
+    def now(cls, tz=None):
+        return cls(2026, 1, 2, 3, 4, 5)
+
+
+@pytest.fixture
+def pasta(tmp_path):
+    return str(tmp_path / 'backups')
+
+
+def test_backups_no_mesmo_segundo_nao_se_sobrescrevem(banco, pasta, monkeypatch):
+    monkeypatch.setattr(modulo, 'datetime', _MesmoSegundo)
+    criados = [criar_backup(banco, pasta) for _ in range(3)]
+    criados += [criar_backup(banco, pasta, comprimir=True) for _ in range(2)]
+
+    assert all(sucesso for sucesso, _ in criados)
+    caminhos = [caminho for _, caminho in criados]
+    assert len(set(caminhos)) == 5
+    assert sorted(item['caminho'] for item in listar_backups(pasta)) == sorted(caminhos)
+
+
+def test_backups_simultaneos(banco, pasta, monkeypatch):
+    monkeypatch.setattr(modulo, 'datetime', _MesmoSegundo)
+    resultados = []
+    tarefas = [threading.Thread(target=lambda: resultados.append(criar_backup(banco, pasta))) for _ in range(4)]
+    for tarefa in tarefas:
+        tarefa.start()
+    for tarefa in tarefas:
+        tarefa.join()
+    assert all(sucesso for sucesso, _ in resultados)
+    assert len({caminho for _, caminho in resultados}) == 4
+    assert len(listar_backups(pasta)) == 4
+
+
+def test_backup_com_escritas_em_andamento_termina(banco, pasta, outra_conexao):
+    parar = threading.Event()
+
+    def escrever():
+        while not parar.is_set():
+            outra_conexao("UPDATE bens SET nome = nome WHERE numero = '100001'")
+
+    escritor = threading.Thread(target=escrever)
+    escritor.start()
+    try:
+        sucesso, caminho = criar_backup(banco, pasta)
+    finally:
+        parar.set()
+        escritor.join()
+    assert sucesso, caminho
+
+
+def test_restauracao(banco, pasta, outra_conexao):
+    sucesso, caminho = criar_backup(banco, pasta, comprimir=True)
+    assert sucesso, caminho
+    outra_conexao("DELETE FROM bens WHERE numero = '100001'")
+
+    sucesso, mensagem = restaurar_backup(caminho, banco, pasta)
+    assert sucesso, mensagem
+    assert obter_bem_por_numero(banco, '100001')['nome'] == 'Mesa 1'
+    assert contar_bens(banco)['total'] == len(BENS)
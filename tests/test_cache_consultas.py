@@ -0,0 +1,59 @@
+from utils.busca import buscar_bens
+from utils.cache_consultas import CacheConsultas
+from utils.db_handler import cache_bens, obter_bem_por_numero
+
+
+def test_lru_descarta_o_menos_usado():
+    cache = CacheConsultas('teste', max_entradas=2)
+    cache.guardar('a', 1, 'A')
+    cache.guardar('b', 1, 'B')
+    assert cache.obter('a', lambda marca: True) == (True, 'A')
+    cache.guardar('c', 1, 'C')
+    assert cache.obter('b', lambda marca: True) == (False, None)
+    assert cache.obter('a', lambda marca: True) == (True, 'A')
+    assert cache.estatisticas()['descartes'] == 1
+
+
+def test_marca_vencida_e_descartada():
+    cache = CacheConsultas('teste')
+    cache.guardar('a', 1, 'A')
+    assert cache.obter('a', lambda marca: marca >= 2) == (False, None)
+    assert cache.estatisticas()['obsoletas'] == 1
+    assert cache.estatisticas()['entradas'] == 0
+
+
+def test_bem_nao_fica_obsoleto_apos_escrita_de_outra_conexao(banco, outra_conexao):
+    assert obter_bem_por_numero(banco, '100005')['nome'] == 'Mesa 5'
+    assert obter_bem_por_numero(banco, '100005')['nome'] == 'Mesa 5'
+    assert cache_bens.estatisticas()['acertos'] >= 1
+
+    outra_conexao("UPDATE bens SET nome = 'Cadeira 5' WHERE numero = ?", ('100005',))
+    assert obter_bem_por_numero(banco, '100005')['nome'] == 'Cadeira 5'
+
+
+def test_escrita_em_outro_bem_mantem_o_cache(banco, outra_conexao):
+    obter_bem_por_numero(banco, '100005')
+    outra_conexao("UPDATE bens SET nome = 'Cadeira 6' WHERE numero = ?", ('100006',))
+
+    acertos = cache_bens.estatisticas()['acertos']
+    assert obter_bem_por_numero(banco, '100005')['nome'] == 'Mesa 5'
+    assert cache_bens.estatisticas()['acertos'] == acertos + 1
+
+
+def test_bem_inexistente_cadastrado_em_outra_conexao(banco, outra_conexao):
+    assert obter_bem_por_numero(banco, '999999') is None
+    outra_conexao("INSERT INTO bens (numero, nome, situacao) VALUES ('999999', 'Armário', 'Pendente')")
+    assert obter_bem_por_numero(banco, '999999')['nome'] == 'Armário'
+
+
+def test_alterar_o_resultado_devolvido_nao_altera_o_cache(banco):
+    bem = obter_bem_por_numero(banco, '100005')
+    bem['nome'] = 'alterado'
+    assert obter_bem_por_numero(banco, '100005')['nome'] == 'Mesa 5'
+
+
+def test_busca_ve_escrita_de_outra_conexao(banco, outra_conexao):
+    assert buscar_bens(banco, 'Armario')['total'] == 0
+    outra_conexao("UPDATE bens SET nome = 'Armario 7' WHERE numero = ?", ('100007',))
+    numeros = [bem['numero'] for bem in buscar_bens(banco, 'Armario')['resultados']]
+    assert numeros == ['100007']
@@ -0,0 +1,88 @@
+import os
+import sqlite3
+import stat
+
+import pytest
+
+from utils import campanhas as modulo
+from utils.campanhas import abrir_arquivo_campanha, arquivar_campanha, criar_campanha, obter_campanha_ativa
+
+
+@pytest.fixture
+def campanha_encerrada(cliente, banco):
+    """Campanha com duas leituras, já substituída por uma nova campanha ativa"""
+    campanha_id = obter_campanha_ativa(banco)['id']
+    for numero in ('100001', '100002'):
+        cliente.post('/api/leitura', json={'numero_bem': numero, 'localizacao': 'Sala 2'})
+    sucesso, mensagem = criar_campanha(banco, 'Inventário seguinte')
+    assert sucesso, mensagem
+    return campanha_id
+
+
+@pytest.fixture
+def pasta(tmp_path):
+    caminho = tmp_path / 'campanhas'
+    caminho.mkdir()
+    return caminho
+
+
+def linhas_no_principal(banco, campanha_id):
+    with sqlite3.connect(banco) as conn:
+        return {tabela: conn.execute(f"SELECT COUNT(*) FROM {tabela} WHERE campanha_id = ?", (campanha_id,)).fetchone()[0]
+                for tabela in ('estado_campanha', 'leituras', 'leituras_resumo')}
+
+
+def test_arquivamento_move_a_campanha_para_o_arquivo(banco, campanha_encerrada, pasta):
+    antes = linhas_no_principal(banco, campanha_encerrada)
+    assert antes['leituras'] == 2
+
+    sucesso, mensagem = arquivar_campanha(banco, campanha_encerrada, str(pasta))
+    assert sucesso, mensagem
+    assert set(linhas_no_principal(banco, campanha_encerrada).values()) == {0}
+
+    caminho = pasta / f'campanha_{campanha_encerrada:03d}.db'
+    arquivo = abrir_arquivo_campanha(str(caminho))
+    try:
+        assert arquivo.execute("SELECT COUNT(*) FROM leituras").fetchone()[0] == 2
+        assert arquivo.execute("SELECT COUNT(*) FROM estado_campanha").fetchone()[0] == antes['estado_campanha']
+    finally:
+        arquivo.close()
+    assert stat.S_IMODE(os.stat(caminho).st_mode) == 0o444
+    assert not (pasta / f'campanha_{campanha_encerrada:03d}.db.tmp').exists()
+
+
+def test_falha_no_banco_principal_mantem_tudo(banco, campanha_encerrada, pasta, monkeypatch):
+    antes = linhas_no_principal(banco, campanha_encerrada)
+
+    def falhar(cursor):
+        raise sqlite3.OperationalError("disco cheio")
+    monkeypatch.setattr(modulo, 'registrar_escrita', falhar)
+    sucesso, _ = arquivar_campanha(banco, campanha_encerrada, str(pasta))
+    assert not sucesso
+    assert linhas_no_principal(banco, campanha_encerrada) == antes
+    assert os.listdir(pasta) == []
+
+    monkeypatch.undo()
+    sucesso, mensagem = arquivar_campanha(banco, campanha_encerrada, str(pasta))
+    assert sucesso, mensagem
+
+
+def test_arquivo_de_tentativa_interrompida_e_refeito(banco, campanha_encerrada, pasta):
+    # Interrompido depois de gravar o arquivo e antes de limpar o banco principal
+    caminho = pasta / f'campanha_{campanha_encerrada:03d}.db'
+    caminho.write_bytes(b'incompleto')
+    os.chmod(caminho, 0o444)
+
+    sucesso, mensagem = arquivar_campanha(banco, campanha_encerrada, str(pasta))
+    assert sucesso, mensagem
+    arquivo = abrir_arquivo_campanha(str(caminho))
+    try:
+        assert arquivo.execute("SELECT COUNT(*) FROM leituras").fetchone()[0] == 2
+    finally:
+        arquivo.close()
+
+
+def test_campanha_ativa_nao_e_arquivada(banco, pasta):
+    sucesso, _ = arquivar_campanha(banco, obter_campanha_ativa(banco)['id'], str(pasta))
+    assert not sucesso
+    assert os.listdir(pasta) == []
@@ -0,0 +1,110 @@
+import atexit
+import sqlite3
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from utils.db_handler import obter_bem_por_numero, obter_versao_escrita
+from utils.escritor import EscritorAgrupado, escritor
+
+# Operação que segura o escritor até o teste liberar, para os pedidos seguintes se acumularem
+em_execucao = threading.Event()
+liberar = threading.Event()
+
+
+@escritor.operacao('teste_esperar')
+def _esperar(cursor):
+    em_execucao.set()
+    liberar.wait(10)
+
+
+def esperar_pendentes(instancia, quantidade):
+    limite = time.monotonic() + 10
+    while instancia._pendentes.qsize() < quantidade:
+        assert time.monotonic() < limite, "os pedidos não chegaram ao escritor"
+        time.sleep(0.01)
+
+
+@pytest.fixture
+def escritor_bloqueado(banco):
+    """Ocupa o escritor com um grupo até liberar.set(); devolve o futuro desse grupo"""
+    em_execucao.clear()
+    liberar.clear()
+    with ThreadPoolExecutor(1) as execucao:
+        bloqueio = execucao.submit(escritor.executar, banco, 'teste_esperar')
+        assert em_execucao.wait(10)
+        yield bloqueio
+        liberar.set()
+
+
+def test_pedidos_simultaneos_em_um_commit(banco, escritor_bloqueado):
+    numeros = [f'1000{i:02d}' for i in range(1, 11)]
+    versao, _ = obter_versao_escrita(banco)
+    with ThreadPoolExecutor(len(numeros)) as execucao:
+        futuros = [execucao.submit(escritor.executar, banco, 'marcar_bem_localizado', numero, 'Sala 5')
+                   for numero in numeros]
+        esperar_pendentes(escritor, len(numeros))
+        liberar.set()
+        escritor_bloqueado.result()
+        assert all(futuro.result() for futuro in futuros)
+
+    # Uma única versão nova: o grupo todo foi gravado em uma transação
+    assert obter_versao_escrita(banco)[0] == versao + 1
+    assert all(obter_bem_por_numero(banco, numero)['situacao'] == 'OK' for numero in numeros)
+
+
+def test_falha_desfaz_so_a_propria_operacao(banco, escritor_bloqueado):
+    novo = {'numero': 'NOVO-1', 'nome': 'Mesa', 'situacao': 'Pendente', 'localizacao': ''}
+    bem_id = obter_bem_por_numero(banco, '100002')['id']
+    with ThreadPoolExecutor(2) as execucao:
+        valido = execucao.submit(escritor.executar, banco, 'criar_novo_bem', novo)
+        # Grava o nome e só depois falha (sem situação/localização)
+        invalido = execucao.submit(escritor.executar, banco, 'atualizar_bem', bem_id, {'nome': 'Cadeira 2'})
+        esperar_pendentes(escritor, 2)
+        liberar.set()
+        escritor_bloqueado.result()
+
+        assert valido.result() is True
+        with pytest.raises(KeyError):
+            invalido.result()
+    assert obter_bem_por_numero(banco, 'NOVO-1')['nome'] == 'Mesa'
+    assert obter_bem_por_numero(banco, '100002')['nome'] == 'Mesa 2'
+
+
+def test_grupo_sem_alteracoes_nao_muda_a_versao(banco):
+    versao, _ = obter_versao_escrita(banco)
+    assert escritor.executar(banco, 'marcar_bem_localizado', 'INEXISTENTE', None) is False
+    assert obter_versao_escrita(banco)[0] == versao
+
+
+def test_operacao_desconhecida(banco):
+    with pytest.raises(ValueError):
+        escritor.executar(banco, 'nao_existe')
+
+
+def test_processos_entregam_ao_escritor_lider(banco, tmp_path):
+    caminho_socket = str(tmp_path / 'escritor.sock')
+    lider = EscritorAgrupado(caminho_socket=caminho_socket)
+    lider._operacoes = escritor._operacoes
+    # Sem operações registradas: só consegue gravar entregando ao líder
+    outro = EscritorAgrupado(caminho_socket=caminho_socket)
+    try:
+        lider._preparar()
+        outro._preparar()
+        assert lider._lider and not outro._lider
+
+        assert outro.executar(banco, 'marcar_bem_localizado', '100007', 'Sala 9') is True
+        assert obter_bem_por_numero(banco, '100007')['localizacao'] == 'Sala 9'
+
+        # A exceção da operação chega com o tipo original
+        conn = sqlite3.connect(banco)
+        conn.execute("CREATE TRIGGER teste_recusar BEFORE INSERT ON bens BEGIN SELECT RAISE(ABORT, 'recusado'); END")
+        conn.close()
+        novo = {'numero': 'NOVO-2', 'nome': 'Mesa', 'situacao': 'Pendente', 'localizacao': ''}
+        with pytest.raises(sqlite3.IntegrityError):
+            outro.executar(banco, 'criar_novo_bem', novo)
+    finally:
+        lider._encerrar_servidor()
+        atexit.unregister(lider._encerrar_servidor)
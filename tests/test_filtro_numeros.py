@@ -0,0 +1,81 @@
+import pytest
+
+from utils import filtro_numeros as modulo
+from utils.db_handler import criar_novo_bem, excluir_bem, obter_bem_por_numero
+from utils.filtro_numeros import FiltroNumeros, filtro_numeros
+
+
+@pytest.fixture
+def filtro(monkeypatch):
+    # Sem intervalo entre verificações: escritas de outras conexões são vistas na consulta seguinte
+    monkeypatch.setattr(modulo, 'INTERVALO_VERIFICACAO', 0.0)
+    return FiltroNumeros()
+
+
+def test_rejeita_numeros_fora_do_cadastro(banco, filtro):
+    assert filtro.talvez_exista(banco, '100003')
+    assert filtro.talvez_exista(banco, ' 100003 ')
+    rejeitados = sum(not filtro.talvez_exista(banco, f'X{i}') for i in range(200))
+    assert rejeitados >= 190
+    assert filtro.estatisticas()['reconstrucoes'] == 1
+
+
+def test_admite_numero_cadastrado_em_outra_conexao_depois_da_construcao(banco, filtro, outra_conexao):
+    assert not filtro.talvez_exista(banco, 'NOVO-1')
+    outra_conexao("INSERT INTO bens (numero, nome, situacao) VALUES ('NOVO-1', 'Mesa', 'Pendente')")
+    assert filtro.talvez_exista(banco, 'NOVO-1')
+    # Visto pelo registro de alterações, sem reconstruir o filtro
+    assert filtro.estatisticas()['reconstrucoes'] == 1
+
+
+def test_admite_numero_cadastrado_neste_processo(banco, monkeypatch):
+    monkeypatch.setattr(modulo, 'INTERVALO_VERIFICACAO', 3600.0)
+    assert not filtro_numeros.talvez_exista(banco, 'NOVO-2')
+    sucesso, _ = criar_novo_bem(banco, {'numero': 'NOVO-2', 'nome': 'Mesa', 'situacao': 'Pendente', 'localizacao': ''})
+    assert sucesso
+    assert filtro_numeros.talvez_exista(banco, 'NOVO-2')
+
+
+def test_cache_negativo_e_limpo_pelo_cadastro(banco, filtro, outra_conexao):
+    filtro.talvez_exista(banco, '100001')
+    filtro.registrar_ausente(banco, 'NOVO-3')
+    assert not filtro.talvez_exista(banco, 'NOVO-3')
+    assert filtro.estatisticas()['rejeitados_cache'] == 1
+
+    outra_conexao("INSERT INTO bens (numero, nome, situacao) VALUES ('NOVO-3', 'Mesa', 'Pendente')")
+    assert filtro.talvez_exista(banco, 'NOVO-3')
+
+
+def test_numero_excluido_passa_a_ser_rejeitado(banco, monkeypatch):
+    monkeypatch.setattr(modulo, 'INTERVALO_VERIFICACAO', 3600.0)
+    assert filtro_numeros.talvez_exista(banco, '100004')
+    sucesso, _ = excluir_bem(banco, obter_bem_por_numero(banco, '100004')['id'])
+    assert sucesso
+    assert not filtro_numeros.talvez_exista(banco, '100004')
+
+
+def test_leitura_de_numero_desconhecido_nao_consulta_o_banco(cliente):
+    antes = filtro_numeros.estatisticas()
+    resposta = cliente.post('/api/leitura', json={'numero_bem': 'ZZZ-999'}).get_json()
+    assert not resposta['success']
+    assert resposta['mensagem'] == 'Bem não encontrado'
+    depois = filtro_numeros.estatisticas()
+    rejeitados = lambda contadores: contadores['rejeitados_filtro'] + contadores['rejeitados_cache']
+    assert rejeitados(depois) == rejeitados(antes) + 1
+
+
+def test_maiusculas_e_minusculas_sao_numeros_diferentes(banco, filtro, outra_conexao):
+    outra_conexao("INSERT INTO bens (numero, nome, situacao) VALUES ('abc-1', 'Mesa', 'Pendente')")
+    assert filtro.talvez_exista(banco, 'abc-1')
+    assert not filtro.talvez_exista(banco, 'ABC-1')
+
+    # Ausência confirmada de ABC-1 não pode rejeitar o abc-1 cadastrado
+    filtro.registrar_ausente(banco, 'ABC-1')
+    assert not filtro.talvez_exista(banco, 'ABC-1')
+    assert filtro.talvez_exista(banco, 'abc-1')
+
+
+def test_leitura_de_numero_com_outra_caixa(cliente, outra_conexao):
+    outra_conexao("INSERT INTO bens (numero, nome, situacao) VALUES ('abc-1', 'Mesa', 'Pendente')")
+    assert not cliente.post('/api/leitura', json={'numero_bem': 'ABC-1'}).get_json()['success']
+    assert cliente.post('/api/leitura', json={'numero_bem': 'abc-1'}).get_json()['success']
@@ -0,0 +1,109 @@
+import io
+import sqlite3
+import threading
+
+from utils.db_handler import contar_bens, obter_bem_por_numero
+from utils.excel_importer import importar_fontes, listar_inconsistencias
+from utils.filtro_numeros import filtro_numeros
+
+from conftest import BENS, escrever_csv
+
+NOVOS = [('200001', 'Cadeira 1', 'Sala 4', ''), ('200002', 'Cadeira 2', 'Sala 4', 'OK'), ('100003', 'Mesa 3', 'Sala 1', '')]
+
+
+def importar(banco, caminho, bens):
+    return importar_fontes([(escrever_csv(caminho, bens), '')], banco, fazer_backup=False)
+
+
+def test_reimportacao_substitui_o_cadastro(banco, tmp_path):
+    sucesso, mensagem, estatisticas = importar(banco, tmp_path / 'novo.csv', NOVOS)
+    assert sucesso, mensagem
+    assert estatisticas['registros'] == len(NOVOS)
+    assert contar_bens(banco) == {'total': 3, 'localizados': 1, 'nao_localizados': 2}
+    assert obter_bem_por_numero(banco, '100001') is None
+    assert obter_bem_por_numero(banco, '200002')['situacao'] == 'OK'
+    assert obter_bem_por_numero(banco, '200002')['localizacao'] == 'Sala 4'
+
+
+def test_reimportacao_limpa_o_estado_da_campanha_ativa(cliente, banco, tmp_path):
+    cliente.post('/api/leitura', json={'numero_bem': '100003', 'localizacao': 'Sala 7'})
+    assert obter_bem_por_numero(banco, '100003')['situacao'] == 'OK'
+
+    sucesso, mensagem, _ = importar(banco, tmp_path / 'novo.csv', NOVOS)
+    assert sucesso, mensagem
+    bem = obter_bem_por_numero(banco, '100003')
+    assert bem['situacao'] != 'OK'
+    assert bem['localizacao'] == 'Sala 1'
+    # O histórico de leituras fica
+    with sqlite3.connect(banco) as conn:
+        assert conn.execute("SELECT COUNT(*) FROM leituras WHERE numero = '100003'").fetchone()[0] == 1
+
+
+def test_leitores_seguem_com_os_dados_anteriores_durante_a_troca(banco, tmp_path):
+    leitor = sqlite3.connect(banco, isolation_level=None)
+    try:
+        leitor.execute("BEGIN")
+        assert leitor.execute("SELECT COUNT(*) FROM bens").fetchone()[0] == len(BENS)
+
+        sucesso, mensagem, _ = importar(banco, tmp_path / 'novo.csv', NOVOS)
+        assert sucesso, mensagem
+        assert leitor.execute("SELECT COUNT(*) FROM bens").fetchone()[0] == len(BENS)
+        leitor.execute("ROLLBACK")
+        assert leitor.execute("SELECT COUNT(*) FROM bens").fetchone()[0] == len(NOVOS)
+    finally:
+        leitor.close()
+
+
+def test_falha_na_importacao_mantem_o_cadastro(banco, tmp_path):
+    caminho = tmp_path / 'sem_numero.csv'
+    caminho.write_text('DESCRIÇÃO;LOCALIZAÇÃO\nCadeira;Sala 4\n', encoding='utf-8')
+    sucesso, _, _ = importar_fontes([(str(caminho), '')], banco, fazer_backup=False)
+    assert not sucesso
+    assert contar_bens(banco)['total'] == len(BENS)
+    assert obter_bem_por_numero(banco, '100001')['nome'] == 'Mesa 1'
+
+
+def test_falha_de_uma_fonte_em_paralelo_encerra_a_importacao(banco, tmp_path):
+    vazia = tmp_path / 'vazia.csv'
+    vazia.write_text('NÚMERO;DESCRIÇÃO;LOCALIZAÇÃO;SITUAÇÃO\n', encoding='utf-8')
+    # Lotes suficientes para encher a fila enquanto a outra fonte falha
+    grande = escrever_csv(tmp_path / 'grande.csv', [(f'3{i:06d}', f'Item {i}', 'Sala 1', '') for i in range(60000)])
+    resultado = []
+    importacao = threading.Thread(daemon=True, target=lambda: resultado.append(
+        importar_fontes([(str(vazia), ''), (grande, '')], banco, fazer_backup=False, processos=2)))
+    importacao.start()
+    importacao.join(120)
+
+    assert not importacao.is_alive(), "importação paralela travou após a falha de uma fonte"
+    sucesso, mensagem, _ = resultado[0]
+    assert not sucesso
+    assert 'vazio' in mensagem
+    assert contar_bens(banco)['total'] == len(BENS)
+
+
+def test_filtro_de_numeros_acompanha_a_importacao(banco, tmp_path):
+    assert not filtro_numeros.talvez_exista(banco, '200001')
+    sucesso, mensagem, _ = importar(banco, tmp_path / 'novo.csv', NOVOS)
+    assert sucesso, mensagem
+    assert filtro_numeros.talvez_exista(banco, '200001')
+
+
+def test_inconsistencias_da_importacao(banco, tmp_path):
+    bens = NOVOS + [('200001', 'Cadeira repetida', 'Sala 5', ''), ('0200002', 'Cadeira 2', 'Sala 4', '')]
+    sucesso, mensagem, _ = importar(banco, tmp_path / 'novo.csv', bens)
+    assert sucesso, mensagem
+    totais = listar_inconsistencias(banco)['totais']
+    assert totais['numero_duplicado'] == 1
+    assert totais['numero_variante'] == 1
+    # Em números repetidos vale a última linha
+    assert obter_bem_por_numero(banco, '200001')['nome'] == 'Cadeira repetida'
+
+
+def test_rota_de_importacao(cliente, banco, tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    conteudo = 'NÚMERO;DESCRIÇÃO;LOCALIZAÇÃO;SITUAÇÃO\n' + ''.join(';'.join(bem) + '\n' for bem in NOVOS)
+    resposta = cliente.post('/importar-excel', data={'excel_file': (io.BytesIO(conteudo.encode()), 'cadastro.csv')},
+                            content_type='multipart/form-data')
+    assert resposta.status_code == 200
+    assert contar_bens(banco)['total'] == len(NOVOS)
+    assert cliente.get('/api/bem/200001').get_json()['data']['nome'] == 'Cadeira 1'
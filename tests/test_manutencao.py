@@ -0,0 +1,56 @@
+import os
+import sqlite3
+
+from utils.manutencao import executar_manutencao, tarefas_pendentes
+
+
+def marcar_ultima_escrita(banco, modificador):
+    with sqlite3.connect(banco) as conn:
+        conn.execute("UPDATE controle_versao SET atualizado_em = datetime('now', ?) WHERE id = 1", (modificador,))
+
+
+def resultado(banco, tarefa):
+    return executar_manutencao(banco, [tarefa])[0]
+
+
+def test_checkpoint_ocioso_zera_o_wal(banco, outra_conexao):
+    outra_conexao("UPDATE bens SET nome = 'Cadeira 1' WHERE numero = '100001'")
+    marcar_ultima_escrita(banco, '-1 hour')
+    assert os.path.getsize(banco + '-wal') > 0
+
+    checkpoint = resultado(banco, 'checkpoint')
+    assert checkpoint['sucesso']
+    assert checkpoint['detalhes']['modo'] == 'TRUNCATE'
+    assert not checkpoint['detalhes']['bloqueado']
+    # O próprio registro no histórico volta a escrever algumas páginas no WAL
+    assert os.path.getsize(banco + '-wal') < 64 * 1024
+
+
+def test_checkpoint_em_uso_e_passivo(banco, outra_conexao):
+    outra_conexao("UPDATE bens SET nome = 'Cadeira 1' WHERE numero = '100001'")
+    assert resultado(banco, 'checkpoint')['detalhes']['modo'] == 'PASSIVE'
+
+
+def test_checkpoint_com_leitor_aberto_volta_ao_passivo(banco, monkeypatch):
+    from utils import manutencao
+    monkeypatch.setattr(manutencao, 'ESPERA_TRUNCATE_MS', 50)
+    marcar_ultima_escrita(banco, '-1 hour')
+    leitor = sqlite3.connect(banco, isolation_level=None)
+    try:
+        leitor.execute("BEGIN")
+        leitor.execute("SELECT COUNT(*) FROM bens").fetchone()
+        with sqlite3.connect(banco) as conn:
+            conn.execute("UPDATE bens SET nome = 'Cadeira 2' WHERE numero = '100002'")
+        checkpoint = resultado(banco, 'checkpoint')
+        assert checkpoint['sucesso']
+        assert checkpoint['detalhes']['modo'] == 'PASSIVE'
+    finally:
+        leitor.close()
+
+
+def test_quick_check_agendado(banco):
+    assert 'quick_check' in tarefas_pendentes(banco)
+    executados = {item['tarefa']: item for item in executar_manutencao(banco)}
+    assert executados['quick_check']['sucesso']
+    assert executados['quick_check']['detalhes'] == {'resultado': 'ok'}
+    assert tarefas_pendentes(banco) == []
@@ -0,0 +1,62 @@
+from utils.db_handler import atualizar_bem, excluir_bem, obter_bem_por_numero
+from utils.excel_importer import importar_fontes
+
+from conftest import BENS, escrever_csv
+
+
+def versao_atual(cliente):
+    return cliente.get('/api/offline/snapshot').get_json()['versao']
+
+
+def alteracoes(cliente, desde):
+    resposta = cliente.get(f'/api/offline/alteracoes?desde={desde}')
+    assert resposta.status_code == 200
+    return resposta.get_json()
+
+
+def test_snapshot_traz_todos_os_bens(cliente):
+    snapshot = cliente.get('/api/offline/snapshot').get_json()
+    assert len(snapshot['bens']) == len(BENS)
+    localizados = {bem[1] for bem in snapshot['bens'] if bem[snapshot['colunas'].index('localizado')]}
+    assert localizados == {'100000'}
+
+
+def test_alteracoes_desde_a_versao_do_cliente(cliente, banco):
+    cliente.post('/api/leitura', json={'numero_bem': '100001', 'localizacao': 'Sala 2'})
+    desde = versao_atual(cliente)
+
+    cliente.post('/api/leitura', json={'numero_bem': '100002', 'localizacao': 'Sala 3'})
+    bem = obter_bem_por_numero(banco, '100003')
+    atualizar_bem(banco, bem['id'], {'nome': 'Cadeira 3', 'situacao': 'Pendente', 'localizacao': 'Sala 1'})
+    excluir_bem(banco, obter_bem_por_numero(banco, '100004')['id'])
+
+    delta = alteracoes(cliente, desde)
+    assert not delta['completo']
+    assert delta['versao'] == versao_atual(cliente) > desde
+    alterados = {bem[1]: dict(zip(delta['colunas'], bem)) for bem in delta['alterados']}
+    assert set(alterados) == {'100002', '100003'}
+    assert alterados['100002']['localizado'] == 1
+    assert alterados['100002']['localizacao'] == 'Sala 3'
+    assert alterados['100003']['nome'] == 'Cadeira 3'
+    assert delta['removidos'] == ['100004']
+
+
+def test_sem_alteracoes_desde_a_versao_atual(cliente):
+    cliente.post('/api/leitura', json={'numero_bem': '100001'})
+    delta = alteracoes(cliente, versao_atual(cliente))
+    assert not delta['completo']
+    assert delta['alterados'] == [] and delta['removidos'] == []
+
+
+def test_importacao_pede_snapshot_completo(cliente, banco, tmp_path):
+    desde = versao_atual(cliente)
+    sucesso, mensagem, _ = importar_fontes([(escrever_csv(tmp_path / 'novo.csv', BENS[:5]), '')],
+                                           banco, fazer_backup=False)
+    assert sucesso, mensagem
+    assert alteracoes(cliente, desde)['completo']
+    assert not alteracoes(cliente, versao_atual(cliente))['completo']
+
+
+def test_versao_invalida(cliente):
+    assert cliente.get('/api/offline/alteracoes').status_code == 400
+    assert alteracoes(cliente, versao_atual(cliente) + 10)['completo']
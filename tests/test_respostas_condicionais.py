@@ -0,0 +1,35 @@
+def test_304_enquanto_o_banco_nao_muda(cliente):
+    resposta = cliente.get('/api/bem/100001')
+    assert resposta.status_code == 200
+    etag = resposta.headers['ETag']
+    assert 'no-cache' in resposta.headers['Cache-Control']
+
+    repetida = cliente.get('/api/bem/100001', headers={'If-None-Match': etag})
+    assert repetida.status_code == 304
+    assert repetida.headers['ETag'] == etag
+    assert repetida.data == b''
+
+
+def test_leitura_gera_novo_etag(cliente):
+    etag = cliente.get('/api/bem/100001').headers['ETag']
+
+    leitura = cliente.post('/api/leitura', json={'numero_bem': '100001', 'localizacao': 'Sala 2'})
+    assert leitura.get_json()['success']
+
+    resposta = cliente.get('/api/bem/100001', headers={'If-None-Match': etag})
+    assert resposta.status_code == 200
+    assert resposta.headers['ETag'] != etag
+    assert resposta.get_json()['data']['situacao'] == 'OK'
+    assert resposta.get_json()['data']['localizacao'] == 'Sala 2'
+
+
+def test_etag_depende_da_url(cliente):
+    etag = cliente.get('/api/bem/100001').headers['ETag']
+    resposta = cliente.get('/api/bem/100002', headers={'If-None-Match': etag})
+    assert resposta.status_code == 200
+    assert resposta.headers['ETag'] != etag
+
+
+def test_escrita_nao_recebe_etag(cliente):
+    resposta = cliente.post('/api/leitura', json={'numero_bem': '100003'})
+    assert 'ETag' not in resposta.headers
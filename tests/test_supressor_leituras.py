@@ -0,0 +1,47 @@
+import sqlite3
+
+from utils.db_handler import obter_bem_por_numero
+from utils.supressor_leituras import SupressorLeituras
+
+
+def total_leituras(banco, numero):
+    with sqlite3.connect(banco) as conn:
+        return conn.execute("SELECT COUNT(*) FROM leituras WHERE numero = ?", (numero,)).fetchone()[0]
+
+
+def test_repeticao_na_janela_e_suprimida():
+    supressor = SupressorLeituras(janela=60)
+    supressor.guardar('100001', 'Sala A', 'resultado')
+    assert supressor.obter('100001', 'Sala A') == 'resultado'
+    assert supressor.obter('100001', 'Sala B') is None
+    assert supressor.estatisticas()['suprimidas'] == 1
+
+
+def test_janela_vencida():
+    supressor = SupressorLeituras(janela=60)
+    supressor.guardar('100001', 'Sala A', 'resultado')
+    supressor._resultados['100001'] = (0.0,) + supressor._resultados['100001'][1:]
+    assert supressor.obter('100001', 'Sala A') is None
+
+
+def test_nova_localizacao_substitui_a_anterior():
+    supressor = SupressorLeituras(janela=60)
+    supressor.guardar('100001', 'Sala A', 'em A')
+    supressor.guardar('100001', 'Sala B', 'em B')
+    assert supressor.obter('100001', 'Sala A') is None
+    assert supressor.obter('100001', 'Sala B') == 'em B'
+
+
+def test_leituras_repetidas_gravam_uma_vez(cliente, banco):
+    for _ in range(3):
+        resposta = cliente.post('/api/leitura', json={'numero_bem': '100001', 'localizacao': 'Sala A'}).get_json()
+        assert resposta['success']
+    assert total_leituras(banco, '100001') == 1
+
+
+def test_leitura_em_a_depois_b_depois_a_volta_para_a(cliente, banco):
+    for local in ('Sala A', 'Sala B', 'Sala A'):
+        resposta = cliente.post('/api/leitura', json={'numero_bem': '100001', 'localizacao': local}).get_json()
+        assert resposta['bem']['localizacao'] == local
+    assert obter_bem_por_numero(banco, '100001')['localizacao'] == 'Sala A'
+    assert total_leituras(banco, '100001') == 3
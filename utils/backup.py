@@ -0,0 +1,297 @@
+import gzip
+import os
+import shutil
+import sqlite3
+import sys
+import tempfile
+import threading
+import time
+from datetime import datetime
+from typing import Dict, List, Optional, Tuple
+from utils.logger import logger
+from utils.eventos import difusor
+
+PASTA_BACKUPS = "relatorios/backups"
+PREFIXO = "backup_controle_"
+
+# Cópia em um único passo: copiando em partes, o SQLite recomeça a cópia a cada escrita
+# de outra conexão e, com leituras contínuas, pode nunca terminar. Em WAL o passo único
+# só mantém um snapshot de leitura, sem bloquear o escritor.
+PAGINAS_POR_PASSO = -1
+
+def _progresso(status, restantes, total):
+    if total and restantes == 0:
+        logger.info(f"Backup: {total} páginas copiadas")
+
+def _reservar_nome(pasta: str, rotulo: Optional[str], comprimir: bool) -> Tuple[str, str]:
+    """
+    (destino final, temporário) com nome ainda não usado. Dois backups no mesmo segundo
+    (manual e agendado, outro processo) recebem sufixos _2, _3...: o temporário é criado
+    com O_EXCL e só vira o destino por rename, então nenhum sobrescreve o outro.
+    """
+    base = f"{PREFIXO}{datetime.now().strftime('%Y%m%d_%H%M%S')}{f'_{rotulo}' if rotulo else ''}"
+    for tentativa in range(1, 1000):
+        destino = os.path.join(pasta, f"{base}{f'_{tentativa}' if tentativa > 1 else ''}.db")
+        if os.path.exists(destino + ".gz" if comprimir else destino):
+            continue
+        try:
+            os.close(os.open(destino + ".tmp", os.O_CREAT | os.O_EXCL | os.O_WRONLY))
+        except FileExistsError:
+            continue
+        return destino, destino + ".tmp"
+    raise FileExistsError(f"Sem nome livre para o backup {base}")
+
+def criar_backup(db_path: str, pasta: str = PASTA_BACKUPS, comprimir: bool = False,
+                 rotulo: Optional[str] = None) -> Tuple[bool, str]:
+    """
+    Cria uma cópia consistente do banco com a API de backup do SQLite.
+    A cópia é feita em um passo, sobre um snapshot, sem impedir leituras e escritas no banco em uso.
+    Retorna (sucesso, caminho do backup ou mensagem de erro).
+    """
+    if not os.path.exists(db_path):
+        return False, f"Banco não encontrado: {db_path}"
+
+    os.makedirs(pasta, exist_ok=True)
+    temporario = None
+    try:
+        destino, temporario = _reservar_nome(pasta, rotulo, comprimir)
+        origem = sqlite3.connect(db_path)
+        copia = sqlite3.connect(temporario)
+        try:
+            origem.backup(copia, pages=PAGINAS_POR_PASSO, progress=_progresso)
+            # O backup herda o modo WAL; o arquivo guardado deve ser autocontido
+            copia.execute("PRAGMA journal_mode=DELETE")
+        finally:
+            copia.close()
+            origem.close()
+
+        if comprimir:
+            # O .tmp reservado só sai depois que o .gz completo estiver no lugar
+            with open(temporario, 'rb') as entrada, gzip.open(temporario + ".gz", 'wb', compresslevel=6) as saida:
+                shutil.copyfileobj(entrada, saida, 1024 * 1024)
+            destino += ".gz"
+            os.replace(temporario + ".gz", destino)
+            os.remove(temporario)
+        else:
+            os.replace(temporario, destino)
+
+        logger.info(f"Backup criado: {destino} ({os.path.getsize(destino) / 1024:.0f} KB)")
+        return True, destino
+
+    except Exception as e:
+        for sobra in (temporario, temporario and temporario + ".gz"):
+            if sobra and os.path.exists(sobra):
+                os.remove(sobra)
+        logger.error(f"Erro ao criar backup de {db_path}: {str(e)}")
+        return False, f"Erro ao criar backup: {str(e)}"
+
+def listar_backups(pasta: str = PASTA_BACKUPS) -> List[Dict]:
+    """Lista os backups da pasta, do mais recente para o mais antigo"""
+    if not os.path.isdir(pasta):
+        return []
+
+    backups = []
+    for nome in os.listdir(pasta):
+        if nome.startswith(PREFIXO) and (nome.endswith('.db') or nome.endswith('.db.gz')):
+            caminho = os.path.join(pasta, nome)
+            info = os.stat(caminho)
+            backups.append({
+                'arquivo': nome,
+                'caminho': caminho,
+                'tamanho': info.st_size,
+                'comprimido': nome.endswith('.gz'),
+                'data': datetime.fromtimestamp(info.st_mtime).strftime('%Y-%m-%d %H:%M:%S'),
+                'timestamp': info.st_mtime
+            })
+    return sorted(backups, key=lambda b: b['timestamp'], reverse=True)
+
+def podar_backups(pasta: str = PASTA_BACKUPS, manter: int = 14, max_dias: Optional[int] = None) -> int:
+    """
+    Remove backups antigos, mantendo sempre os `manter` mais recentes.
+    Com max_dias, também remove os que passarem dessa idade (respeitando o mínimo).
+    """
+    removidos = 0
+    limite = time.time() - max_dias * 86400 if max_dias else None
+    for posicao, backup in enumerate(listar_backups(pasta)):
+        recente = limite is None or backup['timestamp'] >= limite
+        if posicao == 0 or (posicao < manter and recente):
+            continue
+        try:
+            os.remove(backup['caminho'])
+            removidos += 1
+        except OSError as e:
+            logger.warning(f"Não foi possível remover o backup {backup['arquivo']}: {str(e)}")
+
+    if removidos:
+        logger.info(f"Backups antigos removidos: {removidos}")
+    return removidos
+
+def restaurar_backup(caminho_backup: str, db_path: str, pasta: str = PASTA_BACKUPS) -> Tuple[bool, str]:
+    """
+    Restaura um backup (.db ou .db.gz) sobre o banco em uso.
+    Antes, verifica a integridade do backup e guarda uma cópia do estado atual.
+    """
+    if not os.path.exists(caminho_backup):
+        return False, f"Backup não encontrado: {caminho_backup}"
+
+    temporario = None
+    try:
+        origem_path = caminho_backup
+        if caminho_backup.endswith('.gz'):
+            descritor, temporario = tempfile.mkstemp(suffix='.db', dir=os.path.dirname(os.path.abspath(db_path)))
+            with os.fdopen(descritor, 'wb') as saida, gzip.open(caminho_backup, 'rb') as entrada:
+                shutil.copyfileobj(entrada, saida, 1024 * 1024)
+            origem_path = temporario
+
+        origem = sqlite3.connect(f"file:{origem_path}?mode=ro", uri=True)
+        try:
+            resultado = origem.execute("PRAGMA quick_check").fetchone()[0]
+            if resultado != 'ok':
+                return False, f"Backup corrompido ({resultado}); restauração cancelada"
+
+            if os.path.exists(db_path):
+                sucesso, seguranca = criar_backup(db_path, pasta, rotulo='antes_restauracao')
+                if not sucesso:
+                    return False, f"Não foi possível salvar o estado atual: {seguranca}"
+
+            destino = sqlite3.connect(db_path)
+            try:
+                versao_atual = _versao(destino)
+                origem.backup(destino, pages=PAGINAS_POR_PASSO)
+                # A versão nunca volta atrás: caches/ETags do estado anterior ficam inválidos
+                if _versao(destino) is not None:
+                    destino.execute("""
+                        UPDATE controle_versao
+                        SET versao = MAX(versao, ?) + 1, atualizado_em = datetime('now')
+                        WHERE id = 1
+                    """, (versao_atual or 0,))
+                    try:
+                        destino.execute("UPDATE controle_versao SET versao_reinicio = versao WHERE id = 1")
+                        destino.execute("DELETE FROM alteracoes_bens")
+                    except sqlite3.OperationalError:
+                        pass  # Backup anterior ao modo offline: garantir_estrutura marca o reinício
+                    destino.commit()
+            finally:
+                destino.close()
+        finally:
+            origem.close()
+
+        # O backup pode ter estrutura antiga: verifica de novo na próxima conexão
+        from utils.db_handler import _ESTRUTURA_VERIFICADA
+        _ESTRUTURA_VERIFICADA.discard(db_path)
+        difusor.publicar(db_path, 'restauracao')
+
+        mensagem = f"Banco restaurado a partir de {os.path.basename(caminho_backup)}"
+        logger.info(mensagem)
+        return True, mensagem
+
+    except Exception as e:
+        logger.error(f"Erro ao restaurar backup {caminho_backup}: {str(e)}")
+        return False, f"Erro ao restaurar backup: {str(e)}"
+    finally:
+        if temporario and os.path.exists(temporario):
+            os.remove(temporario)
+
+def _versao(conn: sqlite3.Connection) -> Optional[int]:
+    try:
+        resultado = conn.execute("SELECT versao FROM controle_versao WHERE id = 1").fetchone()
+        return resultado[0] if resultado else None
+    except sqlite3.Error:
+        return None
+
+
+class AgendadorBackup:
+    """
+    Backups periódicos em uma thread de fundo, com poda dos antigos.
+    Com vários processos (workers), só faz backup quando o mais recente
+    da pasta já passou do intervalo, e um arquivo de trava evita execuções simultâneas.
+    """
+
+    def __init__(self, db_path: str, intervalo_horas: float = 24, manter: int = 14,
+                 comprimir: bool = True, pasta: str = PASTA_BACKUPS):
+        self.db_path = db_path
+        self.intervalo = intervalo_horas * 3600
+        self.manter = manter
+        self.comprimir = comprimir
+        self.pasta = pasta
+        self._parar = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def iniciar(self):
+        if self._thread is None or not self._thread.is_alive():
+            self._thread = threading.Thread(target=self._executar, name='agendador-backup', daemon=True)
+            self._thread.start()
+            logger.info(f"Backup automático a cada {self.intervalo / 3600:g}h (mantendo {self.manter})")
+
+    def parar(self):
+        self._parar.set()
+
+    def executar_se_devido(self) -> Optional[str]:
+        """Faz o backup se o último for mais antigo que o intervalo; retorna o caminho criado"""
+        backups = listar_backups(self.pasta)
+        if backups and time.time() - backups[0]['timestamp'] < self.intervalo:
+            return None
+
+        os.makedirs(self.pasta, exist_ok=True)
+        trava = os.path.join(self.pasta, '.backup_em_andamento')
+        try:
+            # Trava esquecida por um processo encerrado no meio do backup
+            if os.path.exists(trava) and time.time() - os.path.getmtime(trava) > 3600:
+                os.remove(trava)
+            descritor = os.open(trava, os.O_CREAT | os.O_EXCL | os.O_WRONLY)
+        except FileExistsError:
+            return None
+
+        try:
+            os.close(descritor)
+            sucesso, caminho = criar_backup(self.db_path, self.pasta, comprimir=self.comprimir)
+            podar_backups(self.pasta, self.manter)
+            return caminho if sucesso else None
+        finally:
+            os.remove(trava)
+
+    def _executar(self):
+        # Verificação frequente, backup só quando devido
+        while not self._parar.wait(min(self.intervalo, 600)):
+            try:
+                if os.path.exists(self.db_path):
+                    self.executar_se_devido()
+            except Exception as e:
+                logger.error(f"Erro no backup automático: {str(e)}")
+
+
+def main(argumentos: List[str]) -> int:
+    """Linha de comando (python -m utils.backup): criar | listar | podar | restaurar <arquivo>"""
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Backups do banco de controle patrimonial")
+    parser.add_argument('--banco', default="relatorios/controle_patrimonial.db")
+    parser.add_argument('--pasta', default=PASTA_BACKUPS)
+    sub = parser.add_subparsers(dest='comando', required=True)
+    criar = sub.add_parser('criar')
+    criar.add_argument('--comprimir', action='store_true')
+    sub.add_parser('listar')
+    podar = sub.add_parser('podar')
+    podar.add_argument('--manter', type=int, default=14)
+    podar.add_argument('--max-dias', type=int)
+    restaurar = sub.add_parser('restaurar')
+    restaurar.add_argument('arquivo')
+    args = parser.parse_args(argumentos)
+
+    if args.comando == 'criar':
+        sucesso, mensagem = criar_backup(args.banco, args.pasta, comprimir=args.comprimir)
+    elif args.comando == 'listar':
+        for backup in listar_backups(args.pasta):
+            print(f"{backup['data']}  {backup['tamanho'] / 1024:>10.0f} KB  {backup['arquivo']}")
+        return 0
+    elif args.comando == 'podar':
+        sucesso, mensagem = True, f"{podar_backups(args.pasta, args.manter, args.max_dias)} backup(s) removido(s)"
+    else:
+        sucesso, mensagem = restaurar_backup(args.arquivo, args.banco, args.pasta)
+
+    print(("✅ " if sucesso else "❌ ") + mensagem)
+    return 0 if sucesso else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
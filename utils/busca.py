@@ -0,0 +1,190 @@
+import re
+import sqlite3
+import unicodedata
+from functools import lru_cache
+from typing import Dict, List, Optional, Set, Tuple
+from utils.logger import logger
+from utils.cache_consultas import CacheConsultas
+from utils.db_handler import get_db_connection, JUNCAO_CAMPANHA, COLUNA_LOCALIZACAO, COLUNA_SITUACAO
+
+# Máximo de resultados ranqueados por busca (o restante é cortado)
+LIMITE_RESULTADOS = 500
+# Candidatos trazidos do índice de trigramas para ranqueamento por similaridade
+LIMITE_CANDIDATOS = 2000
+# Similaridade mínima (0 a 1) para um resultado aproximado ser exibido
+SIMILARIDADE_MINIMA = 0.4
+
+# Termos buscados recentemente (resultados ranqueados). Instância única por processo
+cache_buscas = CacheConsultas('buscas', max_entradas=200)
+
+def _normalizar(texto: str) -> str:
+    """Minúsculas e sem acentos"""
+    texto = unicodedata.normalize('NFKD', str(texto or '').lower())
+    return ''.join(c for c in texto if not unicodedata.combining(c))
+
+def _palavras(texto: str) -> List[str]:
+    return re.findall(r'\w+', _normalizar(texto))
+
+@lru_cache(maxsize=20000)
+def _trigramas(palavra: str) -> Set[str]:
+    # Espaços nas bordas valorizam início e fim da palavra (como o pg_trgm)
+    palavra = f"  {palavra} "
+    return {palavra[i:i + 3] for i in range(len(palavra) - 2)}
+
+@lru_cache(maxsize=50000)
+def similaridade(a: str, b: str) -> float:
+    """Similaridade de trigramas (Jaccard) entre duas palavras"""
+    ta, tb = _trigramas(a), _trigramas(b)
+    return len(ta & tb) / len(ta | tb) if ta and tb else 0.0
+
+def _pontuar(palavras_busca: List[str], bem: Dict) -> float:
+    """Média, por palavra buscada, da melhor similaridade com as palavras do nome/número"""
+    palavras_bem = _palavras(f"{bem['numero']} {bem['nome']}")
+    numero = _normalizar(bem['numero'])
+    total = 0.0
+    for palavra in palavras_busca:
+        if palavra in numero:
+            total += 1.0
+        else:
+            total += max((similaridade(palavra, p) for p in palavras_bem), default=0.0)
+    return total / len(palavras_busca)
+
+def _consulta_fts(termo: str) -> Optional[str]:
+    """Consulta FTS5 'trigrama OR trigrama ...' (com e sem acentos) para gerar candidatos"""
+    trigramas = set()
+    for palavra in re.findall(r'\w+', termo.lower()) + _palavras(termo):
+        trigramas.update(palavra[i:i + 3] for i in range(len(palavra) - 2))
+    if not trigramas:
+        return None
+    return " OR ".join('"' + t.replace('"', '""') + '"' for t in sorted(trigramas))
+
+def _indice_disponivel(cursor: sqlite3.Cursor) -> bool:
+    cursor.execute("SELECT 1 FROM sqlite_master WHERE name = 'bens_busca'")
+    return cursor.fetchone() is not None
+
+def _carregar_bens(cursor: sqlite3.Cursor, ids: List[int]) -> Dict[int, Dict]:
+    bens = {}
+    for inicio in range(0, len(ids), 500):
+        lote = ids[inicio:inicio + 500]
+        cursor.execute(f"""
+            SELECT b.id, b.numero, b.nome, {COLUNA_LOCALIZACAO} AS localizacao, {COLUNA_SITUACAO} AS situacao
+            FROM {JUNCAO_CAMPANHA}
+            WHERE b.id IN ({','.join('?' * len(lote))})
+        """, lote)
+        bens.update((row['id'], dict(row)) for row in cursor.fetchall())
+    return bens
+
+def _sugerir(palavras_busca: List[str], candidatos: List[Dict]) -> Optional[str]:
+    """'Você quis dizer': troca cada palavra pela mais parecida encontrada nos nomes"""
+    vocabulario = {p for bem in candidatos for p in _palavras(bem['nome']) if len(p) >= 3}
+    corrigidas = []
+    for palavra in palavras_busca:
+        melhor = max(vocabulario, key=lambda p: similaridade(palavra, p), default=None)
+        if melhor and melhor != palavra and similaridade(palavra, melhor) >= 0.4:
+            corrigidas.append(melhor)
+        else:
+            corrigidas.append(palavra)
+    sugestao = ' '.join(corrigidas)
+    return sugestao if sugestao != ' '.join(palavras_busca) else None
+
+def _buscar_like(cursor: sqlite3.Cursor, termo: str, prefixo: bool) -> List[Dict]:
+    padrao = termo.replace('\\', '\\\\').replace('%', '\\%').replace('_', '\\_')
+    if prefixo:
+        # Prefixo: faixa no índice de número + LIKE no índice NOCASE de nome
+        condicao = "b.numero >= ? AND b.numero < ? OR b.nome LIKE ? ESCAPE '\\'"
+        parametros = (termo, termo + '\U0010ffff', f"{padrao}%")
+    else:
+        condicao = "b.nome LIKE ? ESCAPE '\\' OR b.numero LIKE ? ESCAPE '\\'"
+        parametros = (f"%{padrao}%", f"%{padrao}%")
+    cursor.execute(f"""
+        SELECT b.id, b.numero, b.nome, {COLUNA_LOCALIZACAO} AS localizacao, {COLUNA_SITUACAO} AS situacao
+        FROM {JUNCAO_CAMPANHA}
+        WHERE {condicao}
+        ORDER BY b.nome COLLATE NOCASE
+        LIMIT ?
+    """, (*parametros, LIMITE_RESULTADOS + 1))
+    return [dict(row) for row in cursor.fetchall()]
+
+def _buscar_ordenado(cursor: sqlite3.Cursor, termo: str) -> Tuple[List[Dict], Optional[str]]:
+    """Todos os resultados ranqueados (até LIMITE_RESULTADOS + 1) e a sugestão de correção"""
+    palavras_busca = [p for p in _palavras(termo) if len(p) >= 3]
+    consulta = _consulta_fts(termo)
+
+    if len(termo) < 3 or not palavras_busca or not consulta or not _indice_disponivel(cursor):
+        # Termos curtos não formam trigramas: prefixo simples
+        return _buscar_like(cursor, termo, prefixo=len(termo) < 3), None
+
+    # 1) Ocorrência exata do termo (substring) em número ou nome
+    cursor.execute("SELECT rowid FROM bens_busca WHERE bens_busca MATCH ? LIMIT ?",
+                   ('"' + termo.replace('"', '""') + '"', LIMITE_RESULTADOS + 1))
+    ids_exatos = [row[0] for row in cursor.fetchall()]
+
+    # 2) Candidatos que compartilham trigramas, ranqueados por similaridade
+    ids_candidatos = []
+    if len(ids_exatos) <= LIMITE_RESULTADOS:
+        cursor.execute("""
+            SELECT rowid FROM bens_busca WHERE bens_busca MATCH ?
+            ORDER BY rank LIMIT ?
+        """, (consulta, LIMITE_CANDIDATOS))
+        ids_candidatos = [row[0] for row in cursor.fetchall()]
+
+    bens = _carregar_bens(cursor, list(dict.fromkeys(ids_exatos + ids_candidatos)))
+    exatos = [bens[i] for i in ids_exatos if i in bens]
+    vistos = set(ids_exatos)
+    aproximados = []
+    for bem_id in ids_candidatos:
+        if bem_id in vistos or bem_id not in bens:
+            continue
+        pontuacao = _pontuar(palavras_busca, bens[bem_id])
+        if pontuacao >= SIMILARIDADE_MINIMA:
+            aproximados.append((pontuacao, bens[bem_id]))
+    aproximados.sort(key=lambda item: (-item[0], _normalizar(item[1]['nome'])))
+
+    sugestao = None
+    if not exatos:
+        sugestao = _sugerir(palavras_busca, [bem for _, bem in aproximados[:50]])
+    return exatos + [bem for _, bem in aproximados], sugestao
+
+def buscar_bens(db_path: str, termo: str, pagina: int = 1, por_pagina: int = 50) -> Dict:
+    """
+    Busca tolerante a erros de digitação por nome ou número (inclusive parcial).
+    Primeiro vêm as ocorrências exatas do termo, depois as aproximadas por similaridade.
+    Retorna a página pedida, o total (limitado a LIMITE_RESULTADOS) e uma sugestão de correção.
+    O ranqueamento de cada termo fica em cache até a próxima escrita no banco.
+    """
+    termo = (termo or '').strip()
+    pagina = max(pagina, 1)
+    resposta = {'resultados': [], 'total': 0, 'limitado': False, 'pagina': pagina,
+                'por_pagina': por_pagina, 'total_paginas': 0, 'sugestao': None}
+    if not termo:
+        return resposta
+
+    try:
+        with get_db_connection(db_path) as conn:
+            cursor = conn.cursor()
+            # Versão e resultados lidos na mesma transação
+            cursor.execute("BEGIN")
+            try:
+                cursor.execute("SELECT versao, versao_reinicio FROM controle_versao WHERE id = 1")
+                marca = tuple(cursor.fetchone())
+                # Qualquer escrita pode mudar a situação, o nome ou o conjunto de resultados
+                achou, ranqueados = cache_buscas.obter((db_path, termo), lambda guardada: guardada == marca)
+                if not achou:
+                    encontrados, sugestao = _buscar_ordenado(cursor, termo)
+                    ranqueados = (tuple(encontrados[:LIMITE_RESULTADOS]), len(encontrados) > LIMITE_RESULTADOS, sugestao)
+                    cache_buscas.guardar((db_path, termo), marca, ranqueados)
+            finally:
+                conn.rollback()
+
+        encontrados, resposta['limitado'], resposta['sugestao'] = ranqueados
+        inicio = (pagina - 1) * por_pagina
+        resposta.update(
+            resultados=[dict(bem) for bem in encontrados[inicio:inicio + por_pagina]],
+            total=len(encontrados),
+            total_paginas=(len(encontrados) + por_pagina - 1) // por_pagina
+        )
+        return resposta
+
+    except Exception as e:
+        logger.error(f"Erro na busca por '{termo}': {str(e)}")
+        return resposta
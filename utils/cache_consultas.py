@@ -0,0 +1,59 @@
+import threading
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Hashable, Tuple
+
+# Entradas por cache quando não informado
+MAX_ENTRADAS = 1000
+
+
+class CacheConsultas:
+    """
+    Cache LRU limitado de resultados de consultas, por processo.
+
+    Cada entrada guarda uma marca de versão (lida do banco na mesma transação do resultado);
+    quem consulta informa como validar a marca contra a versão atual, de modo que um resultado
+    só é reaproveitado se nenhuma escrita, de qualquer processo, o tornou obsoleto.
+    """
+
+    def __init__(self, nome: str, max_entradas: int = MAX_ENTRADAS):
+        self.nome = nome
+        self.max_entradas = max_entradas
+        self._lock = threading.Lock()
+        self._entradas: 'OrderedDict[Hashable, Tuple[Any, Any]]' = OrderedDict()
+        self._contadores = {'acertos': 0, 'falhas': 0, 'obsoletas': 0, 'descartes': 0}
+
+    def obter(self, chave: Hashable, vigente: Callable[[Any], bool]) -> Tuple[bool, Any]:
+        """(True, valor) se houver resultado guardado e vigente(marca) confirmar; senão (False, None)"""
+        with self._lock:
+            entrada = self._entradas.get(chave)
+            if entrada is None:
+                self._contadores['falhas'] += 1
+                return False, None
+            if not vigente(entrada[0]):
+                del self._entradas[chave]
+                self._contadores['obsoletas'] += 1
+                return False, None
+            self._entradas.move_to_end(chave)
+            self._contadores['acertos'] += 1
+            return True, entrada[1]
+
+    def guardar(self, chave: Hashable, marca: Any, valor: Any):
+        """Guarda o resultado com a marca de versão em que foi lido (descarta o menos usado se cheio)"""
+        with self._lock:
+            self._entradas[chave] = (marca, valor)
+            self._entradas.move_to_end(chave)
+            while len(self._entradas) > self.max_entradas:
+                self._entradas.popitem(last=False)
+                self._contadores['descartes'] += 1
+
+    def limpar(self):
+        with self._lock:
+            self._entradas.clear()
+
+    def estatisticas(self) -> Dict:
+        contadores = dict(self._contadores)
+        consultas = contadores['acertos'] + contadores['falhas'] + contadores['obsoletas']
+        contadores['entradas'] = len(self._entradas)
+        contadores['max_entradas'] = self.max_entradas
+        contadores['taxa_acerto'] = round(contadores['acertos'] / (consultas or 1), 4)
+        return contadores
@@ -0,0 +1,239 @@
+import os
+import sqlite3
+from typing import Dict, List, Optional, Tuple
+from utils.logger import logger
+from utils.eventos import difusor
+from utils.db_handler import get_db_connection, registrar_escrita, registrar_reinicio_offline
+
+PASTA_ARQUIVOS = "relatorios/campanhas"
+
+def listar_campanhas(db_path: str) -> List[Dict]:
+    """Lista as campanhas com o total de bens localizados e de leituras de cada uma"""
+    try:
+        with get_db_connection(db_path) as conn:
+            cursor = conn.cursor()
+            cursor.execute("""
+                SELECT c.id, c.nome, c.ativa, c.data_inicio, c.data_arquivamento, c.arquivo,
+                       (SELECT COUNT(*) FROM estado_campanha e
+                        WHERE e.campanha_id = c.id AND e.situacao = 'OK') AS localizados,
+                       (SELECT COALESCE(SUM(total), 0) FROM leituras_resumo r
+                        WHERE r.campanha_id = c.id) AS leituras
+                FROM campanhas c
+                ORDER BY c.id DESC
+            """)
+            return [dict(row) for row in cursor.fetchall()]
+
+    except Exception as e:
+        logger.error(f"Erro ao listar campanhas: {str(e)}")
+        return []
+
+def obter_campanha_ativa(db_path: str) -> Optional[Dict]:
+    """Retorna a campanha em uso (id, nome, data_inicio) ou None"""
+    try:
+        with get_db_connection(db_path) as conn:
+            cursor = conn.cursor()
+            cursor.execute("SELECT id, nome, data_inicio FROM campanhas WHERE ativa = 1")
+            resultado = cursor.fetchone()
+            return dict(resultado) if resultado else None
+
+    except Exception as e:
+        logger.error(f"Erro ao obter campanha ativa: {str(e)}")
+        return None
+
+def _ativar(cursor: sqlite3.Cursor, campanha_id: int):
+    # Duas etapas: o índice parcial único não admite duas campanhas ativas
+    cursor.execute("UPDATE campanhas SET ativa = 0 WHERE ativa = 1")
+    cursor.execute("UPDATE campanhas SET ativa = 1 WHERE id = ?", (campanha_id,))
+
+def criar_campanha(db_path: str, nome: str, ativar: bool = True) -> Tuple[bool, str]:
+    """Cria uma nova campanha; o cadastro de bens é reaproveitado sem cópia"""
+    nome = (nome or '').strip()
+    if not nome:
+        return False, "Informe o nome da campanha"
+
+    try:
+        with get_db_connection(db_path) as conn:
+            cursor = conn.cursor()
+            cursor.execute("SELECT 1 FROM campanhas WHERE nome = ?", (nome,))
+            if cursor.fetchone():
+                return False, f"Já existe uma campanha chamada '{nome}'"
+
+            cursor.execute("INSERT INTO campanhas (nome) VALUES (?)", (nome,))
+            campanha_id = cursor.lastrowid
+            registrar_escrita(cursor)
+            if ativar:
+                _ativar(cursor, campanha_id)
+                registrar_reinicio_offline(cursor)
+            conn.commit()
+
+        mensagem = f"Campanha '{nome}' criada" + (" e ativada" if ativar else "")
+        logger.info(mensagem)
+        if ativar:
+            difusor.publicar(db_path, 'campanha')
+        return True, mensagem
+
+    except Exception as e:
+        logger.error(f"Erro ao criar campanha: {str(e)}")
+        return False, f"Erro ao criar campanha: {str(e)}"
+
+def ativar_campanha(db_path: str, campanha_id: int) -> Tuple[bool, str]:
+    """Troca a campanha em uso: apenas atualiza metadados, nenhuma linha de bens é copiada"""
+    try:
+        with get_db_connection(db_path) as conn:
+            cursor = conn.cursor()
+            cursor.execute("SELECT nome, arquivo FROM campanhas WHERE id = ?", (campanha_id,))
+            campanha = cursor.fetchone()
+            if not campanha:
+                return False, "Campanha não encontrada"
+            if campanha['arquivo']:
+                return False, f"A campanha '{campanha['nome']}' está arquivada e não pode ser reativada"
+
+            _ativar(cursor, campanha_id)
+            registrar_escrita(cursor)
+            # Todo o estado de leituras muda: clientes offline baixam o snapshot de novo
+            registrar_reinicio_offline(cursor)
+            conn.commit()
+
+        mensagem = f"Campanha '{campanha['nome']}' ativada"
+        logger.info(mensagem)
+        difusor.publicar(db_path, 'campanha')
+        return True, mensagem
+
+    except Exception as e:
+        logger.error(f"Erro ao ativar campanha {campanha_id}: {str(e)}")
+        return False, f"Erro ao ativar campanha: {str(e)}"
+
+# Tabelas copiadas para o arquivo da campanha: nome no arquivo -> consulta no banco principal
+_TABELAS_ARQUIVO = {
+    'campanha': "SELECT * FROM principal.campanhas WHERE id = ?",
+    'estado_campanha': """
+        SELECT e.numero, b.nome, e.situacao, e.localizacao, e.data_localizacao
+        FROM principal.estado_campanha e LEFT JOIN principal.bens b ON b.numero = e.numero
+        WHERE e.campanha_id = ?
+    """,
+    'leituras': "SELECT * FROM principal.leituras WHERE campanha_id = ?",
+    'leituras_resumo': "SELECT * FROM principal.leituras_resumo WHERE campanha_id = ?",
+}
+
+def _sincronizar_pasta(pasta: str):
+    """Torna durável a renomeação feita na pasta (sem efeito no Windows)"""
+    try:
+        descritor = os.open(pasta, os.O_RDONLY)
+    except OSError:
+        return
+    try:
+        os.fsync(descritor)
+    except OSError:
+        pass
+    finally:
+        os.close(descritor)
+
+def _montar_arquivo(db_path: str, campanha_id: int, caminho_arquivo: str) -> Dict[str, int]:
+    """
+    Grava o arquivo completo da campanha (só ele é escrito; o banco principal é apenas lido,
+    num único snapshot) e o coloca no lugar por rename. Retorna as linhas copiadas por tabela.
+    """
+    temporario = caminho_arquivo + ".tmp"
+    if os.path.exists(temporario):
+        os.remove(temporario)
+    try:
+        arquivo = sqlite3.connect(temporario, isolation_level=None)
+        try:
+            arquivo.execute("ATTACH DATABASE ? AS principal", (db_path,))
+            arquivo.execute("BEGIN")
+            for tabela, consulta in _TABELAS_ARQUIVO.items():
+                arquivo.execute(f"CREATE TABLE main.{tabela} AS {consulta}", (campanha_id,))
+            arquivo.execute("COMMIT")
+            arquivo.execute("DETACH DATABASE principal")
+            copiadas = {tabela: arquivo.execute(f"SELECT COUNT(*) FROM {tabela}").fetchone()[0]
+                        for tabela in ('estado_campanha', 'leituras', 'leituras_resumo')}
+            # Compacta o arquivo
+            arquivo.execute("VACUUM")
+        finally:
+            arquivo.close()
+        os.chmod(temporario, 0o444)
+        os.replace(temporario, caminho_arquivo)
+        _sincronizar_pasta(os.path.dirname(os.path.abspath(caminho_arquivo)))
+        return copiadas
+    except Exception:
+        if os.path.exists(temporario):
+            os.chmod(temporario, 0o644)
+            os.remove(temporario)
+        raise
+
+def _descartar_arquivo(caminho_arquivo: str):
+    if os.path.exists(caminho_arquivo):
+        os.chmod(caminho_arquivo, 0o644)
+        os.remove(caminho_arquivo)
+
+def arquivar_campanha(db_path: str, campanha_id: int, pasta: str = PASTA_ARQUIVOS) -> Tuple[bool, str]:
+    """
+    Move o estado e as leituras de uma campanha encerrada para um banco SQLite
+    próprio, somente leitura, e remove essas linhas do banco principal.
+
+    Uma transação não é atômica entre dois arquivos em WAL, então são duas etapas: primeiro
+    o arquivo é gravado por inteiro (e posto no lugar por rename); só depois o banco principal
+    remove as linhas e marca a campanha, em uma transação só dele. Interrompido entre as duas,
+    o banco principal continua com tudo e a campanha sem arquivo: repetir refaz o arquivo.
+    """
+    try:
+        os.makedirs(pasta, exist_ok=True)
+        caminho_arquivo = os.path.join(pasta, f"campanha_{campanha_id:03d}.db")
+
+        with get_db_connection(db_path) as conn:
+            cursor = conn.cursor()
+            cursor.execute("SELECT nome, ativa, arquivo FROM campanhas WHERE id = ?", (campanha_id,))
+            campanha = cursor.fetchone()
+        if not campanha:
+            return False, "Campanha não encontrada"
+        if campanha['ativa']:
+            return False, "A campanha ativa não pode ser arquivada; ative outra antes"
+        if campanha['arquivo']:
+            return False, f"Campanha já arquivada em {campanha['arquivo']}"
+        if os.path.exists(caminho_arquivo):
+            # Sobra de um arquivamento interrompido: o banco principal ainda tem todas as linhas
+            logger.warning(f"Refazendo o arquivo incompleto {caminho_arquivo}")
+            _descartar_arquivo(caminho_arquivo)
+
+        copiadas = _montar_arquivo(db_path, campanha_id, caminho_arquivo)
+
+        with get_db_connection(db_path) as conn:
+            cursor = conn.cursor()
+            try:
+                cursor.execute("BEGIN IMMEDIATE")
+                # Nada pode ter mudado na campanha desde a cópia (ex.: leituras offline atrasadas)
+                atuais = {tabela: cursor.execute(f"SELECT COUNT(*) FROM {tabela} WHERE campanha_id = ?",
+                                                 (campanha_id,)).fetchone()[0]
+                          for tabela in copiadas}
+                if atuais != copiadas:
+                    conn.rollback()
+                    _descartar_arquivo(caminho_arquivo)
+                    return False, "A campanha foi alterada durante o arquivamento; tente novamente"
+
+                cursor.execute("DELETE FROM estado_campanha WHERE campanha_id = ?", (campanha_id,))
+                cursor.execute("DELETE FROM leituras WHERE campanha_id = ?", (campanha_id,))
+                cursor.execute("DELETE FROM leituras_resumo WHERE campanha_id = ?", (campanha_id,))
+                cursor.execute("""
+                    UPDATE campanhas SET arquivo = ?, data_arquivamento = datetime('now')
+                    WHERE id = ?
+                """, (caminho_arquivo, campanha_id))
+                registrar_escrita(cursor)
+                conn.commit()
+            except Exception:
+                conn.rollback()
+                _descartar_arquivo(caminho_arquivo)
+                raise
+
+        mensagem = f"Campanha '{campanha['nome']}' arquivada em {caminho_arquivo}"
+        logger.info(mensagem)
+        return True, mensagem
+
+    except Exception as e:
+        logger.error(f"Erro ao arquivar campanha {campanha_id}: {str(e)}")
+        return False, f"Erro ao arquivar campanha: {str(e)}"
+
+def abrir_arquivo_campanha(caminho_arquivo: str) -> sqlite3.Connection:
+    """Abre o banco de uma campanha arquivada em modo somente leitura"""
+    conn = sqlite3.connect(f"file:{caminho_arquivo}?mode=ro", uri=True)
+    conn.row_factory = sqlite3.Row
+    return conn
@@ -0,0 +1,57 @@
+import os
+import sys
+from typing import List, Tuple
+from utils.excel_importer import importar_fontes, montar_fontes
+
+
+def interpretar_fonte(texto: str, aba_padrao: str) -> List[Tuple[str, str]]:
+    """'arquivo.xlsx:Aba1,Aba2' ou 'arquivo.xlsx:*' -> fontes (arquivo, aba); sem ':' usa as abas padrão"""
+    arquivo, separador, abas = texto.rpartition(':')
+    # 'C:\\planilha.xlsx' (unidade do Windows) não tem aba
+    if not separador or not arquivo or os.path.exists(texto):
+        return montar_fontes([texto], aba_padrao)
+    return montar_fontes([arquivo], abas or aba_padrao)
+
+
+def main(argumentos: List[str]) -> int:
+    """
+    Linha de comando (python -m utils.carga): carga em massa de uma ou mais planilhas
+    como o novo cadastro, pelo mesmo mecanismo da importação da aplicação
+    """
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Carga em massa do cadastro de bens a partir de planilhas")
+    parser.add_argument('fontes', nargs='+',
+                        help="arquivo.xlsx, arquivo.xlsx:Aba1,Aba2, arquivo.xlsx:* (todas as abas) ou arquivo.csv/.tsv")
+    parser.add_argument('--banco', default="relatorios/controle_patrimonial.db")
+    parser.add_argument('--aba', default='Estoque',
+                        help="abas (separadas por vírgula, '*' = todas) quando a fonte não indica (padrão: Estoque)")
+    parser.add_argument('--processos', type=int, default=os.cpu_count() or 1,
+                        help="processos para ler as fontes em paralelo (padrão: número de CPUs)")
+    parser.add_argument('--sem-backup', action='store_true', help="não copia o banco atual antes da carga")
+    args = parser.parse_args(argumentos)
+
+    try:
+        fontes = [fonte for texto in args.fontes for fonte in interpretar_fonte(texto, args.aba)]
+    except Exception as e:
+        print(f"❌ {str(e)}")
+        return 2
+    if not fontes:
+        print("❌ Nenhuma aba encontrada nas planilhas informadas")
+        return 2
+    sucesso, mensagem, estatisticas = importar_fontes(fontes, args.banco, fazer_backup=not args.sem_backup,
+                                                     processos=max(1, args.processos))
+    print(mensagem)
+    if not sucesso:
+        return 1
+
+    total = estatisticas['total_s']
+    print(f"⏱️  Leitura e montagem: {estatisticas['montagem_s']:.1f}s | "
+          f"troca: {estatisticas['troca_s']:.1f}s | total: {total:.1f}s")
+    print(f"🚀 Vazão: {estatisticas['registros'] / total if total else 0:,.0f} registros/s "
+          f"({estatisticas['fontes']} fonte(s))")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
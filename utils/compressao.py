@@ -0,0 +1,99 @@
+import gzip
+import zlib
+from werkzeug.http import parse_accept_header
+from utils.logger import logger
+
+try:
+    import brotli  # Opcional: pip install brotli
+except ImportError:
+    brotli = None
+
+# Respostas menores que isso não compensam o custo de compressão
+LIMIAR_BYTES = 1024
+NIVEL_GZIP = 6
+NIVEL_BROTLI = 5
+
+TIPOS_COMPRIMIVEIS = {
+    'text/html',
+    'text/css',
+    'text/plain',
+    'text/csv',
+    'application/json',
+    'application/javascript',
+    'text/javascript',
+}
+
+def escolher_codificacao(accept_encoding):
+    """
+    Escolhe a codificação de maior peso (q) aceita pelo cliente; br antes de gzip no empate.
+    q=0 recusa a codificação; '*' vale para as não listadas.
+    """
+    aceitas = parse_accept_header(accept_encoding)
+    candidatas = ['br', 'gzip'] if brotli is not None else ['gzip']
+    melhor = max(candidatas, key=aceitas.quality)
+    return melhor if aceitas.quality(melhor) > 0 else None
+
+def _comprimir_fluxo(partes, codificacao):
+    """
+    Comprime uma resposta em fluxo parte a parte.
+    Cada parte é descarregada (flush) para o navegador poder desenhar a página aos poucos.
+    """
+    if codificacao == 'br':
+        compressor = brotli.Compressor(quality=NIVEL_BROTLI)
+        for parte in partes:
+            if isinstance(parte, str):
+                parte = parte.encode('utf-8')
+            dados = compressor.process(parte) + compressor.flush()
+            if dados:
+                yield dados
+        yield compressor.finish()
+    else:
+        compressor = zlib.compressobj(NIVEL_GZIP, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+        for parte in partes:
+            if isinstance(parte, str):
+                parte = parte.encode('utf-8')
+            dados = compressor.compress(parte) + compressor.flush(zlib.Z_SYNC_FLUSH)
+            if dados:
+                yield dados
+        yield compressor.flush()
+
+def comprimir_resposta(resposta, accept_encoding):
+    """
+    Comprime respostas HTML/JSON/CSS acima do limiar com gzip ou brotli.
+    Respostas de arquivos (send_file), SSE e já codificadas são ignoradas.
+    """
+    if (resposta.status_code != 200
+            or resposta.direct_passthrough
+            or 'Content-Encoding' in resposta.headers
+            or resposta.mimetype not in TIPOS_COMPRIMIVEIS):
+        return resposta
+
+    codificacao = escolher_codificacao(accept_encoding or '')
+    resposta.vary.add('Accept-Encoding')
+    if codificacao is None:
+        return resposta
+
+    try:
+        if resposta.is_streamed:
+            resposta.response = _comprimir_fluxo(resposta.response, codificacao)
+            resposta.headers.pop('Content-Length', None)
+        else:
+            dados = resposta.get_data()
+            if len(dados) < LIMIAR_BYTES:
+                return resposta
+            if codificacao == 'br':
+                resposta.set_data(brotli.compress(dados, quality=NIVEL_BROTLI))
+            else:
+                resposta.set_data(gzip.compress(dados, NIVEL_GZIP))
+    except Exception as e:
+        logger.error(f"Erro ao comprimir resposta: {str(e)}")
+        return resposta
+
+    resposta.headers['Content-Encoding'] = codificacao
+
+    # O corpo mudou de bytes: o ETag passa a ser fraco (equivalência semântica)
+    etag, fraco = resposta.get_etag()
+    if etag and not fraco:
+        resposta.set_etag(etag, weak=True)
+
+    return resposta
@@ -0,0 +1,160 @@
+import csv
+import io
+import sqlite3
+from typing import Dict, Iterator, List, Optional, Tuple
+from utils.logger import logger
+from utils.db_handler import get_db_connection, obter_versao_escrita, JUNCAO_CAMPANHA
+
+# Local lido de um bem na campanha ativa; leitura sem local conta como lida no local esperado
+COLUNA_LOCAL_LIDO = "CASE WHEN e.situacao = 'OK' THEN COALESCE(e.local_id, b.local_id) END"
+
+SEM_LOCAL = "(sem local cadastrado)"
+
+COLUNAS_RESUMO = ['local_id', 'local', 'esperados', 'encontrados', 'em_outro_local',
+                  'faltando', 'vindos_de_outro_local', 'percentual']
+COLUNAS_ITENS = ['numero', 'nome', 'local_esperado', 'local_lido', 'categoria', 'data_localizacao']
+
+CATEGORIAS = ('encontrado', 'em_outro_local', 'faltando')
+
+# Último relatório calculado por banco neste processo: db_path -> (versão de escrita, relatório)
+_CACHE_CONCILIACAO: Dict[str, Tuple[int, Dict]] = {}
+
+def _calcular(cursor: sqlite3.Cursor) -> Dict:
+    # Uma única passada agrupada pelos pares (local esperado, local lido): o resultado
+    # tem no máximo uma linha por combinação de locais, não uma por bem
+    cursor.execute(f"""
+        SELECT b.local_id AS esperado, {COLUNA_LOCAL_LIDO} AS lido, COUNT(*) AS quantidade
+        FROM {JUNCAO_CAMPANHA}
+        GROUP BY 1, 2
+    """)
+    pares = cursor.fetchall()
+
+    cursor.execute("SELECT id, nome FROM locais")
+    nomes = {row['id']: row['nome'] for row in cursor.fetchall()}
+
+    locais = {}
+    def linha(local_id):
+        if local_id not in locais:
+            locais[local_id] = {'local_id': local_id, 'local': nomes.get(local_id, SEM_LOCAL),
+                                'esperados': 0, 'encontrados': 0, 'em_outro_local': 0,
+                                'faltando': 0, 'vindos_de_outro_local': 0}
+        return locais[local_id]
+
+    for esperado, lido, quantidade in pares:
+        origem = linha(esperado)
+        origem['esperados'] += quantidade
+        if lido is None:
+            origem['faltando'] += quantidade
+        elif lido == esperado:
+            origem['encontrados'] += quantidade
+        else:
+            origem['em_outro_local'] += quantidade
+            linha(lido)['vindos_de_outro_local'] += quantidade
+
+    totais = {'local_id': None, 'local': 'Total'}
+    totais.update({coluna: sum(l[coluna] for l in locais.values())
+                   for coluna in ('esperados', 'encontrados', 'em_outro_local', 'faltando', 'vindos_de_outro_local')})
+    for item in list(locais.values()) + [totais]:
+        item['percentual'] = round(100 * item['encontrados'] / item['esperados'], 1) if item['esperados'] else 0.0
+
+    linhas = sorted(locais.values(), key=lambda l: (l['local_id'] is None, l['local'].lower()))
+    return {'locais': linhas, 'totais': totais}
+
+def conciliar_locais(db_path: str) -> Dict:
+    """
+    Conciliação por local na campanha ativa: esperados (local importado), encontrados no
+    próprio local, encontrados em outro local, faltando e vindos de outro local.
+    O resultado fica em cache até a próxima escrita no banco.
+    """
+    try:
+        versao, atualizado_em = obter_versao_escrita(db_path)
+        em_cache = _CACHE_CONCILIACAO.get(db_path)
+        if em_cache and versao and em_cache[0] == versao:
+            return em_cache[1]
+
+        with get_db_connection(db_path) as conn:
+            cursor = conn.cursor()
+            relatorio = _calcular(cursor)
+            cursor.execute("SELECT nome FROM campanhas WHERE ativa = 1")
+            campanha = cursor.fetchone()
+
+        relatorio.update(versao=versao, atualizado_em=atualizado_em,
+                         campanha=campanha['nome'] if campanha else None)
+        _CACHE_CONCILIACAO[db_path] = (versao, relatorio)
+        return relatorio
+
+    except Exception as e:
+        logger.error(f"Erro ao gerar conciliação por local: {str(e)}")
+        return {'locais': [], 'totais': {}, 'versao': None, 'atualizado_em': None, 'campanha': None}
+
+def iterar_itens_conciliacao(db_path: str, local_id: Optional[int] = None, categoria: Optional[str] = None,
+                             lote: int = 2000) -> Iterator[Dict]:
+    """
+    Percorre bem a bem a conciliação (para exportação), sem carregar tudo em memória.
+    Com local_id, traz os bens esperados nesse local e os encontrados nele vindos de outro.
+    """
+    if categoria is not None and categoria not in CATEGORIAS:
+        raise ValueError(f"Categoria inválida: {categoria}. Use: {', '.join(CATEGORIAS)}")
+
+    condicoes, parametros = [], []
+    if local_id is not None:
+        condicoes.append(f"(b.local_id = ? OR {COLUNA_LOCAL_LIDO} = ?)")
+        parametros += [local_id, local_id]
+    if categoria:
+        condicoes.append("categoria = ?")
+        parametros.append(categoria)
+    where = f"WHERE {' AND '.join(condicoes)}" if condicoes else ""
+
+    with get_db_connection(db_path) as conn:
+        cursor = conn.cursor()
+        cursor.execute(f"""
+            SELECT b.numero, b.nome,
+                   COALESCE(le.nome, '') AS local_esperado,
+                   COALESCE(ll.nome, '') AS local_lido,
+                   CASE WHEN {COLUNA_LOCAL_LIDO} IS NULL THEN 'faltando'
+                        WHEN {COLUNA_LOCAL_LIDO} IS b.local_id THEN 'encontrado'
+                        ELSE 'em_outro_local' END AS categoria,
+                   e.data_localizacao
+            FROM {JUNCAO_CAMPANHA}
+            LEFT JOIN locais le ON le.id = b.local_id
+            LEFT JOIN locais ll ON ll.id = {COLUNA_LOCAL_LIDO}
+            {where}
+            ORDER BY b.local_id, b.numero
+        """, parametros)
+        while True:
+            linhas = cursor.fetchmany(lote)
+            if not linhas:
+                break
+            for row in linhas:
+                yield dict(row)
+
+def gerar_csv(colunas: List[str], linhas) -> Iterator[str]:
+    """CSV em partes (separador ';' e BOM para abrir direto no Excel)"""
+    buffer = io.StringIO()
+    escritor = csv.DictWriter(buffer, fieldnames=colunas, delimiter=';', extrasaction='ignore')
+    buffer.write('\ufeff')
+    escritor.writeheader()
+    for numero, linha in enumerate(linhas, 1):
+        escritor.writerow(linha)
+        if numero % 1000 == 0:
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate()
+    yield buffer.getvalue()
+
+def salvar_xlsx(caminho: str, colunas: List[str], linhas, titulo: str = "Conciliação") -> int:
+    """
+    Grava a planilha linha a linha (modo write_only do openpyxl); retorna o total de linhas.
+    Cada linha é um dict ou uma sequência já na ordem de 'colunas'.
+    """
+    from openpyxl import Workbook
+
+    planilha = Workbook(write_only=True)
+    aba = planilha.create_sheet(titulo[:31])
+    aba.append(colunas)
+    total = 0
+    for linha in linhas:
+        aba.append([linha.get(coluna) for coluna in colunas] if isinstance(linha, dict) else list(linha))
+        total += 1
+    planilha.save(caminho)
+    return total
@@ -1,7 +1,22 @@
+import re
 import sqlite3
-from typing import List, Dict, Tuple, Optional
+import unicodedata
+from typing import List, Dict, Iterator, Tuple, Optional
+from collections import namedtuple
 from contextlib import contextmanager
+from functools import lru_cache
 from utils.logger import logger
+from utils.eventos import difusor
+from utils.escritor import escritor
+from utils.filtro_numeros import filtro_numeros
+from utils.supressor_leituras import supressor_leituras
+from utils.cache_consultas import CacheConsultas
+
+# Bancos cuja estrutura auxiliar já foi verificada neste processo
+_ESTRUTURA_VERIFICADA = set()
+
+# Bens consultados por número (modal de edição, detalhes da leitura). Instância única por processo
+cache_bens = CacheConsultas('bens', max_entradas=5000)
 
 @contextmanager
 def get_db_connection(db_path: str):
@@ -11,10 +26,430 @@ def get_db_connection(db_path: str):
     conn = sqlite3.connect(db_path)
     conn.row_factory = sqlite3.Row  # Para retornar dicionários
     try:
+        if db_path not in _ESTRUTURA_VERIFICADA:
+            garantir_estrutura(conn, db_path)
         yield conn
     finally:
         conn.close()
 
+def garantir_estrutura(conn: sqlite3.Connection, db_path: str):
+    """
+    Cria as tabelas auxiliares (controle de versão etc.) em bancos já importados.
+    Só marca o banco como verificado depois que a tabela de bens existir.
+    """
+    cursor = conn.cursor()
+    cursor.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'bens'")
+    if not cursor.fetchone():
+        return
+
+    # WAL: leitores não bloqueiam o escritor (nem o backup online) e vice-versa
+    cursor.execute("PRAGMA journal_mode=WAL")
+
+    # Versão global de escrita: incrementada na mesma transação de cada alteração
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS controle_versao (
+            id INTEGER PRIMARY KEY CHECK (id = 1),
+            versao INTEGER NOT NULL DEFAULT 0,
+            atualizado_em DATETIME
+        )
+    """)
+    cursor.execute("""
+        INSERT OR IGNORE INTO controle_versao (id, versao, atualizado_em)
+        VALUES (1, 0, datetime('now'))
+    """)
+    # Versão a partir da qual clientes offline precisam baixar o snapshot completo
+    if _adicionar_coluna(cursor, 'controle_versao', 'versao_reinicio', 'INTEGER NOT NULL DEFAULT 0'):
+        cursor.execute("UPDATE controle_versao SET versao_reinicio = versao")
+
+    # Histórico de leituras (somente inserção) e resumo incremental por campanha/local/hora
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS leituras (
+            id INTEGER PRIMARY KEY,
+            numero TEXT NOT NULL,
+            localizacao TEXT NOT NULL DEFAULT '',
+            situacao_anterior TEXT,
+            campanha_id INTEGER NOT NULL DEFAULT 0,
+            data_leitura DATETIME NOT NULL DEFAULT CURRENT_TIMESTAMP
+        )
+    """)
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_leituras_data ON leituras(data_leitura)")
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_leituras_local_data ON leituras(localizacao, data_leitura)")
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_leituras_numero ON leituras(numero)")
+    # Identificador gerado pelo cliente offline: reenvios do mesmo lote não duplicam leituras
+    _adicionar_coluna(cursor, 'leituras', 'origem_id', 'TEXT')
+    cursor.execute("CREATE UNIQUE INDEX IF NOT EXISTS idx_leituras_origem ON leituras(origem_id) WHERE origem_id IS NOT NULL")
+
+    # Dicionário de locais: cada sala é gravada uma vez e referenciada por id
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS locais (
+            id INTEGER PRIMARY KEY,
+            nome TEXT NOT NULL,
+            chave TEXT NOT NULL UNIQUE,
+            total_usos INTEGER NOT NULL DEFAULT 0,
+            data_criacao DATETIME DEFAULT CURRENT_TIMESTAMP
+        )
+    """)
+    bens_novo_local = _adicionar_coluna(cursor, 'bens', 'local_id', 'INTEGER REFERENCES locais(id)')
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_bens_local ON bens(local_id)")
+    leituras_novo_local = _adicionar_coluna(cursor, 'leituras', 'local_id', 'INTEGER')
+
+    # Resumo por local_id (estrutura antiga, por texto, é recriada a partir do histórico)
+    cursor.execute("PRAGMA table_info(leituras_resumo)")
+    colunas_resumo = [coluna[1] for coluna in cursor.fetchall()]
+    if colunas_resumo and 'local_id' not in colunas_resumo:
+        cursor.execute("DROP TABLE leituras_resumo")
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS leituras_resumo (
+            campanha_id INTEGER NOT NULL,
+            local_id INTEGER NOT NULL DEFAULT 0,
+            hora TEXT NOT NULL,
+            total INTEGER NOT NULL DEFAULT 0,
+            PRIMARY KEY (campanha_id, local_id, hora)
+        ) WITHOUT ROWID
+    """)
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_leituras_resumo_hora ON leituras_resumo(hora)")
+
+    # Campanhas (ciclos de inventário): o cadastro em bens é compartilhado e o
+    # estado das leituras de cada campanha fica em estado_campanha
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS campanhas (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            nome TEXT NOT NULL UNIQUE,
+            ativa INTEGER NOT NULL DEFAULT 0,
+            data_inicio DATETIME DEFAULT CURRENT_TIMESTAMP,
+            data_arquivamento DATETIME,
+            arquivo TEXT
+        )
+    """)
+    cursor.execute("CREATE UNIQUE INDEX IF NOT EXISTS idx_campanhas_ativa ON campanhas(ativa) WHERE ativa = 1")
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS estado_campanha (
+            campanha_id INTEGER NOT NULL,
+            numero TEXT NOT NULL,
+            situacao TEXT NOT NULL,
+            localizacao TEXT,
+            data_localizacao DATETIME,
+            PRIMARY KEY (campanha_id, numero)
+        ) WITHOUT ROWID
+    """)
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_estado_campanha_situacao ON estado_campanha(campanha_id, situacao)")
+    estado_novo_local = _adicionar_coluna(cursor, 'estado_campanha', 'local_id', 'INTEGER')
+
+    cursor.execute("SELECT COUNT(*) FROM campanhas")
+    if cursor.fetchone()[0] == 0:
+        _migrar_para_campanhas(cursor)
+
+    # Bens gravados por scripts externos (sem local_id) ou estrutura recém-migrada
+    cursor.execute("SELECT 1 FROM bens WHERE local_id IS NULL AND localizacao != '' LIMIT 1")
+    if cursor.fetchone() or bens_novo_local or leituras_novo_local or estado_novo_local:
+        _popular_locais(cursor, incluir_historico=leituras_novo_local or estado_novo_local)
+    if colunas_resumo and 'local_id' not in colunas_resumo:
+        _recalcular_resumo(cursor)
+
+    # Histórico das tarefas de manutenção (utils/manutencao.py)
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS manutencao (
+            id INTEGER PRIMARY KEY,
+            tarefa TEXT NOT NULL,
+            data_execucao DATETIME NOT NULL DEFAULT CURRENT_TIMESTAMP,
+            duracao_ms INTEGER,
+            sucesso INTEGER NOT NULL,
+            resultado TEXT
+        )
+    """)
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_manutencao_tarefa ON manutencao(tarefa, data_execucao)")
+
+    _criar_registro_alteracoes(cursor)
+
+    # Problemas encontrados na última importação (duplicados, variantes, números malformados)
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS inconsistencias_importacao (
+            id INTEGER PRIMARY KEY,
+            tipo TEXT NOT NULL,
+            numero TEXT,
+            linhas TEXT,
+            ocorrencias INTEGER NOT NULL DEFAULT 1,
+            detalhe TEXT,
+            data_importacao DATETIME DEFAULT CURRENT_TIMESTAMP
+        )
+    """)
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_inconsistencias_tipo ON inconsistencias_importacao(tipo)")
+
+    # Índices para ordenação e filtros da listagem (numero já tem índice UNIQUE)
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_bens_nome ON bens(nome COLLATE NOCASE)")
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_bens_localizacao ON bens(localizacao COLLATE NOCASE)")
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_bens_situacao ON bens(situacao)")
+    _criar_indice_busca(cursor)
+    conn.commit()
+    _ESTRUTURA_VERIFICADA.add(db_path)
+
+def _criar_indice_busca(cursor: sqlite3.Cursor):
+    """
+    Índice de trigramas (FTS5) sobre número e nome, mantido por gatilhos.
+    Em SQLite sem FTS5/trigram a busca continua funcionando com LIKE.
+    """
+    cursor.execute("SELECT 1 FROM sqlite_master WHERE name = 'bens_busca'")
+    if cursor.fetchone():
+        return
+
+    try:
+        cursor.execute("""
+            CREATE VIRTUAL TABLE bens_busca USING fts5(
+                numero, nome, content='bens', content_rowid='id', tokenize='trigram'
+            )
+        """)
+    except sqlite3.OperationalError as e:
+        logger.warning(f"Índice de trigramas indisponível ({str(e)}); a busca usará LIKE")
+        return
+
+    _criar_gatilhos_busca(cursor)
+    reconstruir_indice_busca(cursor)
+
+def _criar_gatilhos_busca(cursor: sqlite3.Cursor):
+    cursor.execute("""
+        CREATE TRIGGER IF NOT EXISTS bens_busca_ai AFTER INSERT ON bens BEGIN
+            INSERT INTO bens_busca (rowid, numero, nome) VALUES (new.id, new.numero, new.nome);
+        END
+    """)
+    cursor.execute("""
+        CREATE TRIGGER IF NOT EXISTS bens_busca_ad AFTER DELETE ON bens BEGIN
+            INSERT INTO bens_busca (bens_busca, rowid, numero, nome) VALUES ('delete', old.id, old.numero, old.nome);
+        END
+    """)
+    cursor.execute("""
+        CREATE TRIGGER IF NOT EXISTS bens_busca_au AFTER UPDATE OF numero, nome ON bens BEGIN
+            INSERT INTO bens_busca (bens_busca, rowid, numero, nome) VALUES ('delete', old.id, old.numero, old.nome);
+            INSERT INTO bens_busca (rowid, numero, nome) VALUES (new.id, new.numero, new.nome);
+        END
+    """)
+
+def _criar_registro_alteracoes(cursor: sqlite3.Cursor):
+    """
+    Última versão em que cada número mudou (cadastro ou estado na campanha), mantida por gatilhos.
+    Uma linha por número: o tamanho não cresce com o número de alterações.
+    """
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS alteracoes_bens (
+            numero TEXT PRIMARY KEY,
+            versao INTEGER NOT NULL
+        ) WITHOUT ROWID
+    """)
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_alteracoes_bens_versao ON alteracoes_bens(versao)")
+    registrar = """
+        INSERT INTO alteracoes_bens (numero, versao)
+        VALUES ({numero}, (SELECT versao FROM controle_versao WHERE id = 1))
+        ON CONFLICT (numero) DO UPDATE SET versao = excluded.versao;
+    """
+    for tabela in ('bens', 'estado_campanha'):
+        cursor.execute(f"""
+            CREATE TRIGGER IF NOT EXISTS {tabela}_alteracoes_ai AFTER INSERT ON {tabela} BEGIN
+                {registrar.format(numero='new.numero')}
+            END
+        """)
+        cursor.execute(f"""
+            CREATE TRIGGER IF NOT EXISTS {tabela}_alteracoes_ad AFTER DELETE ON {tabela} BEGIN
+                {registrar.format(numero='old.numero')}
+            END
+        """)
+        cursor.execute(f"""
+            CREATE TRIGGER IF NOT EXISTS {tabela}_alteracoes_au AFTER UPDATE ON {tabela} BEGIN
+                {registrar.format(numero='old.numero')}
+                {registrar.format(numero='new.numero')}
+            END
+        """)
+
+# Gatilhos de bens/estado_campanha que uma carga em massa substitui por reconstruções no fim
+GATILHOS_CARGA = [f"{tabela}_alteracoes_{sufixo}" for tabela in ('bens', 'estado_campanha') for sufixo in ('ai', 'ad', 'au')] \
+    + ['bens_busca_ai', 'bens_busca_ad', 'bens_busca_au']
+
+def suspender_gatilhos_carga(cursor: sqlite3.Cursor):
+    """
+    Remove os gatilhos linha a linha (índice de busca e alteracoes_bens) antes de uma carga em massa.
+    Na mesma transação, restaurar_gatilhos_carga os recria; em caso de rollback eles voltam sozinhos.
+    """
+    for nome in GATILHOS_CARGA:
+        cursor.execute(f"DROP TRIGGER IF EXISTS {nome}")
+
+def restaurar_gatilhos_carga(cursor: sqlite3.Cursor):
+    """Reconstrói o índice de busca e recria os gatilhos removidos por suspender_gatilhos_carga"""
+    cursor.execute("SELECT 1 FROM sqlite_master WHERE name = 'bens_busca'")
+    if cursor.fetchone():
+        reconstruir_indice_busca(cursor)
+        _criar_gatilhos_busca(cursor)
+    _criar_registro_alteracoes(cursor)
+
+def registrar_reinicio_offline(cursor: sqlite3.Cursor):
+    """
+    Alteração em massa (importação, troca de campanha, restauração): clientes offline
+    com versão anterior baixam o snapshot completo. Chamar depois de registrar_escrita.
+    """
+    cursor.execute("UPDATE controle_versao SET versao_reinicio = versao WHERE id = 1")
+    cursor.execute("DELETE FROM alteracoes_bens")
+
+def reconstruir_indice_busca(cursor: sqlite3.Cursor):
+    """Reconstrói o índice de busca a partir de bens (após cargas em massa)"""
+    cursor.execute("SELECT 1 FROM sqlite_master WHERE name = 'bens_busca'")
+    if cursor.fetchone():
+        cursor.execute("INSERT INTO bens_busca (bens_busca) VALUES ('rebuild')")
+
+def _adicionar_coluna(cursor: sqlite3.Cursor, tabela: str, coluna: str, tipo: str) -> bool:
+    """Adiciona a coluna se ainda não existir; retorna True se foi criada agora"""
+    cursor.execute(f"PRAGMA table_info({tabela})")
+    if coluna in [c[1] for c in cursor.fetchall()]:
+        return False
+    cursor.execute(f"ALTER TABLE {tabela} ADD COLUMN {coluna} {tipo}")
+    return True
+
+def _popular_locais(cursor: sqlite3.Cursor, incluir_historico: bool = False):
+    """
+    Preenche o dicionário de locais a partir dos textos livres já gravados e
+    normaliza esses textos ("sala 101 ", "SALA-101" -> mesmo local).
+    """
+    tabelas = ['bens'] + (['estado_campanha', 'leituras'] if incluir_historico else [])
+    for tabela in tabelas:
+        cursor.execute(f"""
+            SELECT DISTINCT localizacao FROM {tabela}
+            WHERE local_id IS NULL AND localizacao IS NOT NULL AND localizacao != ''
+        """)
+        for (texto,) in cursor.fetchall():
+            local_id, nome = obter_ou_criar_local(cursor, texto)
+            cursor.execute(f"""
+                UPDATE {tabela} SET local_id = ?, localizacao = ?
+                WHERE local_id IS NULL AND localizacao = ?
+            """, (local_id, nome, texto))
+    atualizar_uso_locais(cursor)
+    logger.info("Dicionário de locais atualizado a partir das localizações existentes")
+
+def _migrar_para_campanhas(cursor: sqlite3.Cursor):
+    """
+    Cria a primeira campanha e move para ela as leituras já feitas em bens.
+    A partir daqui 'OK' nunca é gravado em bens.situacao: localizado é por campanha.
+    """
+    cursor.execute("INSERT INTO campanhas (nome, ativa) VALUES ('Inventário inicial', 1)")
+    campanha_id = cursor.lastrowid
+    cursor.execute("""
+        INSERT OR IGNORE INTO estado_campanha (campanha_id, numero, situacao, localizacao, data_localizacao)
+        SELECT ?, numero, situacao, localizacao, data_localizacao
+        FROM bens
+        WHERE situacao = 'OK' OR data_localizacao IS NOT NULL
+    """, (campanha_id,))
+    cursor.execute("UPDATE bens SET situacao = 'Pendente', data_localizacao = NULL WHERE situacao = 'OK'")
+    cursor.execute("UPDATE leituras SET campanha_id = ? WHERE campanha_id = 0", (campanha_id,))
+    cursor.execute("UPDATE leituras_resumo SET campanha_id = ? WHERE campanha_id = 0", (campanha_id,))
+    logger.info(f"Estrutura de campanhas criada; leituras existentes movidas para a campanha {campanha_id}")
+
+# Campanha em uso: subconsulta avaliada uma única vez por comando SQL
+SQL_CAMPANHA_ATIVA = "(SELECT id FROM campanhas WHERE ativa = 1)"
+
+# Cadastro (b) + estado da campanha ativa (e). Localizado só existe em e.
+JUNCAO_CAMPANHA = f"bens b LEFT JOIN estado_campanha e ON e.campanha_id = {SQL_CAMPANHA_ATIVA} AND e.numero = b.numero"
+COLUNA_SITUACAO = "COALESCE(e.situacao, b.situacao)"
+COLUNA_LOCALIZACAO = "COALESCE(NULLIF(e.localizacao, ''), b.localizacao)"
+FILTRO_LOCALIZADOS = "e.situacao = 'OK'"
+FILTRO_NAO_LOCALIZADOS = "(e.situacao IS NULL OR e.situacao != 'OK')"
+
+COLUNA_LOCAL_ID = "COALESCE(e.local_id, b.local_id)"
+
+def chave_local(texto: str) -> str:
+    """Chave de comparação de um local: minúsculas, sem acentos e com separadores unificados"""
+    texto = unicodedata.normalize('NFKD', str(texto or '').lower())
+    texto = ''.join(c for c in texto if not unicodedata.combining(c))
+    return ' '.join(re.findall(r'[a-z0-9]+', texto))
+
+def normalizar_local(texto: Optional[str]) -> Tuple[str, str]:
+    """(nome com espaços normalizados, chave) de um texto de localização; ('', '') se vazio"""
+    nome = ' '.join(str(texto or '').split())
+    if not nome:
+        return '', ''
+    return nome, chave_local(nome) or nome.lower()
+
+def obter_ou_criar_local(cursor: sqlite3.Cursor, texto: Optional[str]) -> Tuple[Optional[int], str]:
+    """
+    Retorna (id, nome) do local correspondente ao texto, criando-o se necessário.
+    O nome exibido é a primeira grafia encontrada (com espaços normalizados).
+    """
+    nome, chave = normalizar_local(texto)
+    if not nome:
+        return None, ''
+    cursor.execute("SELECT id, nome FROM locais WHERE chave = ?", (chave,))
+    local = cursor.fetchone()
+    if local:
+        return local[0], local[1]
+    cursor.execute("INSERT INTO locais (nome, chave) VALUES (?, ?)", (nome, chave))
+    return cursor.lastrowid, nome
+
+def atualizar_uso_locais(cursor: sqlite3.Cursor):
+    """Recalcula a popularidade dos locais (bens cadastrados + leituras) usada no autocompletar"""
+    cursor.execute("""
+        UPDATE locais SET total_usos =
+            (SELECT COUNT(*) FROM bens WHERE bens.local_id = locais.id) +
+            (SELECT COUNT(*) FROM leituras WHERE leituras.local_id = locais.id)
+    """)
+
+def _filtro_tipo(tipo: str) -> Optional[str]:
+    """Condição SQL para o tipo de listagem (localizados / nao-localizados / todos)"""
+    if tipo == 'localizados':
+        return FILTRO_LOCALIZADOS
+    if tipo == 'nao-localizados':
+        return FILTRO_NAO_LOCALIZADOS
+    return None
+
+def registrar_estado_campanha(cursor: sqlite3.Cursor, numero_bem: str, situacao: str,
+                              localizacao: Optional[str] = None, localizado_agora: bool = False):
+    """Grava (upsert) o estado de um bem na campanha ativa"""
+    local_id, localizacao = obter_ou_criar_local(cursor, localizacao)
+    cursor.execute(f"""
+        INSERT INTO estado_campanha (campanha_id, numero, situacao, localizacao, local_id, data_localizacao)
+        VALUES ({SQL_CAMPANHA_ATIVA}, ?, ?, ?, ?, CASE WHEN ? THEN datetime('now') END)
+        ON CONFLICT (campanha_id, numero) DO UPDATE SET
+            situacao = excluded.situacao,
+            localizacao = COALESCE(excluded.localizacao, estado_campanha.localizacao),
+            local_id = COALESCE(excluded.local_id, estado_campanha.local_id),
+            data_localizacao = COALESCE(excluded.data_localizacao, estado_campanha.data_localizacao)
+    """, (numero_bem, situacao, localizacao or None, local_id, 1 if localizado_agora else 0))
+
+def registrar_escrita(cursor: sqlite3.Cursor):
+    """Incrementa a versão de escrita; chamar antes do commit da alteração"""
+    cursor.execute("""
+        UPDATE controle_versao
+        SET versao = versao + 1, atualizado_em = datetime('now')
+        WHERE id = 1
+    """)
+
+def registrar_leitura(cursor: sqlite3.Cursor, numero_bem: str, localizacao: Optional[str],
+                      situacao_anterior: Optional[str], data_leitura: Optional[str] = None,
+                      origem_id: Optional[str] = None):
+    """
+    Grava a leitura no histórico e atualiza o resumo por hora/local/campanha.
+    Deve rodar na mesma transação que marca o bem como localizado.
+    data_leitura (UTC, 'AAAA-MM-DD HH:MM:SS') e origem_id vêm das leituras feitas offline.
+    """
+    local_id, localizacao = obter_ou_criar_local(cursor, localizacao)
+    cursor.execute(f"""
+        INSERT INTO leituras (numero, localizacao, local_id, situacao_anterior, campanha_id, data_leitura, origem_id)
+        VALUES (?, ?, ?, ?, COALESCE({SQL_CAMPANHA_ATIVA}, 0), COALESCE(?, datetime('now')), ?)
+    """, (numero_bem, localizacao, local_id, situacao_anterior, data_leitura, origem_id))
+    cursor.execute(f"""
+        INSERT INTO leituras_resumo (campanha_id, local_id, hora, total)
+        VALUES (COALESCE({SQL_CAMPANHA_ATIVA}, 0), ?, strftime('%Y-%m-%d %H:00', COALESCE(?, 'now'), 'localtime'), 1)
+        ON CONFLICT (campanha_id, local_id, hora) DO UPDATE SET total = total + 1
+    """, (local_id or 0, data_leitura))
+    if local_id:
+        cursor.execute("UPDATE locais SET total_usos = total_usos + 1 WHERE id = ?", (local_id,))
+
+def obter_versao_escrita(db_path: str) -> Tuple[int, Optional[str]]:
+    """Retorna (versão, data UTC da última escrita) para validação de caches"""
+    try:
+        with get_db_connection(db_path) as conn:
+            cursor = conn.cursor()
+            cursor.execute("SELECT versao, atualizado_em FROM controle_versao WHERE id = 1")
+            resultado = cursor.fetchone()
+            return (resultado['versao'], resultado['atualizado_em']) if resultado else (0, None)
+            
+    except Exception as e:
+        logger.error(f"Erro ao obter versão de escrita: {str(e)}")
+        return 0, None
+
 def verificar_bem(numero_bem: str, db_path: str) -> Tuple[bool, Optional[str]]:
     """Verifica se um bem existe no banco de dados"""
     try:
@@ -30,36 +465,36 @@ def verificar_bem(numero_bem: str, db_path: str) -> Tuple[bool, Optional[str]]:
         logger.error(f"Erro ao verificar bem {numero_bem}: {str(e)}")
         return False, f"Erro ao verificar bem: {str(e)}"
 
+@escritor.operacao('marcar_bem_localizado')
+def _gravar_localizacao(cursor: sqlite3.Cursor, numero_bem: str, localizacao: Optional[str]) -> bool:
+    # Verificar se o bem existe primeiro (e guardar o estado anterior para o histórico)
+    cursor.execute(f"""
+        SELECT {COLUNA_SITUACAO} AS situacao, {COLUNA_LOCALIZACAO} AS localizacao
+        FROM {JUNCAO_CAMPANHA}
+        WHERE b.numero = ?
+    """, (numero_bem,))
+    anterior = cursor.fetchone()
+    if anterior is None:
+        return False
+
+    # Atualizar a situação e localização na campanha ativa
+    registrar_estado_campanha(cursor, numero_bem, 'OK', localizacao, localizado_agora=True)
+    registrar_leitura(cursor, numero_bem, localizacao or anterior['localizacao'], anterior['situacao'])
+    return True
+
 def marcar_bem_localizado(numero_bem: str, db_path: str, localizacao: Optional[str] = None) -> str:
-    """Marca um bem como localizado no banco de dados"""
+    """Marca um bem como localizado no banco de dados (commit agrupado pelo escritor)"""
     try:
-        with get_db_connection(db_path) as conn:
-            cursor = conn.cursor()
-            
-            # Verificar se o bem existe primeiro
-            cursor.execute("SELECT COUNT(*) FROM bens WHERE numero = ?", (numero_bem,))
-            if cursor.fetchone()[0] == 0:
-                return f"Bem {numero_bem} não encontrado no banco de dados"
-            
-            # Atualizar a situação e localização
-            if localizacao:
-                cursor.execute("""
-                    UPDATE bens 
-                    SET situacao = 'OK', localizacao = ?, data_localizacao = datetime('now')
-                    WHERE numero = ?
-                """, (localizacao, numero_bem))
-                mensagem = f"✅ Bem {numero_bem} marcado como localizado em '{localizacao}'!"
-            else:
-                cursor.execute("""
-                    UPDATE bens 
-                    SET situacao = 'OK', data_localizacao = datetime('now')
-                    WHERE numero = ?
-                """, (numero_bem,))
-                mensagem = f"✅ Bem {numero_bem} marcado como localizado!"
-            
-            conn.commit()
-            logger.info(mensagem)
-            return mensagem
+        if not escritor.executar(db_path, 'marcar_bem_localizado', numero_bem, localizacao):
+            return f"Bem {numero_bem} não encontrado no banco de dados"
+
+        if localizacao:
+            mensagem = f"✅ Bem {numero_bem} marcado como localizado em '{localizacao}'!"
+        else:
+            mensagem = f"✅ Bem {numero_bem} marcado como localizado!"
+        logger.info(mensagem)
+        difusor.publicar(db_path, 'leitura', {'numero': numero_bem, 'localizacao': localizacao})
+        return mensagem
             
     except Exception as e:
         error_msg = f"Erro ao marcar bem {numero_bem} como localizado: {str(e)}"
@@ -71,7 +506,8 @@ def buscar_localizacao_existente(numero_bem: str, db_path: str) -> Optional[str]
     try:
         with get_db_connection(db_path) as conn:
             cursor = conn.cursor()
-            cursor.execute("SELECT localizacao FROM bens WHERE numero = ?", (numero_bem,))
+            cursor.execute(f"SELECT {COLUNA_LOCALIZACAO} AS localizacao FROM {JUNCAO_CAMPANHA} WHERE b.numero = ?",
+                           (numero_bem,))
             resultado = cursor.fetchone()
             
             localizacao = resultado['localizacao'] if resultado and resultado['localizacao'] else None
@@ -102,53 +538,85 @@ def verificar_numero_existe(db_path, numero_bem):
 
 
 
-def gerar_planilhas_localizacao(db_path: str) -> Tuple[List[Dict], List[Dict]]:
-    """Gera listas de bens localizados e não localizados a partir do banco"""
+# Registro compacto de um bem nas leituras em massa: tupla (sem sqlite3.Row nem dict por linha)
+RegistroBem = namedtuple('RegistroBem', ['id', 'numero', 'nome', 'localizacao', 'situacao'])
+
+# Linhas buscadas por vez (fetchmany) nas leituras em massa
+LOTE_LEITURA = 1000
+
+def _consulta_bens(tipo: str, termo: Optional[str], ordenar: str,
+                   limite: Optional[int], inicio: int) -> Tuple[str, List]:
+    """SQL e parâmetros da leitura em massa de bens (ver iterar_bens)"""
+    condicoes, parametros = [], []
+    filtro = _filtro_tipo(tipo)
+    if filtro:
+        condicoes.append(filtro)
+    if termo:
+        condicoes.append("(b.nome LIKE ? OR b.numero LIKE ?)")
+        parametros += [f'%{termo}%', f'%{termo}%']
+    where = f"WHERE {' AND '.join(condicoes)}" if condicoes else ""
+    consulta = f"""
+        SELECT b.id, b.numero, b.nome, {COLUNA_LOCALIZACAO} AS localizacao, {COLUNA_SITUACAO} AS situacao
+        FROM {JUNCAO_CAMPANHA}
+        {where}
+        ORDER BY {COLUNAS_ORDENACAO.get(ordenar, 'b.id')}
+    """
+    if limite is not None:
+        consulta += " LIMIT ? OFFSET ?"
+        parametros += [limite, inicio]
+    return consulta, parametros
+
+def _percorrer_bens(conn: sqlite3.Connection, consulta: str, parametros: List) -> Iterator[RegistroBem]:
+    cursor = conn.cursor()
+    cursor.row_factory = None  # tuplas simples
+    cursor.execute(consulta, parametros)
+    while True:
+        linhas = cursor.fetchmany(LOTE_LEITURA)
+        if not linhas:
+            break
+        yield from map(RegistroBem._make, linhas)
+
+def iterar_bens(db_path: str, tipo: str = 'todos', termo: Optional[str] = None, ordenar: str = 'id',
+                limite: Optional[int] = None, inicio: int = 0) -> Iterator[RegistroBem]:
+    """
+    Percorre os bens da campanha ativa em lotes, como RegistroBem, sem materializar a lista:
+    a conexão fica aberta enquanto o consumidor lê. 'termo' filtra por nome ou número (LIKE);
+    'ordenar' aceita as chaves de COLUNAS_ORDENACAO. Erros do banco chegam ao consumidor
+    (uma listagem nunca termina cortada em silêncio).
+    """
+    consulta, parametros = _consulta_bens(tipo, termo, ordenar, limite, inicio)
     try:
         with get_db_connection(db_path) as conn:
-            cursor = conn.cursor()
-            
-            # Buscar bens localizados (situacao = 'OK')
-            cursor.execute("SELECT nome, numero, situacao, localizacao FROM bens WHERE situacao = 'OK'")
-            localizados = [dict(row) for row in cursor.fetchall()]
-            
-            # Buscar bens não localizados (situacao != 'OK' ou NULL)
-            cursor.execute("SELECT nome, numero, situacao, localizacao FROM bens WHERE situacao != 'OK' OR situacao IS NULL")
-            nao_localizados = [dict(row) for row in cursor.fetchall()]
-            
-            logger.info(f"Geradas listas: {len(localizados)} localizados, {len(nao_localizados)} não localizados")
-            return localizados, nao_localizados
-            
-    except Exception as e:
-        logger.error(f"Erro ao gerar planilhas de localização: {str(e)}")
-        return [], []
+            yield from _percorrer_bens(conn, consulta, parametros)
+
+    except sqlite3.Error as e:
+        logger.error(f"Erro ao percorrer bens ({tipo}): {str(e)}")
+        raise
+
+def gerar_planilhas_localizacao(db_path: str) -> Tuple[Iterator[RegistroBem], Iterator[RegistroBem]]:
+    """Bens localizados e não localizados (iteradores: cada um é lido do banco ao ser percorrido)"""
+    return iterar_bens(db_path, 'localizados'), iterar_bens(db_path, 'nao-localizados')
 
 def obter_bens_paginados(db_path: str, tipo: str, pagina: int = 1, por_pagina: int = 200):
-    """Obtém bens com paginação"""
+    """Obtém bens com paginação (página e total lidos na mesma transação)"""
     try:
         with get_db_connection(db_path) as conn:
             cursor = conn.cursor()
-            
-            # Calcular offset
-            offset = (pagina - 1) * por_pagina
-            
-            # Query base
-            if tipo == 'localizados':
-                query = "SELECT nome, numero, situacao, localizacao FROM bens WHERE situacao = 'OK'"
-            elif tipo == 'nao-localizados':
-                query = "SELECT nome, numero, situacao, localizacao FROM bens WHERE situacao != 'OK' OR situacao IS NULL"
-            else:
-                query = "SELECT nome, numero, situacao, localizacao FROM bens"
-            
-            # Query com paginação
-            query_paginada = f"{query} LIMIT {por_pagina} OFFSET {offset}"
-            
-            cursor.execute(query_paginada)
-            dados = [dict(row) for row in cursor.fetchall()]
-            
-            # Obter total de registros
-            cursor.execute(f"SELECT COUNT(*) FROM ({query})")
-            total_registros = cursor.fetchone()[0]
+            cursor.execute("BEGIN")
+            try:
+                # Calcular offset
+                offset = (pagina - 1) * por_pagina
+                
+                # Página como RegistroBem (tuplas)
+                consulta, parametros = _consulta_bens(tipo, None, 'id', por_pagina, offset)
+                dados = list(_percorrer_bens(conn, consulta, parametros))
+                
+                # Obter total de registros
+                filtro = _filtro_tipo(tipo)
+                cursor.execute(f"SELECT COUNT(*) FROM {JUNCAO_CAMPANHA}" + (f" WHERE {filtro}" if filtro else ""))
+                total_registros = cursor.fetchone()[0]
+            finally:
+                conn.rollback()
             
             # Calcular total de páginas
             total_paginas = (total_registros + por_pagina - 1) // por_pagina
@@ -171,25 +639,135 @@ def obter_bens_paginados(db_path: str, tipo: str, pagina: int = 1, por_pagina: i
             'total_paginas': 0
         }
 
+# Colunas aceitas para ordenação na listagem (nome externo -> expressão SQL)
+COLUNAS_ORDENACAO = {
+    'numero': 'b.numero',
+    'nome': 'b.nome COLLATE NOCASE',
+    'localizacao': f'{COLUNA_LOCALIZACAO} COLLATE NOCASE',
+    'situacao': COLUNA_SITUACAO
+}
+
+def listar_bens(db_path: str, tipo: str = 'todos', ordenar: str = 'numero', direcao: str = 'asc',
+                localizacao: Optional[str] = None, situacao: Optional[str] = None,
+                inicio: int = 0, quantidade: int = 200, contar: bool = True) -> Dict:
+    """
+    Obtém uma janela de bens com ordenação e filtros no servidor.
+    Retorna linhas compactas (listas) na ordem de 'colunas'; o total só é
+    calculado quando 'contar' for verdadeiro.
+    """
+    colunas = ['id', 'numero', 'nome', 'localizacao', 'situacao']
+    try:
+        condicoes, parametros = [], []
+        filtro = _filtro_tipo(tipo)
+        if filtro:
+            condicoes.append(filtro)
+
+        chave = chave_local(localizacao) if localizacao else ''
+        if chave:
+            # Prefixo na chave normalizada do local -> comparação por id
+            condicoes.append(f"{COLUNA_LOCAL_ID} IN (SELECT id FROM locais WHERE chave >= ? AND chave < ?)")
+            parametros.extend([chave, chave + '\uffff'])
+
+        if situacao:
+            condicoes.append(f"{COLUNA_SITUACAO} = ?")
+            parametros.append(situacao)
+
+        where = f"WHERE {' AND '.join(condicoes)}" if condicoes else ""
+        coluna = COLUNAS_ORDENACAO.get(ordenar, 'b.numero')
+        sentido = 'DESC' if str(direcao).lower() == 'desc' else 'ASC'
+
+        with get_db_connection(db_path) as conn:
+            cursor = conn.cursor()
+            cursor.execute(f"""
+                SELECT b.id, b.numero, b.nome, {COLUNA_LOCALIZACAO} AS localizacao, {COLUNA_SITUACAO} AS situacao
+                FROM {JUNCAO_CAMPANHA}
+                {where}
+                ORDER BY {coluna} {sentido}, b.id {sentido}
+                LIMIT ? OFFSET ?
+            """, (*parametros, quantidade, inicio))
+            linhas = [list(row) for row in cursor.fetchall()]
+
+            total = None
+            if contar:
+                cursor.execute(f"SELECT COUNT(*) FROM {JUNCAO_CAMPANHA} {where}", parametros)
+                total = cursor.fetchone()[0]
+
+            return {'colunas': colunas, 'linhas': linhas, 'inicio': inicio, 'total': total}
+
+    except Exception as e:
+        logger.error(f"Erro ao listar bens: {str(e)}")
+        return {'colunas': colunas, 'linhas': [], 'inicio': inicio, 'total': 0}
+
+def listar_locais_bens(db_path: str, tipo: str = 'todos', limite: int = 500) -> List[Dict]:
+    """Retorna as localizações distintas com a quantidade de bens (faceta de filtro)"""
+    try:
+        filtro = _filtro_tipo(tipo)
+        where = f"AND {filtro}" if filtro else ""
+
+        with get_db_connection(db_path) as conn:
+            cursor = conn.cursor()
+            cursor.execute(f"""
+                SELECT l.id, l.nome AS localizacao, COUNT(*) AS quantidade
+                FROM {JUNCAO_CAMPANHA}
+                JOIN locais l ON l.id = {COLUNA_LOCAL_ID}
+                WHERE 1 = 1 {where}
+                GROUP BY l.id
+                ORDER BY quantidade DESC
+                LIMIT ?
+            """, (limite,))
+            return [dict(row) for row in cursor.fetchall()]
+
+    except Exception as e:
+        logger.error(f"Erro ao listar localizações: {str(e)}")
+        return []
+
+@lru_cache(maxsize=1024)
+def _consultar_locais_prefixo(db_path: str, marca: int, chave: str, limite: int) -> Tuple[Tuple, ...]:
+    # 'marca' (maior id de locais) entra na chave do cache: local novo invalida as entradas
+    with get_db_connection(db_path) as conn:
+        cursor = conn.cursor()
+        if chave:
+            cursor.execute("""
+                SELECT id, nome, total_usos FROM locais
+                WHERE chave >= ? AND chave < ?
+                ORDER BY total_usos DESC, chave
+                LIMIT ?
+            """, (chave, chave + '\uffff', limite))
+        else:
+            cursor.execute("SELECT id, nome, total_usos FROM locais ORDER BY total_usos DESC, chave LIMIT ?", (limite,))
+        return tuple(tuple(row) for row in cursor.fetchall())
+
+def sugerir_locais(db_path: str, prefixo: str = '', limite: int = 10) -> List[Dict]:
+    """Autocompletar de locais pelo início do nome (ignora maiúsculas, acentos e separadores)"""
+    try:
+        with get_db_connection(db_path) as conn:
+            marca = conn.execute("SELECT COALESCE(MAX(id), 0) FROM locais").fetchone()[0]
+        linhas = _consultar_locais_prefixo(db_path, marca, chave_local(prefixo), limite)
+        return [{'id': id_, 'nome': nome, 'total_usos': usos} for id_, nome, usos in linhas]
+
+    except Exception as e:
+        logger.error(f"Erro ao sugerir locais para '{prefixo}': {str(e)}")
+        return []
+
 def contar_bens(db_path: str):
     """Retorna contagem total de bens por situação"""
     try:
         with get_db_connection(db_path) as conn:
             cursor = conn.cursor()
             
-            cursor.execute("""
+            # Localizados: só as linhas da campanha ativa (índice por campanha/situação)
+            cursor.execute(f"""
                 SELECT 
-                    COUNT(*) as total,
-                    SUM(CASE WHEN situacao = 'OK' THEN 1 ELSE 0 END) as localizados,
-                    SUM(CASE WHEN situacao != 'OK' OR situacao IS NULL THEN 1 ELSE 0 END) as nao_localizados
-                FROM bens
+                    (SELECT COUNT(*) FROM bens) as total,
+                    (SELECT COUNT(*) FROM estado_campanha e JOIN bens b ON b.numero = e.numero
+                     WHERE e.campanha_id = {SQL_CAMPANHA_ATIVA} AND e.situacao = 'OK') as localizados
             """)
             
             resultado = cursor.fetchone()
             return {
                 'total': resultado['total'],
                 'localizados': resultado['localizados'],
-                'nao_localizados': resultado['nao_localizados']
+                'nao_localizados': resultado['total'] - resultado['localizados']
             }
 
          
@@ -199,62 +777,102 @@ def contar_bens(db_path: str):
     
     
 def obter_bem_por_numero(db_path: str, numero_bem: str):
-    """Obtém todos os dados de um bem específico"""
+    """
+    Obtém todos os dados de um bem específico. O resultado (inclusive "não encontrado") fica
+    em cache enquanto a versão do próprio bem em alteracoes_bens não mudar.
+    """
     try:
         with get_db_connection(db_path) as conn:
             cursor = conn.cursor()
-            cursor.execute("""
-                SELECT id, numero, nome, localizacao, situacao, 
-                       data_criacao, data_localizacao 
-                FROM bens WHERE numero = ?
-            """, (numero_bem,))
-            
-            resultado = cursor.fetchone()
-            return dict(resultado) if resultado else None
+            # Versão e dados lidos na mesma transação
+            cursor.execute("BEGIN")
+            try:
+                cursor.execute("""
+                    SELECT versao, versao_reinicio, (SELECT versao FROM alteracoes_bens WHERE numero = ?)
+                    FROM controle_versao WHERE id = 1
+                """, (numero_bem,))
+                versao, reinicio, alterado_em = cursor.fetchone()
+
+                # O gatilho grava a versão de antes do incremento: alteração em >= versão lida é posterior
+                def vigente(marca):
+                    return (marca[1] == reinicio and marca[0] <= versao
+                            and (alterado_em is None or alterado_em < marca[0]))
+
+                achou, bem = cache_bens.obter((db_path, numero_bem), vigente)
+                if not achou:
+                    cursor.execute(f"""
+                        SELECT b.id, b.numero, b.nome, {COLUNA_LOCALIZACAO} AS localizacao, {COLUNA_SITUACAO} AS situacao, 
+                               b.data_criacao, e.data_localizacao 
+                        FROM {JUNCAO_CAMPANHA} WHERE b.numero = ?
+                    """, (numero_bem,))
+                    resultado = cursor.fetchone()
+                    bem = dict(resultado) if resultado else None
+                    cache_bens.guardar((db_path, numero_bem), (versao, reinicio), bem)
+            finally:
+                conn.rollback()
+
+            return dict(bem) if bem else None
             
     except Exception as e:
         logger.error(f"Erro ao obter bem {numero_bem}: {str(e)}")
         return None
 
+@escritor.operacao('atualizar_bem')
+def _gravar_atualizacao(cursor: sqlite3.Cursor, bem_id: int, dados: dict) -> Optional[str]:
+    cursor.execute("UPDATE bens SET nome = ? WHERE id = ?", (dados['nome'], bem_id))
+    cursor.execute("SELECT numero FROM bens WHERE id = ?", (bem_id,))
+    bem = cursor.fetchone()
+    if bem:
+        registrar_estado_campanha(cursor, bem['numero'], dados['situacao'], dados['localizacao'])
+        return bem['numero']
+    return None
+
 def atualizar_bem(db_path: str, bem_id: int, dados: dict):
-    """Atualiza os dados de um bem"""
+    """
+    Atualiza os dados de um bem: o nome vai para o cadastro e a
+    situação/localização para o estado do bem na campanha ativa
+    """
     try:
-        with get_db_connection(db_path) as conn:
-            cursor = conn.cursor()
-            cursor.execute("""
-                UPDATE bens 
-                SET nome = ?, localizacao = ?, situacao = ?
-                WHERE id = ?
-            """, (dados['nome'], dados['localizacao'], dados['situacao'], bem_id))
-            
-            conn.commit()
-            logger.info(f"Bem {bem_id} atualizado com sucesso")
-            return True, "✅ Bem atualizado com sucesso!"
+        numero = escritor.executar(db_path, 'atualizar_bem', bem_id, dados)
+        if numero:
+            supressor_leituras.descartar(numero)
+        logger.info(f"Bem {bem_id} atualizado com sucesso")
+        difusor.publicar(db_path, 'alteracao')
+        return True, "✅ Bem atualizado com sucesso!"
             
     except Exception as e:
         logger.error(f"Erro ao atualizar bem {bem_id}: {str(e)}")
         return False, f"❌ Erro ao atualizar bem: {str(e)}"
 
+@escritor.operacao('criar_novo_bem')
+def _gravar_novo_bem(cursor: sqlite3.Cursor, dados: dict) -> bool:
+    # Verificar se já existe
+    cursor.execute("SELECT COUNT(*) FROM bens WHERE numero = ?", (dados['numero'],))
+    if cursor.fetchone()[0] > 0:
+        return False
+    
+    # Inserir novo registro ('OK' é estado da campanha, não do cadastro)
+    localizado = dados['situacao'] == 'OK'
+    local_id, localizacao = obter_ou_criar_local(cursor, dados['localizacao'])
+    cursor.execute("""
+        INSERT INTO bens (numero, nome, localizacao, local_id, situacao, data_criacao)
+        VALUES (?, ?, ?, ?, ?, datetime('now'))
+    """, (dados['numero'], dados['nome'], localizacao, local_id,
+          'Pendente' if localizado else dados['situacao']))
+    if localizado:
+        registrar_estado_campanha(cursor, dados['numero'], 'OK', dados['localizacao'], localizado_agora=True)
+    return True
+
 def criar_novo_bem(db_path: str, dados: dict):
     """Cria um novo bem no sistema"""
     try:
-        with get_db_connection(db_path) as conn:
-            cursor = conn.cursor()
-            
-            # Verificar se já existe
-            cursor.execute("SELECT COUNT(*) FROM bens WHERE numero = ?", (dados['numero'],))
-            if cursor.fetchone()[0] > 0:
-                return False, "❌ Já existe um bem com este número!"
-            
-            # Inserir novo registro
-            cursor.execute("""
-                INSERT INTO bens (numero, nome, localizacao, situacao, data_criacao)
-                VALUES (?, ?, ?, ?, datetime('now'))
-            """, (dados['numero'], dados['nome'], dados['localizacao'], dados['situacao']))
-            
-            conn.commit()
-            logger.info(f"Novo bem criado: {dados['numero']} - {dados['nome']}")
-            return True, "✅ Bem cadastrado com sucesso!"
+        if not escritor.executar(db_path, 'criar_novo_bem', dados):
+            return False, "❌ Já existe um bem com este número!"
+        
+        logger.info(f"Novo bem criado: {dados['numero']} - {dados['nome']}")
+        filtro_numeros.adicionar(db_path, dados['numero'])
+        difusor.publicar(db_path, 'alteracao')
+        return True, "✅ Bem cadastrado com sucesso!"
             
     except sqlite3.IntegrityError:
         return False, "❌ Erro: Já existe um bem com este número!"
@@ -262,38 +880,99 @@ def criar_novo_bem(db_path: str, dados: dict):
         logger.error(f"Erro ao criar novo bem: {str(e)}")
         return False, f"❌ Erro ao criar bem: {str(e)}"
 
+@escritor.operacao('excluir_bem')
+def _gravar_exclusao(cursor: sqlite3.Cursor, bem_id: int) -> str:
+    cursor.execute("SELECT numero FROM bens WHERE id = ?", (bem_id,))
+    bem = cursor.fetchone()
+    
+    cursor.execute("DELETE FROM bens WHERE id = ?", (bem_id,))
+    cursor.execute("DELETE FROM estado_campanha WHERE numero = ?", (bem['numero'],))
+    return bem['numero']
+
 def excluir_bem(db_path: str, bem_id: int):
     """Exclui um bem do sistema"""
     try:
-        with get_db_connection(db_path) as conn:
-            cursor = conn.cursor()
-            cursor.execute("SELECT numero FROM bens WHERE id = ?", (bem_id,))
-            bem = cursor.fetchone()
-            
-            cursor.execute("DELETE FROM bens WHERE id = ?", (bem_id,))
-            conn.commit()
-            
-            logger.info(f"Bem {bem['numero']} excluído")
-            return True, f"✅ Bem {bem['numero']} excluído com sucesso!"
+        numero = escritor.executar(db_path, 'excluir_bem', bem_id)
+        filtro_numeros.remover(db_path, numero)
+        supressor_leituras.descartar(numero)
+        difusor.publicar(db_path, 'alteracao')
+        
+        logger.info(f"Bem {numero} excluído")
+        return True, f"✅ Bem {numero} excluído com sucesso!"
             
     except Exception as e:
         logger.error(f"Erro ao excluir bem {bem_id}: {str(e)}")
         return False, f"❌ Erro ao excluir bem: {str(e)}"
 
-def buscar_bens_por_nome(db_path: str, termo_busca: str):
-    """Busca bens por nome ou descrição"""
+# Agrupamentos disponíveis nos relatórios de leituras (nome -> coluna do resumo)
+AGRUPAMENTOS_LEITURAS = {
+    'hora': 'r.hora',
+    'local': 'r.local_id',
+    'campanha': 'r.campanha_id'
+}
+
+def relatorio_leituras(db_path: str, agrupar_por: str = 'hora', campanha_id: Optional[int] = None,
+                       desde: Optional[str] = None, ate: Optional[str] = None) -> List[Dict]:
+    """
+    Relatório de leituras a partir do resumo pré-calculado (não varre o histórico).
+    'desde'/'ate' filtram pela hora local no formato 'AAAA-MM-DD HH:00'.
+    """
+    coluna = AGRUPAMENTOS_LEITURAS.get(agrupar_por)
+    if coluna is None:
+        raise ValueError(f"Agrupamento inválido: {agrupar_por}")
+
     try:
+        condicoes, parametros = [], []
+        if campanha_id is not None:
+            condicoes.append("r.campanha_id = ?")
+            parametros.append(campanha_id)
+        if desde:
+            condicoes.append("r.hora >= ?")
+            parametros.append(desde)
+        if ate:
+            condicoes.append("r.hora <= ?")
+            parametros.append(ate)
+        where = f"WHERE {' AND '.join(condicoes)}" if condicoes else ""
+
         with get_db_connection(db_path) as conn:
             cursor = conn.cursor()
-            cursor.execute("""
-                SELECT id, numero, nome, localizacao, situacao
-                FROM bens 
-                WHERE nome LIKE ? OR numero LIKE ?
-                ORDER BY nome
-            """, (f'%{termo_busca}%', f'%{termo_busca}%'))
-            
+            # Por local: agrupa pelo id e só depois busca o nome no dicionário
+            chave = "COALESCE(l.nome, '')" if agrupar_por == 'local' else coluna
+            cursor.execute(f"""
+                SELECT {chave} AS chave, SUM(r.total) AS total,
+                       MIN(r.hora) AS primeira_hora, MAX(r.hora) AS ultima_hora
+                FROM leituras_resumo r
+                LEFT JOIN locais l ON l.id = r.local_id
+                {where}
+                GROUP BY {coluna}
+                ORDER BY {'chave' if agrupar_por == 'hora' else 'total DESC'}
+            """, parametros)
             return [dict(row) for row in cursor.fetchall()]
-            
+
     except Exception as e:
-        logger.error(f"Erro na busca por '{termo_busca}': {str(e)}")
-        return []
\ No newline at end of file
+        logger.error(f"Erro no relatório de leituras por {agrupar_por}: {str(e)}")
+        return []
+
+def _recalcular_resumo(cursor: sqlite3.Cursor):
+    cursor.execute("DELETE FROM leituras_resumo")
+    cursor.execute("""
+        INSERT INTO leituras_resumo (campanha_id, local_id, hora, total)
+        SELECT campanha_id, COALESCE(local_id, 0),
+               strftime('%Y-%m-%d %H:00', data_leitura, 'localtime'), COUNT(*)
+        FROM leituras
+        GROUP BY 1, 2, 3
+    """)
+
+def recalcular_resumo_leituras(db_path: str) -> bool:
+    """Reconstrói o resumo a partir do histórico (caso o resumo fique inconsistente)"""
+    try:
+        with get_db_connection(db_path) as conn:
+            cursor = conn.cursor()
+            _recalcular_resumo(cursor)
+            conn.commit()
+            logger.info("Resumo de leituras recalculado")
+            return True
+
+    except Exception as e:
+        logger.error(f"Erro ao recalcular resumo de leituras: {str(e)}")
+        return False
@@ -0,0 +1,253 @@
+import atexit
+import json
+import os
+import queue
+import socket
+import socketserver
+import sqlite3
+import threading
+from concurrent.futures import Future
+from typing import Any, Callable, Dict, List, Optional
+from utils.logger import logger
+
+try:
+    import fcntl
+except ImportError:  # Windows: sem eleição entre processos, só a thread local
+    fcntl = None
+
+
+class EscritorAgrupado:
+    """
+    Escritor único do banco: uma thread por processo executa todas as alterações.
+
+    As funções de escrita do db_handler viram operações registradas (recebem o
+    cursor e não fazem commit). Pedidos que chegam enquanto um commit está em
+    andamento são agrupados na transação seguinte, cada um em seu SAVEPOINT:
+    uma rajada de leituras custa um commit (e um fsync) em vez de um por leitura,
+    e as requisições não disputam mais o lock de escrita entre si.
+
+    Com caminho_socket (variável ESCRITOR_SOCKET), um dos processos (gunicorn,
+    mod_wsgi) assume o papel de escritor e os demais entregam as operações a ele
+    por um socket Unix local. Se o escritor não responder, a operação roda na
+    thread local (o SQLite continua garantindo a exclusão mútua).
+    """
+
+    def __init__(self, caminho_socket: Optional[str] = None, max_lote: int = 256, timeout: float = 30.0):
+        self.caminho_socket = caminho_socket if hasattr(socket, 'AF_UNIX') and fcntl else None
+        self.max_lote = max_lote
+        self.timeout = timeout
+        self._operacoes: Dict[str, Callable] = {}
+        self._lock = threading.Lock()
+        self._pid = None
+        self._pendentes: queue.Queue = queue.Queue()
+        self._thread: Optional[threading.Thread] = None
+        self._lider = False
+        self._arquivo_trava = None
+        self._servidor = None
+
+    # ------------------------------
+    # API pública
+    # ------------------------------
+    def operacao(self, nome: str):
+        """Decorador: registra uma função (cursor, *args) -> resultado como operação de escrita"""
+        def registrar(funcao: Callable) -> Callable:
+            self._operacoes[nome] = funcao
+            return funcao
+        return registrar
+
+    def executar(self, db_path: str, nome: str, *args) -> Any:
+        """Executa a operação no escritor e devolve o resultado (ou levanta a exceção dela)"""
+        self._preparar()
+        if self.caminho_socket and not self._lider:
+            try:
+                conexao = self._conectar_ao_lider()
+            except OSError as e:
+                # Nada foi enviado: seguro gravar aqui (e talvez assumir o papel de escritor)
+                logger.warning(f"Escritor compartilhado indisponível ({str(e)}); gravando neste processo")
+                self._eleger()
+            else:
+                with conexao:
+                    return self._enviar_ao_lider(conexao, db_path, nome, args)
+        return self._enfileirar(db_path, nome, args).result(timeout=self.timeout)
+
+    # ------------------------------
+    # Thread de escrita
+    # ------------------------------
+    def _preparar(self):
+        # Com --preload o módulo é importado antes do fork: threads e travas são por processo
+        if self._pid == os.getpid():
+            return
+        with self._lock:
+            if self._pid == os.getpid():
+                return
+            self._pendentes = queue.Queue()
+            self._thread = threading.Thread(target=self._executar, name='escritor-banco', daemon=True)
+            self._thread.start()
+            self._lider = False
+            self._arquivo_trava = self._servidor = None
+            self._pid = os.getpid()
+            if self.caminho_socket:
+                self._eleger()
+
+    def _enfileirar(self, db_path: str, nome: str, args) -> Future:
+        if nome not in self._operacoes:
+            raise ValueError(f"Operação de escrita desconhecida: {nome}")
+        futuro = Future()
+        self._pendentes.put((db_path, nome, tuple(args), futuro))
+        return futuro
+
+    def _executar(self):
+        while True:
+            pedidos = [self._pendentes.get()]
+            # Tudo o que chegou durante o commit anterior entra neste grupo
+            try:
+                while len(pedidos) < self.max_lote:
+                    pedidos.append(self._pendentes.get_nowait())
+            except queue.Empty:
+                pass
+
+            por_banco: Dict[str, List] = {}
+            for pedido in pedidos:
+                por_banco.setdefault(pedido[0], []).append(pedido)
+            for db_path, grupo in por_banco.items():
+                self._gravar_grupo(db_path, grupo)
+
+    def _gravar_grupo(self, db_path: str, grupo: List):
+        # Importação tardia: o db_handler importa este módulo
+        from utils.db_handler import garantir_estrutura, registrar_escrita, _ESTRUTURA_VERIFICADA
+
+        resultados = []
+        try:
+            conn = sqlite3.connect(db_path, timeout=self.timeout, isolation_level=None)
+        except sqlite3.Error as e:
+            for *_, futuro in grupo:
+                futuro.set_exception(e)
+            return
+
+        try:
+            conn.row_factory = sqlite3.Row
+            if db_path not in _ESTRUTURA_VERIFICADA:
+                garantir_estrutura(conn, db_path)
+            cursor = conn.cursor()
+            cursor.execute("BEGIN IMMEDIATE")
+            alteracoes_antes = conn.total_changes
+            for _, nome, args, futuro in grupo:
+                cursor.execute("SAVEPOINT operacao")
+                try:
+                    resultado = self._operacoes[nome](cursor, *args)
+                    cursor.execute("RELEASE operacao")
+                    resultados.append((futuro, resultado))
+                except Exception as e:
+                    # Só esta operação é desfeita; as demais do grupo seguem
+                    cursor.execute("ROLLBACK TO operacao")
+                    cursor.execute("RELEASE operacao")
+                    futuro.set_exception(e)
+
+            # Grupo só de consultas/recusas não invalida os caches por versão
+            if resultados and conn.total_changes > alteracoes_antes:
+                registrar_escrita(cursor)
+            cursor.execute("COMMIT")
+        except Exception as e:
+            logger.error(f"Erro no commit agrupado ({len(grupo)} operação(ões)): {str(e)}")
+            if conn.in_transaction:
+                conn.rollback()
+            for futuro, _ in resultados:
+                futuro.set_exception(e)
+            for *_, futuro in grupo:
+                if not futuro.done():
+                    futuro.set_exception(e)
+            return
+        finally:
+            conn.close()
+
+        for futuro, resultado in resultados:
+            futuro.set_result(resultado)
+
+    # ------------------------------
+    # Entrega entre processos (socket Unix)
+    # ------------------------------
+    def _eleger(self):
+        """O processo que obtém a trava exclusiva atende o socket; os demais enviam a ele"""
+        if self._lider:
+            return
+        try:
+            arquivo = open(self.caminho_socket + '.lock', 'w')
+            fcntl.flock(arquivo, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except OSError:
+            return
+
+        try:
+            if os.path.exists(self.caminho_socket):
+                os.unlink(self.caminho_socket)  # resto de um líder que terminou
+            self._servidor = _ServidorEscritor(self.caminho_socket, self)
+            os.chmod(self.caminho_socket, 0o600)
+            threading.Thread(target=self._servidor.serve_forever, name='escritor-socket', daemon=True).start()
+        except OSError as e:
+            logger.warning(f"Não foi possível abrir o socket do escritor: {str(e)}")
+            arquivo.close()
+            return
+
+        self._arquivo_trava = arquivo  # mantida aberta (e travada) enquanto o processo viver
+        self._lider = True
+        atexit.register(self._encerrar_servidor)
+        logger.info(f"Processo {os.getpid()} é o escritor do banco ({self.caminho_socket})")
+
+    def _encerrar_servidor(self):
+        """Ao sair (reciclagem do worker): recusa novas conexões e termina as que estão em andamento"""
+        if not self._lider or self._pid != os.getpid():
+            return
+        self._servidor.shutdown()
+        self._servidor.server_close()
+        os.unlink(self.caminho_socket)
+
+    def _conectar_ao_lider(self) -> socket.socket:
+        conexao = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        try:
+            conexao.settimeout(self.timeout)
+            conexao.connect(self.caminho_socket)
+        except OSError:
+            conexao.close()
+            raise
+        return conexao
+
+    def _enviar_ao_lider(self, conexao: socket.socket, db_path: str, nome: str, args) -> Any:
+        # Depois do envio não há nova tentativa: a operação pode ter sido gravada
+        conexao.sendall(json.dumps({'db_path': db_path, 'operacao': nome, 'args': args}).encode() + b'\n')
+        with conexao.makefile('rb') as leitura:
+            linha = leitura.readline()
+        if not linha:
+            raise ConnectionError("o escritor encerrou a conexão antes de responder")
+
+        resposta = json.loads(linha)
+        if 'erro' in resposta:
+            # Repassa a exceção com o tipo que as funções de escrita esperam
+            tipo = getattr(sqlite3, resposta['tipo'], None) if resposta['tipo'].endswith('Error') else None
+            raise (tipo or RuntimeError)(resposta['erro'])
+        return resposta['resultado']
+
+
+class _ServidorEscritor(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    # server_close() espera os pedidos em andamento
+    daemon_threads = False
+    block_on_close = True
+    request_queue_size = 128
+
+    def __init__(self, caminho: str, escritor: EscritorAgrupado):
+        self.escritor = escritor
+        super().__init__(caminho, _AtenderPedido)
+
+
+class _AtenderPedido(socketserver.StreamRequestHandler):
+    def handle(self):
+        escritor = self.server.escritor
+        try:
+            pedido = json.loads(self.rfile.readline())
+            futuro = escritor._enfileirar(pedido['db_path'], pedido['operacao'], pedido['args'])
+            resposta = {'resultado': futuro.result(timeout=escritor.timeout)}
+        except Exception as e:
+            resposta = {'erro': str(e), 'tipo': type(e).__name__}
+        self.wfile.write(json.dumps(resposta).encode() + b'\n')
+
+
+# Instância única por processo
+escritor = EscritorAgrupado(caminho_socket=os.environ.get('ESCRITOR_SOCKET'))
@@ -0,0 +1,179 @@
+import queue
+import sqlite3
+import threading
+import time
+from collections import deque
+from datetime import datetime
+from typing import Dict, Optional
+from utils.logger import logger
+
+
+class DifusorEventos:
+    """
+    Difusor de alterações do banco para os painéis conectados (SSE).
+
+    As funções de escrita do db_handler publicam eventos aqui. Uma única
+    thread agrupa as alterações, recalcula os contadores uma vez e entrega
+    o mesmo resultado para todos os assinantes.
+    """
+
+    def __init__(self, intervalo_agrupamento: float = 0.25, intervalo_verificacao: float = 2.0,
+                 max_recentes: int = 20, max_fila: int = 50):
+        self.intervalo_agrupamento = intervalo_agrupamento
+        self.intervalo_verificacao = intervalo_verificacao
+        self.max_fila = max_fila
+        self._lock = threading.Lock()
+        self._assinantes: Dict[queue.Queue, str] = {}
+        self._pendentes: queue.Queue = queue.Queue()
+        self._recentes: Dict[str, deque] = {}
+        self._max_recentes = max_recentes
+        self._contadores: Dict[str, Dict] = {}
+        self._data_version: Dict[str, int] = {}
+        self._thread: Optional[threading.Thread] = None
+
+    # ------------------------------
+    # API pública
+    # ------------------------------
+    def publicar(self, db_path: str, tipo: str, dados: Optional[Dict] = None):
+        """Registra uma alteração feita por uma função de escrita"""
+        if tipo == 'leitura' and dados:
+            leitura = dict(dados, horario=datetime.now().strftime('%H:%M:%S'))
+            with self._lock:
+                self._recentes.setdefault(db_path, deque(maxlen=self._max_recentes)).appendleft(leitura)
+        else:
+            leitura = None
+
+        if not self._assinantes:
+            # Ninguém assistindo: basta descartar o snapshot dos contadores
+            self._contadores.pop(db_path, None)
+            return
+
+        self._pendentes.put((db_path, leitura))
+
+    def assinar(self, db_path: str) -> queue.Queue:
+        """Cria a fila de um novo painel já com o estado atual"""
+        fila = queue.Queue(maxsize=self.max_fila)
+        fila.put_nowait(self._mensagem_inicial(db_path))
+
+        with self._lock:
+            self._assinantes[fila] = db_path
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._executar, name='difusor-eventos', daemon=True)
+                self._thread.start()
+
+        logger.info(f"Painel conectado ao fluxo de eventos ({len(self._assinantes)} ativo(s))")
+        return fila
+
+    def cancelar(self, fila: queue.Queue):
+        """Remove um painel desconectado"""
+        with self._lock:
+            self._assinantes.pop(fila, None)
+        logger.info(f"Painel desconectado do fluxo de eventos ({len(self._assinantes)} ativo(s))")
+
+    def total_assinantes(self) -> int:
+        return len(self._assinantes)
+
+    # ------------------------------
+    # Funcionamento interno
+    # ------------------------------
+    def _mensagem_inicial(self, db_path: str) -> Dict:
+        with self._lock:
+            # Com painéis ativos a thread mantém o snapshot atualizado
+            em_uso = db_path in self._assinantes.values()
+        contadores = (em_uso and self._contadores.get(db_path)) or self._recalcular(db_path)
+        with self._lock:
+            recentes = list(self._recentes.get(db_path, ()))
+        return {
+            'tipo': 'snapshot',
+            'contadores': contadores,
+            'delta': {'total': 0, 'localizados': 0, 'nao_localizados': 0},
+            'leituras': recentes
+        }
+
+    def _recalcular(self, db_path: str) -> Dict:
+        # Importação tardia: o db_handler importa este módulo
+        from utils.db_handler import contar_bens
+
+        contadores = contar_bens(db_path)
+        self._contadores[db_path] = contadores
+        return contadores
+
+    def _banco_alterado_externamente(self, conexoes: Dict[str, sqlite3.Connection], db_path: str) -> bool:
+        """Detecta commits de outros processos via PRAGMA data_version"""
+        try:
+            conn = conexoes.get(db_path)
+            if conn is None:
+                conn = conexoes[db_path] = sqlite3.connect(db_path, check_same_thread=False)
+            versao = conn.execute("PRAGMA data_version").fetchone()[0]
+        except sqlite3.Error:
+            return False
+
+        anterior = self._data_version.get(db_path)
+        self._data_version[db_path] = versao
+        return anterior is not None and anterior != versao
+
+    def _executar(self):
+        conexoes: Dict[str, sqlite3.Connection] = {}
+        try:
+            while True:
+                with self._lock:
+                    if not self._assinantes:
+                        self._thread = None
+                        break
+
+                lote = {}
+                try:
+                    db_path, leitura = self._pendentes.get(timeout=self.intervalo_verificacao)
+                    # Aguarda um pouco para agrupar rajadas de leituras
+                    time.sleep(self.intervalo_agrupamento)
+                    lote.setdefault(db_path, []).append(leitura)
+                    while True:
+                        db_path, leitura = self._pendentes.get_nowait()
+                        lote.setdefault(db_path, []).append(leitura)
+                except queue.Empty:
+                    pass
+
+                with self._lock:
+                    caminhos = set(self._assinantes.values())
+                for db_path in caminhos:
+                    if self._banco_alterado_externamente(conexoes, db_path):
+                        lote.setdefault(db_path, [])
+
+                for db_path, leituras in lote.items():
+                    self._difundir(db_path, [l for l in leituras if l])
+        except Exception as e:
+            logger.error(f"Erro no difusor de eventos: {str(e)}")
+            with self._lock:
+                self._thread = None
+        finally:
+            for conn in conexoes.values():
+                conn.close()
+
+    def _difundir(self, db_path: str, leituras):
+        anteriores = self._contadores.get(db_path) or {}
+        contadores = self._recalcular(db_path)
+        mensagem = {
+            'tipo': 'contadores',
+            'contadores': contadores,
+            'delta': {chave: (contadores.get(chave) or 0) - (anteriores.get(chave) or 0) for chave in contadores},
+            'leituras': leituras
+        }
+
+        with self._lock:
+            assinantes = [fila for fila, caminho in self._assinantes.items() if caminho == db_path]
+
+        for fila in assinantes:
+            try:
+                fila.put_nowait(mensagem)
+            except queue.Full:
+                # Painel lento: descarta o acumulado, os contadores são absolutos
+                try:
+                    while True:
+                        fila.get_nowait()
+                except queue.Empty:
+                    pass
+                fila.put_nowait(mensagem)
+
+
+# Instância única por processo
+difusor = DifusorEventos()
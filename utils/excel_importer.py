@@ -1,10 +1,29 @@
+import csv
+import multiprocessing
+import queue
+import re
 import sqlite3
+import sys
+import unicodedata
+from collections import Counter
+from itertools import groupby, islice
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, Iterator, List, Optional, Tuple
+import numpy as np
 import pandas as pd
 from openpyxl import load_workbook
 import os
-import shutil
+import tempfile
+import time
 from datetime import datetime
 from utils.logger import logger
+from utils.eventos import difusor
+from utils.filtro_numeros import filtro_numeros
+from utils.supressor_leituras import supressor_leituras
+from utils.db_handler import (get_db_connection, garantir_estrutura, registrar_escrita, normalizar_local,
+                               atualizar_uso_locais, suspender_gatilhos_carga, restaurar_gatilhos_carga,
+                               registrar_reinicio_offline, SQL_CAMPANHA_ATIVA)
+from utils.backup import criar_backup
 
 def detectar_colunas(df):
     """
@@ -68,15 +87,23 @@ def detectar_colunas(df):
     
     return mapeamento_colunas
 
+def _texto_celula(valor):
+    """Texto de uma célula lida com o tipo nativo: inteiros sem '.0' e floats inteiros como inteiros"""
+    if isinstance(valor, float) and valor.is_integer() and abs(valor) < 2 ** 53:
+        return str(int(valor))
+    if isinstance(valor, datetime):
+        return valor.strftime('%Y-%m-%d %H:%M:%S') if valor.time() != datetime.min.time() else valor.strftime('%Y-%m-%d')
+    return str(valor)
+
 def normalizar_valor(valor):
     """
     Normaliza valores para evitar problemas de tipo e formato
     """
-    if pd.isna(valor) or valor is None:
+    if valor is None or pd.isna(valor):
         return None
     
-    # Converter para string e remover espaços extras
-    valor_str = str(valor).strip()
+    # Converter para string (sem artefatos de float) e remover espaços extras
+    valor_str = _texto_celula(valor).strip()
     
     # Se for string vazia, retornar None
     if not valor_str:
@@ -84,71 +111,215 @@ def normalizar_valor(valor):
     
     return valor_str
 
-def importar_excel_para_sqlite(arquivo_excel, aba_nome='Estoque', caminho_sqlite=None, criar_backup=True):
+def normalizar_coluna(serie: pd.Series, numero: bool = False) -> pd.Series:
     """
-    Importa dados de um arquivo Excel para o banco SQLite com detecção automática de colunas
+    Versão em lote de normalizar_valor para uma coluna lida com dtype=object.
+    Células de texto passam por operações vetorizadas; só as numéricas/datas são convertidas uma a uma.
+    Com numero=True, textos como '1001.0' (exportados de outro sistema) também viram '1001'.
     """
-    if caminho_sqlite is None:
-        caminho_sqlite = "relatorios/controle_patrimonial.db"
-    
-    # Criar pasta se não existir
-    os.makedirs(os.path.dirname(caminho_sqlite), exist_ok=True)
-    
+    serie = serie.astype(object)
+    texto = (serie.map(type) == str).to_numpy()
+    outros = ~texto & serie.notna().to_numpy()
+    resultado = np.full(len(serie), None, dtype=object)
+
+    if texto.any():
+        textos = serie[texto].str.strip()
+        if numero:
+            textos = textos.str.replace(r'^(\d+)\.0+$', r'\1', regex=True)
+        resultado[texto] = textos.to_numpy()
+    if outros.any():
+        resultado[outros] = serie[outros].map(_texto_celula).str.strip().to_numpy()
+
+    resultado[resultado == ''] = None
+    return pd.Series(resultado, index=serie.index, dtype=object)
+
+# Tipos de inconsistência detectados na análise da planilha
+TIPOS_INCONSISTENCIA = {
+    'numero_duplicado': 'Número repetido (só a última linha fica no cadastro)',
+    'numero_variante': 'Números que diferem só por zeros à esquerda, espaços ou separadores',
+    'numero_malformado': 'Número com formato suspeito',
+    'nome_semelhante': 'Mesmo nome escrito de formas diferentes',
+}
+
+# Limites de memória da análise: linhas guardadas por grupo, grafias por nome e achados gravados
+MAX_LINHAS_POR_GRUPO = 10
+MAX_GRAFIAS_POR_NOME = 5
+MAX_INCONSISTENCIAS = 10000
+
+def _sem_acentos(texto: str) -> str:
+    texto = unicodedata.normalize('NFKD', texto.lower())
+    return ''.join(c for c in texto if not unicodedata.combining(c))
+
+def chave_numero(numero: str) -> str:
+    """Chave de comparação de números: sem separadores, espaços e zeros à esquerda"""
+    numero = str(numero).strip()
+    if re.fullmatch(r'\d+\.0+', numero):
+        numero = numero.split('.')[0]
+    return re.sub(r'[^0-9A-Za-z]', '', numero).upper().lstrip('0') or '0'
+
+def problema_numero(numero: str) -> Optional[str]:
+    """Descreve o problema de formato do número do bem, ou None se parecer válido"""
+    if re.fullmatch(r'\d+\.0+', numero):
+        return f"lido como número decimal ({numero})"
+    if re.fullmatch(r'\d+(\.\d+)?[eE][+-]?\d+', numero):
+        return f"em notação científica ({numero}); dígitos podem ter sido perdidos"
+    if re.search(r'\s', numero):
+        return "contém espaços"
+    if re.search(r'[^0-9A-Za-z./-]', numero):
+        return "contém caracteres inválidos"
+    return None
+
+class AnaliseImportacao:
+    """
+    Análise das linhas da planilha sem estruturas em memória que cresçam com o número de linhas.
+    Durante a leitura cada linha só ganha as chaves de comparação, gravadas com ela no banco
+    sombra (tabela carga). Em finalizar(), consultas na carga (ordenadas e agrupadas pelo SQLite,
+    que usa arquivos temporários quando preciso) trazem números malformados, repetidos, variantes
+    e nomes semelhantes grupo a grupo; cada grupo guarda no máximo MAX_LINHAS_POR_GRUPO linhas
+    e só os primeiros MAX_INCONSISTENCIAS achados são guardados.
+    """
+
+    def __init__(self):
+        self.inconsistencias: List[Dict] = []
+        self.total = 0
+        self.contagem: Counter = Counter()   # por tipo, inclusive os que passaram de MAX_INCONSISTENCIAS
+
+    def _registrar(self, tipo: str, numero: Optional[str], linhas: List[int], detalhe: str, ocorrencias: int = 1):
+        self.total += 1
+        self.contagem[tipo] += 1
+        if len(self.inconsistencias) < MAX_INCONSISTENCIAS:
+            self.inconsistencias.append({'tipo': tipo, 'numero': numero, 'linhas': linhas,
+                                         'ocorrencias': ocorrencias, 'detalhe': detalhe})
+
+    @staticmethod
+    def chaves(numero: str, nome: str) -> Tuple[str, str]:
+        """Chaves de comparação (número normalizado, nome normalizado) gravadas com a linha"""
+        return chave_numero(numero), ' '.join(sorted(re.findall(r'\w+', _sem_acentos(nome))))
+
+    def finalizar(self, conn: sqlite3.Connection) -> List[Dict]:
+        """Agrupa as linhas gravadas na carga (em ordem de fonte e linha) e retorna as inconsistências"""
+        cursor = conn.cursor()
+        conn.create_function('problema_numero', 1, problema_numero, deterministic=True)
+        cursor.execute("""
+            SELECT numero, ordem & 0xFFFFFFFF, problema
+            FROM (SELECT numero, ordem, problema_numero(numero) AS problema FROM carga)
+            WHERE problema IS NOT NULL
+            ORDER BY ordem
+        """)
+        for numero, linha, problema in cursor:
+            self._registrar('numero_malformado', numero, [linha], problema)
+
+        # Números repetidos: todas as linhas de cada grupo, na ordem da planilha
+        cursor.execute("""
+            WITH grupos AS (
+                SELECT numero, COUNT(*) AS ocorrencias, MIN(ordem) AS primeira
+                FROM carga GROUP BY numero HAVING COUNT(*) > 1
+            )
+            SELECT g.numero, g.ocorrencias, c.ordem & 0xFFFFFFFF
+            FROM grupos g JOIN carga c ON c.numero = g.numero
+            ORDER BY g.primeira, c.ordem
+        """)
+        for (numero, ocorrencias), linhas in groupby(cursor, key=lambda row: row[:2]):
+            self._registrar('numero_duplicado', numero, [row[2] for row in islice(linhas, MAX_LINHAS_POR_GRUPO)],
+                            f"{ocorrencias} linhas com o mesmo número", ocorrencias)
+
+        # Números diferentes com a mesma chave: a primeira linha de cada grafia
+        cursor.execute("""
+            WITH primeiras AS (
+                SELECT chave_numero, numero, MIN(ordem) AS ordem FROM carga GROUP BY chave_numero, numero
+            ), grupos AS (
+                SELECT chave_numero, MIN(ordem) AS primeira FROM primeiras
+                GROUP BY chave_numero HAVING COUNT(*) > 1
+            )
+            SELECT g.chave_numero, p.numero, p.ordem & 0xFFFFFFFF
+            FROM grupos g
+            JOIN primeiras p ON p.chave_numero = g.chave_numero
+            ORDER BY g.primeira, p.ordem
+        """)
+        for _, grupo in groupby(cursor, key=lambda row: row[0]):
+            variantes = list(islice(grupo, MAX_LINHAS_POR_GRUPO))
+            numeros = [row[1] for row in variantes]
+            self._registrar('numero_variante', numeros[0], [row[2] for row in variantes],
+                            "Possivelmente o mesmo bem: " + ", ".join(f"'{n}'" for n in numeros), len(numeros))
+
+        # Mesmo nome normalizado com grafias diferentes: o número da primeira linha de cada grafia
+        cursor.execute("""
+            WITH primeiras AS (
+                SELECT chave_nome, nome, MIN(ordem) AS ordem FROM carga GROUP BY chave_nome, nome
+            ), grupos AS (
+                SELECT chave_nome, MIN(ordem) AS primeira FROM primeiras
+                GROUP BY chave_nome HAVING COUNT(*) > 1
+            )
+            SELECT g.chave_nome, p.nome, c.numero
+            FROM grupos g
+            JOIN primeiras p ON p.chave_nome = g.chave_nome
+            JOIN carga c ON c.ordem = p.ordem
+            ORDER BY g.primeira, p.ordem
+        """)
+        for _, grupo in groupby(cursor, key=lambda row: row[0]):
+            grafias = list(islice(grupo, MAX_GRAFIAS_POR_NOME))
+            self._registrar('nome_semelhante', grafias[0][2], [],
+                            "Grafias: " + " | ".join(row[1] for row in grafias), len(grafias))
+        return self.inconsistencias
+
+    def resumo(self) -> Counter:
+        return self.contagem
+
+    def gravar(self, cursor: sqlite3.Cursor):
+        """Substitui os achados da importação anterior pelos desta"""
+        cursor.execute("DELETE FROM inconsistencias_importacao")
+        cursor.executemany("""
+            INSERT INTO inconsistencias_importacao (tipo, numero, linhas, ocorrencias, detalhe)
+            VALUES (?, ?, ?, ?, ?)
+        """, [(item['tipo'], item['numero'], ', '.join(map(str, item['linhas'])), item['ocorrencias'], item['detalhe'])
+              for item in self.inconsistencias])
+
+def listar_inconsistencias(db_path: str, tipo: Optional[str] = None, limite: int = 1000) -> Dict:
+    """Achados da última importação: totais por tipo e a lista (opcionalmente de um tipo)"""
+    try:
+        with get_db_connection(db_path) as conn:
+            cursor = conn.cursor()
+            cursor.execute("SELECT tipo, COUNT(*) AS total FROM inconsistencias_importacao GROUP BY tipo")
+            totais = {row['tipo']: row['total'] for row in cursor.fetchall()}
+            cursor.execute(f"""
+                SELECT tipo, numero, linhas, ocorrencias, detalhe, data_importacao
+                FROM inconsistencias_importacao
+                {'WHERE tipo = ?' if tipo else ''}
+                ORDER BY id
+                LIMIT ?
+            """, (tipo, limite) if tipo else (limite,))
+            return {'totais': totais, 'itens': [dict(row) for row in cursor.fetchall()]}
+
+    except Exception as e:
+        logger.error(f"Erro ao listar inconsistências da importação: {str(e)}")
+        return {'totais': {}, 'itens': []}
+
+# Linhas gravadas por vez no banco sombra
+LOTE_CARGA = 5000
+
+# Arquivos de texto delimitado aceitos na importação (além de .xlsx/.xls)
+EXTENSOES_TEXTO = ('.csv', '.tsv', '.txt')
+EXTENSOES_IMPORTACAO = ('.xlsx', '.xls') + EXTENSOES_TEXTO
+
+# Bytes lidos do início do CSV para detectar codificação e delimitador
+AMOSTRA_TEXTO = 64 * 1024
+SQL_CARGA = """
+    INSERT INTO carga (ordem, numero, nome, situacao, localizado, local_chave, chave_numero, chave_nome)
+    VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+"""
+
+# Textos de localização já resolvidos guardados por carga (cache; ao passar disso recomeça)
+MAX_LOCAIS_EM_MEMORIA = 10000
+
+def _preparar_banco_destino(caminho_sqlite: str):
+    """Cria, se necessário, a tabela de bens e a estrutura auxiliar do banco em uso"""
+    conn = sqlite3.connect(caminho_sqlite)
     try:
-        # Fazer backup se solicitado e se o banco existir
-        if criar_backup and os.path.exists(caminho_sqlite):
-            backup_path = f"relatorios/backup_controle_{datetime.now().strftime('%Y%m%d_%H%M%S')}.db"
-            shutil.copy2(caminho_sqlite, backup_path)
-            logger.info(f"Backup criado: {backup_path}")
-            mensagem_backup = f"📦 Backup criado: {os.path.basename(backup_path)}"
-        else:
-            mensagem_backup = ""
-        
-        # Ler o arquivo Excel
-        logger.info(f"Iniciando importação do arquivo: {arquivo_excel}")
-        
-        # Verificar se o arquivo existe
-        if not os.path.exists(arquivo_excel):
-            raise FileNotFoundError(f"Arquivo Excel não encontrado: {arquivo_excel}")
-        
-        # Verificar abas disponíveis
-        wb = load_workbook(arquivo_excel, read_only=True)
-        if aba_nome not in wb.sheetnames:
-            abas_disponiveis = ", ".join(wb.sheetnames)
-            raise ValueError(f"Aba '{aba_nome}' não encontrada. Abas disponíveis: {abas_disponiveis}")
-        
-        # Ler dados do Excel usando pandas
-        df = pd.read_excel(arquivo_excel, sheet_name=aba_nome)
-        
-        # Verificar se há dados
-        if df.empty:
-            raise ValueError("O arquivo Excel está vazio ou não contém dados")
-        
-        # Detectar colunas automaticamente
-        mapeamento = detectar_colunas(df)
-        logger.info(f"Mapeamento de colunas detectado: {mapeamento}")
-        
-        # Verificar colunas obrigatórias
-        if not mapeamento['numero']:
-            colunas_disponiveis = list(df.columns)
-            raise ValueError(f"""
-            Não foi possível detectar a coluna do número do bem.
-            Colunas disponíveis: {colunas_disponiveis}
-            Nomes esperados: Número do Bem, Patrimonio, Código, etc.
-            """)
-        
-        if not mapeamento['nome']:
-            colunas_disponiveis = list(df.columns)
-            raise ValueError(f"""
-            Não foi possível detectar a coluna do nome.
-            Colunas disponíveis: {colunas_disponiveis}
-            Nomes esperados: Nome, Descrição, Item, etc.
-            """)
-        
-        # Conectar ao SQLite
-        conn = sqlite3.connect(caminho_sqlite)
         cursor = conn.cursor()
         
+        # Só tem efeito em banco novo: permite devolver páginas livres com incremental_vacuum
+        cursor.execute("PRAGMA auto_vacuum = INCREMENTAL")
+        
         # Criar tabela se não existir
         cursor.execute("""
             CREATE TABLE IF NOT EXISTS bens (
@@ -161,105 +332,563 @@ def importar_excel_para_sqlite(arquivo_excel, aba_nome='Estoque', caminho_sqlite
                 data_localizacao DATETIME
             )
         """)
-        
-        # Limpar tabela existente
-        cursor.execute("DELETE FROM bens")
-        logger.info("Tabela limpa para nova importação")
-        
-        # Inserir dados
-        registros_inseridos = 0
-        registros_erro = 0
-        registros_ignorados = 0
-        
-        for index, row in df.iterrows():
+        conn.commit()
+        garantir_estrutura(conn, caminho_sqlite)
+    finally:
+        conn.close()
+
+def _abrir_banco_sombra(caminho_sqlite: str) -> Tuple[sqlite3.Connection, str]:
+    """
+    Banco temporário, ao lado do banco em uso, onde a nova carga é montada.
+    Sem diário, sem fsync e sem índices: se a importação falhar, o arquivo é simplesmente descartado.
+    """
+    descritor, caminho = tempfile.mkstemp(prefix='.importacao-', suffix='.db',
+                                          dir=os.path.dirname(os.path.abspath(caminho_sqlite)))
+    os.close(descritor)
+    conn = sqlite3.connect(caminho)
+    conn.execute("PRAGMA journal_mode = OFF")
+    conn.execute("PRAGMA synchronous = OFF")
+    conn.execute("PRAGMA cache_size = -65536")
+    # ordem = fonte << 32 | linha: as fontes lidas em paralelo chegam em qualquer ordem, mas
+    # rowid continua sendo a ordem das planilhas (em números repetidos vale a última linha)
+    conn.execute("""
+        CREATE TABLE carga (ordem INTEGER PRIMARY KEY, numero TEXT, nome TEXT, situacao TEXT, localizado INTEGER,
+                            local_chave TEXT, chave_numero TEXT, chave_nome TEXT, ultima INTEGER NOT NULL DEFAULT 1)
+    """)
+    # Grafias de cada local com a ordem da primeira ocorrência (a mais antiga vale)
+    conn.execute("CREATE TABLE locais_carga (chave TEXT, nome TEXT, ordem INTEGER)")
+    return conn, caminho
+
+def _trocar_cadastro(caminho_sqlite: str, caminho_sombra: str, analise: AnaliseImportacao) -> float:
+    """
+    Substitui o cadastro pelo montado no banco sombra em uma única transação.
+    Em WAL os leitores continuam vendo o cadastro anterior até o COMMIT e passam direto
+    ao novo: nunca uma tabela pela metade nem espera. O banco sombra anexado é só lido: a
+    transação grava apenas no principal, então o COMMIT é atômico (em WAL, uma transação que
+    gravasse nos dois arquivos não seria). Retorna a duração da troca em segundos.
+    """
+    inicio = time.perf_counter()
+    conn = sqlite3.connect(caminho_sqlite, timeout=60, isolation_level=None)
+    try:
+        cursor = conn.cursor()
+        cursor.execute("ATTACH DATABASE ? AS sombra", (caminho_sombra,))
+        cursor.execute("BEGIN IMMEDIATE")
+        try:
+            # Gatilhos linha a linha e índices secundários são refeitos uma vez, depois da carga
+            suspender_gatilhos_carga(cursor)
+            cursor.execute("SELECT name, sql FROM main.sqlite_master WHERE type = 'index' AND tbl_name = 'bens' AND sql IS NOT NULL")
+            indices = cursor.fetchall()
+            for nome, _ in indices:
+                cursor.execute(f"DROP INDEX main.{nome}")
+            
+            cursor.execute("DELETE FROM main.bens")
+            # A planilha é a referência da campanha ativa (como antes das campanhas): leituras
+            # anteriores não mantêm como localizado o que ela lista como pendente, nem sobra
+            # estado de bens que saíram dela. O histórico (leituras) e as campanhas arquivadas ficam
+            cursor.execute(f"DELETE FROM main.estado_campanha WHERE campanha_id = {SQL_CAMPANHA_ATIVA}")
+            cursor.execute("""
+                INSERT INTO main.locais (nome, chave)
+                SELECT nome, chave FROM sombra.locais_carga WHERE true
+                ORDER BY ordem
+                ON CONFLICT (chave) DO NOTHING
+            """)
+            cursor.execute("""
+                INSERT INTO main.bens (numero, nome, localizacao, local_id, situacao)
+                SELECT c.numero, c.nome, COALESCE(l.nome, ''), l.id, c.situacao
+                FROM sombra.carga c
+                LEFT JOIN main.locais l ON l.chave = c.local_chave
+                WHERE c.ultima = 1
+                ORDER BY c.rowid
+            """)
+            cursor.execute(f"""
+                INSERT INTO main.estado_campanha (campanha_id, numero, situacao, localizacao, local_id, data_localizacao)
+                SELECT {SQL_CAMPANHA_ATIVA}, c.numero, 'OK', l.nome, l.id, datetime('now')
+                FROM sombra.carga c
+                LEFT JOIN main.locais l ON l.chave = c.local_chave
+                WHERE c.localizado = 1
+                ORDER BY c.rowid
+                ON CONFLICT (campanha_id, numero) DO UPDATE SET
+                    situacao = excluded.situacao,
+                    localizacao = COALESCE(excluded.localizacao, estado_campanha.localizacao),
+                    local_id = COALESCE(excluded.local_id, estado_campanha.local_id),
+                    data_localizacao = COALESCE(excluded.data_localizacao, estado_campanha.data_localizacao)
+            """)
+            
+            for _, sql in indices:
+                cursor.execute(sql)
+            analise.gravar(cursor)
+            atualizar_uso_locais(cursor)
+            restaurar_gatilhos_carga(cursor)
+            registrar_escrita(cursor)
+            registrar_reinicio_offline(cursor)
+            cursor.execute("COMMIT")
+        except Exception:
+            cursor.execute("ROLLBACK")
+            raise
+        finally:
+            cursor.execute("DETACH DATABASE sombra")
+    finally:
+        conn.close()
+    return time.perf_counter() - inicio
+
+def _nomes_colunas(cabecalho) -> List[str]:
+    """Nomes das colunas como o pandas daria: vazias viram 'Unnamed: i' e repetidas ganham '.1', '.2'..."""
+    nomes, vistos = [], Counter()
+    for i, valor in enumerate(cabecalho):
+        nome = f"Unnamed: {i}" if valor is None or str(valor).strip() == '' else valor
+        if vistos[nome]:
+            nome_unico = f"{nome}.{vistos[nome]}"
+            vistos[nome] += 1
+            nome = nome_unico
+        else:
+            vistos[nome] += 1
+        nomes.append(nome)
+    return nomes
+
+def _em_blocos(linhas: Iterator[tuple], tamanho: int) -> Iterator[pd.DataFrame]:
+    """
+    Agrupa as linhas (a primeira é o cabeçalho) em DataFrames de até `tamanho` linhas.
+    O índice de cada bloco é a posição da linha nos dados (linha no arquivo = índice + 2).
+    """
+    cabecalho = next(linhas, None)
+    if cabecalho is None:
+        return
+    colunas = _nomes_colunas(cabecalho)
+    largura = len(colunas)
+
+    bloco, vazias_pendentes, inicio = [], [], 0
+    for linha in linhas:
+        linha = tuple(linha[:largura]) + (None,) * (largura - len(linha))
+        if all(valor is None for valor in linha):
+            # Linhas vazias no fim do arquivo são descartadas, como no read_excel
+            vazias_pendentes.append(linha)
+            continue
+        bloco.extend(vazias_pendentes)
+        vazias_pendentes = []
+        bloco.append(linha)
+        if len(bloco) >= tamanho:
+            yield pd.DataFrame(bloco, columns=colunas, index=range(inicio, inicio + len(bloco)), dtype=object)
+            inicio += len(bloco)
+            bloco = []
+    if bloco:
+        yield pd.DataFrame(bloco, columns=colunas, index=range(inicio, inicio + len(bloco)), dtype=object)
+
+def eh_arquivo_texto(arquivo: str) -> bool:
+    """CSV/TSV: lido pelo módulo csv, sem abas"""
+    return arquivo.lower().endswith(EXTENSOES_TEXTO)
+
+def _abrir_texto(arquivo: str):
+    """
+    Abre um CSV/TSV detectando a codificação (UTF-8, com ou sem BOM, ou Windows-1252)
+    e o delimitador (pela amostra inicial). Retorna (arquivo aberto, dialeto).
+    """
+    with open(arquivo, 'rb') as f:
+        amostra = f.read(AMOSTRA_TEXTO)
+    # Só linhas completas: a amostra não termina no meio de um caractere UTF-8
+    if len(amostra) == AMOSTRA_TEXTO and b'\n' in amostra:
+        amostra = amostra[:amostra.rindex(b'\n')]
+
+    try:
+        texto = amostra.decode('utf-8-sig')
+        codificacao = 'utf-8-sig'
+    except UnicodeDecodeError:
+        texto = amostra.decode('cp1252', errors='replace')
+        codificacao = 'cp1252'
+
+    try:
+        dialeto = csv.Sniffer().sniff(texto, delimiters=';,\t|')
+    except csv.Error:
+        # Amostra ambígua (ex.: uma única coluna): TSV pela extensão, senão vírgula
+        dialeto = csv.excel_tab if arquivo.lower().endswith('.tsv') else csv.excel
+    logger.info(f"{os.path.basename(arquivo)}: codificação {codificacao}, delimitador {dialeto.delimiter!r}")
+    return open(arquivo, newline='', encoding=codificacao, errors='replace'), dialeto
+
+def _planilha_em_blocos(arquivo: str, aba: str, tamanho: int = LOTE_CARGA) -> Iterator[pd.DataFrame]:
+    """
+    Lê a aba (ou o CSV/TSV) em blocos, sem montar o arquivo inteiro em memória.
+    Excel: openpyxl em modo somente leitura, células com o tipo nativo, como em
+    read_excel(dtype=object). CSV/TSV: módulo csv, células de texto (vazias viram None).
+    """
+    if eh_arquivo_texto(arquivo):
+        entrada, dialeto = _abrir_texto(arquivo)
+        with entrada:
+            linhas = (tuple(valor or None for valor in linha) for linha in csv.reader(entrada, dialeto))
+            yield from _em_blocos(linhas, tamanho)
+        return
+
+    if arquivo.lower().endswith('.xls'):
+        # Formato antigo: o openpyxl não lê; o pandas (xlrd) carrega a aba de uma vez
+        df = pd.read_excel(arquivo, sheet_name=aba, dtype=object)
+        for inicio in range(0, len(df), tamanho):
+            yield df.iloc[inicio:inicio + tamanho]
+        return
+
+    wb = load_workbook(arquivo, read_only=True, data_only=True)
+    try:
+        if aba not in wb.sheetnames:
+            abas_disponiveis = ", ".join(wb.sheetnames)
+            raise ValueError(f"Aba '{aba}' não encontrada. Abas disponíveis: {abas_disponiveis}")
+
+        # Floats inteiros viram int, como o leitor do pandas faz
+        linhas = (tuple(int(valor) if isinstance(valor, float) and valor.is_integer() else valor for valor in linha)
+                  for linha in wb[aba].iter_rows(values_only=True))
+        yield from _em_blocos(linhas, tamanho)
+    finally:
+        wb.close()
+
+def _amostra(arquivo: str, aba: str, linhas: int) -> pd.DataFrame:
+    """Primeiras linhas do arquivo (DataFrame vazio se não houver dados)"""
+    blocos = _planilha_em_blocos(arquivo, aba, tamanho=linhas)
+    try:
+        return next(blocos, pd.DataFrame())
+    finally:
+        blocos.close()
+
+def _verificar_mapeamento(mapeamento: Dict, colunas: List):
+    """Levanta ValueError se as colunas obrigatórias (número e nome) não foram detectadas"""
+    if not mapeamento['numero']:
+        raise ValueError(f"""
+        Não foi possível detectar a coluna do número do bem.
+        Colunas disponíveis: {colunas}
+        Nomes esperados: Número do Bem, Patrimonio, Código, etc.
+        """)
+    
+    if not mapeamento['nome']:
+        raise ValueError(f"""
+        Não foi possível detectar a coluna do nome.
+        Colunas disponíveis: {colunas}
+        Nomes esperados: Nome, Descrição, Item, etc.
+        """)
+
+def ler_fonte(arquivo: str, aba: str = 'Estoque') -> Iterator[Tuple[List[Tuple], int]]:
+    """
+    Lê e normaliza uma fonte (arquivo e aba; CSV/TSV não têm aba) em lotes.
+    Cada lote é (linhas, ignoradas): linhas são tuplas (linha no arquivo, número, nome,
+    localização, situação) já normalizadas; ignoradas conta as vazias ou sem número/nome.
+    """
+    descricao = os.path.basename(arquivo) if eh_arquivo_texto(arquivo) else f"{os.path.basename(arquivo)} (aba '{aba}')"
+    logger.info(f"Iniciando leitura de {descricao}")
+    if not os.path.exists(arquivo):
+        raise FileNotFoundError(f"Arquivo não encontrado: {arquivo}")
+
+    mapeamento = None
+    vazio = True
+    for df in _planilha_em_blocos(arquivo, aba):
+        vazio = False
+        if mapeamento is None:
+            # Detectar colunas automaticamente (uma vez, pelo cabeçalho)
+            mapeamento = detectar_colunas(df)
+            logger.info(f"Mapeamento de colunas detectado: {mapeamento}")
+            _verificar_mapeamento(mapeamento, list(df.columns))
+
+        # Leitura tipada: cada coluna é normalizada de uma vez, antes do laço de inserção
+        vazias = df.isna().all(axis=1)
+        colunas = {
+            campo: normalizar_coluna(df[coluna], numero=campo == 'numero') if coluna else pd.Series([None] * len(df), index=df.index, dtype=object)
+            for campo, coluna in mapeamento.items()
+        }
+
+        linhas, ignoradas = [], 0
+        for index, vazia, numero_bem, nome, localizacao, situacao_valor in zip(
+                df.index, vazias, colunas['numero'], colunas['nome'], colunas['localizacao'], colunas['situacao']):
+            # Pular linhas vazias ou com dados obrigatórios faltantes
+            if vazia or not numero_bem or not nome:
+                ignoradas += 1
+                continue
+            linhas.append((index + 2, numero_bem, nome, localizacao, situacao_valor))
+        yield linhas, ignoradas
+
+    if vazio:
+        raise ValueError(f"{descricao} está vazio ou não contém dados")
+
+def _ler_fonte_em_fila(indice: int, arquivo: str, aba: str, fila, cancelar):
+    # Executada nos processos auxiliares: cada lote normalizado segue para a fila assim que fica pronto
+    def entregar(item) -> bool:
+        # Fila cheia: espera, mas desiste se a importação foi cancelada (outra fonte falhou)
+        while not cancelar.is_set():
             try:
-                # Pular linhas completamente vazias
-                if row.isnull().all():
-                    registros_ignorados += 1
-                    continue
-                
-                # Obter valores
-                numero_bem = normalizar_valor(row[mapeamento['numero']])
-                nome = normalizar_valor(row[mapeamento['nome']])
-                
-                # Pular linhas com dados obrigatórios faltantes
-                if not numero_bem or not nome:
-                    registros_ignorados += 1
+                fila.put(item, timeout=0.5)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    try:
+        for lote in ler_fonte(arquivo, aba):
+            if not entregar((indice, lote)):
+                return
+        entregar((indice, None))
+    except Exception as e:
+        entregar((indice, e))
+
+def lotes_em_paralelo(fontes: List[Tuple[str, str]], processos: int) -> Iterator[Tuple[int, List[Tuple], int]]:
+    """
+    Lê as fontes em processos auxiliares (a leitura de XLSX é limitada pela CPU e pelo GIL) e
+    devolve (índice da fonte, linhas, ignoradas) na ordem de chegada: nada fica guardado à espera
+    da vez da fonte (a carga reordena pela coluna ordem) e a fila limitada segura os leitores
+    quando a gravação não acompanha.
+    """
+    # Sem fork: o worker web tem outras threads (escritor, agendadores, requisições) e o filho
+    # herdaria travas seguras por elas no instante do fork (ex.: a do logging), travando para sempre
+    contexto = multiprocessing.get_context('forkserver' if 'forkserver' in multiprocessing.get_all_start_methods() else 'spawn')
+    with contexto.Manager() as gerente:
+        fila = gerente.Queue(maxsize=2 * processos)
+        cancelar = gerente.Event()
+        executor = ProcessPoolExecutor(max_workers=min(processos, len(fontes)), mp_context=contexto)
+        try:
+            tarefas = [executor.submit(_ler_fonte_em_fila, indice, arquivo, aba, fila, cancelar)
+                       for indice, (arquivo, aba) in enumerate(fontes)]
+            pendentes = len(fontes)
+            while pendentes:
+                try:
+                    indice, lote = fila.get(timeout=1)
+                except queue.Empty:
+                    # Processo auxiliar que morreu sem avisar (ex.: falta de memória)
+                    for tarefa in tarefas:
+                        if tarefa.done() and tarefa.exception():
+                            raise tarefa.exception()
                     continue
+                if isinstance(lote, Exception):
+                    raise lote
+                if lote is None:
+                    pendentes -= 1
+                else:
+                    linhas, ignoradas = lote
+                    yield indice, linhas, ignoradas
+        finally:
+            # Falha ou abandono: libera os leitores presos na fila cheia antes de esperar por eles
+            cancelar.set()
+            try:
+                while True:
+                    fila.get_nowait()
+            except queue.Empty:
+                pass
+            executor.shutdown(cancel_futures=True)
+
+class CargaSombra:
+    """
+    Montagem de um novo cadastro no banco sombra, a partir de uma ou mais fontes.
+    Recebe as linhas já normalizadas (ler_fonte), classifica a situação, resolve a chave
+    do local, alimenta a análise de inconsistências e grava em lotes; trocar() publica o resultado.
+    """
+
+    def __init__(self, caminho_sqlite: str):
+        self.caminho_sqlite = caminho_sqlite
+        self.conn, self.caminho = _abrir_banco_sombra(caminho_sqlite)
+        self.analise = AnaliseImportacao()
+        self.inseridos = 0
+        self.ignorados = 0
+        self.erros = 0
+        self._locais: Dict = {}           # texto da planilha -> [chave, grafia, menor ordem] (cache limitado)
+
+    def adicionar(self, linhas: List[Tuple], ignoradas: int = 0, fonte: int = 0):
+        """Grava um lote de linhas normalizadas (linha, número, nome, localização, situação) da fonte indicada"""
+        self.ignorados += ignoradas
+        lote, locais = [], []
+        for linha, numero_bem, nome, localizacao, situacao_valor in linhas:
+            try:
+                ordem = (fonte << 32) | linha
+                chave_num, chave_nome = self.analise.chaves(numero_bem, nome)
                 
-                # Obter valores opcionais
-                localizacao = ''
-                if mapeamento['localizacao']:
-                    localizacao_valor = normalizar_valor(row[mapeamento['localizacao']])
-                    localizacao = localizacao_valor if localizacao_valor else ''
+                # Localização canônica (dicionário de locais, resolvido na troca)
+                local = self._locais.get(localizacao)
+                if local is None:
+                    if len(self._locais) >= MAX_LOCAIS_EM_MEMORIA:
+                        self._locais.clear()
+                    nome_local, chave = normalizar_local(localizacao)
+                    local = self._locais[localizacao] = [chave or None, nome_local, ordem]
+                    if chave:
+                        locais.append((chave, nome_local, ordem))
+                elif local[0] and ordem < local[2]:
+                    # Fonte anterior lida depois (leitura em paralelo): a ocorrência mais antiga decide a grafia
+                    local[2] = ordem
+                    locais.append((local[0], local[1], ordem))
                 
                 situacao = 'Pendente'
-                if mapeamento['situacao']:
-                    situacao_valor = normalizar_valor(row[mapeamento['situacao']])
-                    if situacao_valor:
-                        # Tentar detectar automaticamente se está localizado
-                        situacao_lower = situacao_valor.lower()
-                        if any(termo in situacao_lower for termo in ['ok', 'localizado', 'encontrado', 'sim', 'yes', 'concluído']):
-                            situacao = 'OK'
-                        else:
-                            situacao = situacao_valor
-                
-                # Inserir no banco
-                cursor.execute("""
-                    INSERT OR REPLACE INTO bens (numero, nome, localizacao, situacao)
-                    VALUES (?, ?, ?, ?)
-                """, (numero_bem, nome, localizacao, situacao))
+                if situacao_valor:
+                    # Tentar detectar automaticamente se está localizado
+                    situacao_lower = situacao_valor.lower()
+                    if any(termo in situacao_lower for termo in ['ok', 'localizado', 'encontrado', 'sim', 'yes', 'concluído']):
+                        situacao = 'OK'
+                    else:
+                        situacao = situacao_valor
                 
-                registros_inseridos += 1
-                
-                # Log a cada 100 registros
-                if registros_inseridos % 100 == 0:
-                    logger.info(f"Registros processados: {registros_inseridos}")
+                # 'OK' vai para o estado da campanha ativa, não para o cadastro
+                lote.append((ordem, numero_bem, nome, 'Pendente' if situacao == 'OK' else situacao,
+                             1 if situacao == 'OK' else 0, local[0], chave_num, chave_nome))
                 
             except Exception as e:
-                registros_erro += 1
-                logger.warning(f"Erro na linha {index + 2}: {str(e)}")
-                continue
+                self.erros += 1
+                logger.warning(f"Erro na linha {linha}: {str(e)}")
         
-        conn.commit()
-        conn.close()
+        self.conn.executemany(SQL_CARGA, lote)
+        self.conn.executemany("INSERT INTO locais_carga VALUES (?, ?, ?)", locais)
+        self.inseridos += len(lote)
+        logger.info(f"Registros processados: {self.inseridos}")
+
+    def concluir(self):
+        """Fecha a montagem: locais, análise e resolução de números repetidos"""
+        cursor = self.conn.cursor()
+        # Cada local fica com a grafia da primeira ocorrência nas planilhas
+        cursor.execute("""
+            DELETE FROM locais_carga WHERE rowid NOT IN (
+                SELECT rowid FROM (SELECT rowid, MIN(ordem) FROM locais_carga GROUP BY chave)
+            )
+        """)
+        # Índice criado só agora, depois da carga: agrupamentos da análise e números repetidos
+        cursor.execute("CREATE INDEX carga_numero ON carga(numero)")
+        self.analise.finalizar(self.conn)
+        if self.analise.resumo().get('numero_duplicado'):
+            # Número repetido: o cadastro fica com a última linha
+            cursor.execute("UPDATE carga SET ultima = 0 WHERE rowid NOT IN (SELECT MAX(rowid) FROM carga GROUP BY numero)")
+        self.conn.commit()
+        self.conn.close()
+
+    def trocar(self) -> float:
+        """Substitui o cadastro do banco em uso (ver _trocar_cadastro); retorna a duração em segundos"""
+        return _trocar_cadastro(self.caminho_sqlite, self.caminho, self.analise)
+
+    def descartar(self):
+        self.conn.close()
+        if os.path.exists(self.caminho):
+            os.remove(self.caminho)
+
+def listar_abas(arquivo: str) -> List[str]:
+    """Abas de uma planilha Excel (CSV/TSV não têm abas)"""
+    if eh_arquivo_texto(arquivo):
+        return []
+    if arquivo.lower().endswith('.xls'):
+        return list(pd.ExcelFile(arquivo).sheet_names)
+    wb = load_workbook(arquivo, read_only=True)
+    try:
+        return list(wb.sheetnames)
+    finally:
+        wb.close()
+
+def montar_fontes(arquivos: List[str], abas: str = 'Estoque') -> List[Tuple[str, str]]:
+    """
+    Fontes (arquivo, aba) de uma importação: abas separadas por vírgula ('Andar 1, Andar 2')
+    ou '*' para todas as abas de cada planilha. Cada CSV/TSV é uma única fonte.
+    """
+    nomes_abas = [aba.strip() for aba in (abas or 'Estoque').split(',') if aba.strip()] or ['Estoque']
+    fontes = []
+    for arquivo in arquivos:
+        if eh_arquivo_texto(arquivo):
+            fontes.append((arquivo, ''))
+        elif nomes_abas == ['*']:
+            fontes.extend((arquivo, aba) for aba in listar_abas(arquivo))
+        else:
+            fontes.extend((arquivo, aba) for aba in nomes_abas)
+    return fontes
+
+def importar_fontes(fontes: List[Tuple[str, str]], caminho_sqlite: Optional[str] = None, fazer_backup: bool = True,
+                    processos: int = 1) -> Tuple[bool, str, Dict]:
+    """
+    Importa uma ou mais fontes (arquivo, aba) como o novo cadastro, em uma única troca.
+    Com processos > 1 as fontes são lidas em paralelo; as linhas são gravadas na ordem das
+    fontes (em números repetidos vale a última). Retorna (sucesso, mensagem, estatísticas).
+    """
+    if caminho_sqlite is None:
+        caminho_sqlite = "relatorios/controle_patrimonial.db"
+    
+    # Criar pasta se não existir
+    os.makedirs(os.path.dirname(caminho_sqlite) or '.', exist_ok=True)
+    estatisticas = {'fontes': len(fontes), 'registros': 0, 'ignorados': 0, 'erros': 0,
+                    'montagem_s': 0.0, 'troca_s': 0.0, 'total_s': 0.0}
+    inicio = time.perf_counter()
+    
+    try:
+        # Fazer backup se solicitado e se o banco existir
+        if fazer_backup and os.path.exists(caminho_sqlite):
+            # API de backup do SQLite: cópia consistente sem bloquear quem está usando o banco
+            sucesso_backup, backup_path = criar_backup(caminho_sqlite, os.path.join(os.path.dirname(caminho_sqlite), 'backups'),
+                                                         rotulo='importacao')
+            if not sucesso_backup:
+                raise RuntimeError(backup_path)
+            mensagem_backup = f"📦 Backup criado: {os.path.basename(backup_path)}"
+        else:
+            mensagem_backup = ""
+        
+        _preparar_banco_destino(caminho_sqlite)
+        
+        # Montar o novo cadastro no banco sombra (o banco em uso não é tocado até a troca)
+        carga = CargaSombra(caminho_sqlite)
+        try:
+            # Executável empacotado (PyInstaller) não pode iniciar processos auxiliares: leitura sequencial
+            if processos > 1 and len(fontes) > 1 and not getattr(sys, 'frozen', False):
+                for fonte, linhas, ignoradas in lotes_em_paralelo(fontes, processos):
+                    carga.adicionar(linhas, ignoradas, fonte)
+            else:
+                for fonte, (arquivo, aba) in enumerate(fontes):
+                    for linhas, ignoradas in ler_fonte(arquivo, aba):
+                        carga.adicionar(linhas, ignoradas, fonte)
+            carga.concluir()
+            estatisticas['montagem_s'] = time.perf_counter() - inicio
+            
+            duracao_troca = carga.trocar()
+            logger.info(f"Cadastro substituído em {duracao_troca:.2f}s (leitores seguiram com os dados anteriores)")
+        finally:
+            carga.descartar()
+        
+        filtro_numeros.invalidar(caminho_sqlite)
+        supressor_leituras.descartar()
+        difusor.publicar(caminho_sqlite, 'importacao')
+        analise = carga.analise
+        estatisticas.update(registros=carga.inseridos, ignorados=carga.ignorados, erros=carga.erros,
+                            troca_s=duracao_troca, total_s=time.perf_counter() - inicio)
         
         # Mensagem de sucesso detalhada
         mensagem = f"✅ Importação concluída com sucesso!"
-        mensagem += f"\n• 📊 Registros inseridos: {registros_inseridos}"
+        mensagem += f"\n• 📊 Registros inseridos: {carga.inseridos}"
         
-        if registros_erro > 0:
-            mensagem += f"\n• ⚠️  Registros com erro: {registros_erro}"
+        if len(fontes) > 1:
+            mensagem += f"\n• 📄 Fontes importadas: {len(fontes)}"
         
-        if registros_ignorados > 0:
-            mensagem += f"\n• 🔄 Registros ignorados (vazios): {registros_ignorados}"
+        if carga.erros > 0:
+            mensagem += f"\n• ⚠️  Registros com erro: {carga.erros}"
+        
+        if carga.ignorados > 0:
+            mensagem += f"\n• 🔄 Registros ignorados (vazios): {carga.ignorados}"
+        
+        if analise.total:
+            detalhes = ", ".join(f"{quantidade} {tipo.replace('_', ' ')}" for tipo, quantidade in analise.resumo().items())
+            mensagem += f"\n• 🔍 Inconsistências encontradas: {analise.total} ({detalhes})"
         
         if mensagem_backup:
             mensagem += f"\n• {mensagem_backup}"
         
         logger.info(mensagem)
-        return True, mensagem
+        return True, mensagem, estatisticas
         
     except Exception as e:
         error_msg = f"❌ Erro na importação: {str(e)}"
         logger.error(error_msg)
-        return False, error_msg
+        estatisticas['total_s'] = time.perf_counter() - inicio
+        return False, error_msg, estatisticas
+
+def importar_excel_para_sqlite(arquivo_excel, aba_nome='Estoque', caminho_sqlite=None, fazer_backup=True):
+    """
+    Importa dados de um arquivo Excel para o banco SQLite com detecção automática de colunas
+    """
+    sucesso, mensagem, _ = importar_fontes([(arquivo_excel, aba_nome)], caminho_sqlite, fazer_backup)
+    return sucesso, mensagem
 
 def verificar_estrutura_excel(arquivo_excel, aba_nome='Estoque'):
     """
     Verifica a estrutura do arquivo Excel antes da importação
     """
     try:
-        wb = load_workbook(arquivo_excel, read_only=True)
-        
-        if aba_nome not in wb.sheetnames:
-            return False, f"Aba '{aba_nome}' não encontrada"
+        if not eh_arquivo_texto(arquivo_excel):
+            wb = load_workbook(arquivo_excel, read_only=True)
+            
+            if aba_nome not in wb.sheetnames:
+                return False, f"Aba '{aba_nome}' não encontrada"
         
         # Ler algumas linhas para verificar estrutura
-        df = pd.read_excel(arquivo_excel, sheet_name=aba_nome, nrows=10)
+        df = _amostra(arquivo_excel, aba_nome, 10)
         
         if df.empty:
-            return False, "O arquivo Excel está vazio"
+            return False, "O arquivo está vazio"
         
         # Detectar colunas automaticamente
         mapeamento = detectar_colunas(df)
@@ -287,11 +916,13 @@ def obter_colunas_excel(arquivo_excel, aba_nome='Estoque'):
     Retorna as colunas disponíveis no arquivo Excel
     """
     try:
-        df = pd.read_excel(arquivo_excel, sheet_name=aba_nome, nrows=1)
-        colunas = list(df.columns)
+        if eh_arquivo_texto(arquivo_excel):
+            df_sample = _amostra(arquivo_excel, aba_nome, 5).infer_objects()
+        else:
+            df_sample = pd.read_excel(arquivo_excel, sheet_name=aba_nome, nrows=5)
+        colunas = list(df_sample.columns)
         
         # Adicionar informações de tipo
-        df_sample = pd.read_excel(arquivo_excel, sheet_name=aba_nome, nrows=5)
         info_colunas = []
         
         for coluna in colunas:
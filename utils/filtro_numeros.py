@@ -0,0 +1,206 @@
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, Optional
+from utils.logger import logger
+
+# Bits por número no filtro de Bloom (≈1% de falsos positivos com 7 funções de hash)
+BITS_POR_NUMERO = 10
+FUNCOES_HASH = 7
+# Folga para números cadastrados depois da construção (acima dela o filtro é refeito)
+FOLGA_CAPACIDADE = 1.5
+
+# Números confirmados como inexistentes ficam em memória por este tempo (segundos)
+TTL_NEGATIVO = 30.0
+MAX_NEGATIVOS = 10000
+
+# Intervalo mínimo entre verificações da versão do banco: limite de atraso para ver
+# números cadastrados ou importados por outro processo
+INTERVALO_VERIFICACAO = 1.0
+
+
+def normalizar_numero(numero: str) -> str:
+    """Chave do filtro: sem espaços nas pontas, como a leitura consulta o banco (numero = ?, sensível a maiúsculas)"""
+    return str(numero).strip()
+
+
+class _FiltroBloom:
+    def __init__(self, capacidade: int):
+        self.capacidade = max(1024, capacidade)
+        self.bits = max(8, self.capacidade * BITS_POR_NUMERO)
+        self.tabela = bytearray((self.bits + 7) // 8)
+        self.total = 0
+
+    def _posicoes(self, chave: str):
+        # Hash duplo (Kirsch-Mitzenmacher) a partir do hash nativo: o filtro é por processo
+        h = hash(chave) & 0xFFFFFFFFFFFFFFFF
+        h1, h2 = h & 0xFFFFFFFF, (h >> 32) | 1
+        return [(h1 + i * h2) % self.bits for i in range(FUNCOES_HASH)]
+
+    def adicionar(self, chave: str):
+        for posicao in self._posicoes(chave):
+            self.tabela[posicao >> 3] |= 1 << (posicao & 7)
+        self.total += 1
+
+    def contem(self, chave: str) -> bool:
+        tabela = self.tabela
+        return all(tabela[posicao >> 3] & (1 << (posicao & 7)) for posicao in self._posicoes(chave))
+
+
+class FiltroNumeros:
+    """
+    Rejeição rápida de números que não existem no cadastro (etiquetas de outros órgãos,
+    leituras erradas), sem consultar o SQLite.
+
+    Um filtro de Bloom por processo guarda os números cadastrados: "ausente" é definitivo,
+    "talvez" segue para o banco. Os números que o banco confirmou como inexistentes ficam
+    num cache negativo de curta duração. Cadastros e exclusões neste processo atualizam os
+    dois na hora; os de outros processos (e importações) são vistos pela versão do banco,
+    verificada no máximo a cada INTERVALO_VERIFICACAO segundos.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._estados: Dict[str, Dict] = {}
+        self._contadores = {'consultas': 0, 'rejeitados_filtro': 0, 'rejeitados_cache': 0,
+                            'consultas_banco': 0, 'falsos_positivos': 0, 'reconstrucoes': 0}
+
+    # ------------------------------
+    # API pública
+    # ------------------------------
+    def talvez_exista(self, db_path: str, numero: str) -> bool:
+        """False: o número certamente não está cadastrado. True: consultar o banco"""
+        self._contadores['consultas'] += 1
+        try:
+            estado = self._atualizar(db_path)
+        except Exception as e:
+            logger.warning(f"Filtro de números indisponível: {str(e)}")
+            return True
+
+        chave = normalizar_numero(numero)
+        validade = estado['negativos'].get(chave)
+        if validade is not None:
+            if validade > time.monotonic():
+                self._contadores['rejeitados_cache'] += 1
+                return False
+            estado['negativos'].pop(chave, None)
+
+        if not estado['filtro'].contem(chave):
+            self._contadores['rejeitados_filtro'] += 1
+            return False
+
+        self._contadores['consultas_banco'] += 1
+        return True
+
+    def registrar_ausente(self, db_path: str, numero: str):
+        """O banco confirmou que o número não existe (falso positivo do filtro)"""
+        estado = self._estados.get(db_path)
+        if estado is None:
+            return
+        self._contadores['falsos_positivos'] += 1
+        self._negativar(estado, normalizar_numero(numero))
+
+    def adicionar(self, db_path: str, numero: str):
+        """Número cadastrado neste processo"""
+        with self._lock:
+            estado = self._estados.get(db_path)
+            if estado is None:
+                return
+            chave = normalizar_numero(numero)
+            estado['negativos'].pop(chave, None)
+            estado['filtro'].adicionar(chave)
+            if estado['filtro'].total > estado['filtro'].capacidade:
+                estado['valido'] = False
+
+    def remover(self, db_path: str, numero: str):
+        """Número excluído: o filtro não remove, o cache negativo passa a responder por ele"""
+        estado = self._estados.get(db_path)
+        if estado is None:
+            return
+        self._negativar(estado, normalizar_numero(numero))
+        estado['removidos'] += 1
+        # Muitas exclusões degradam o filtro: refazer na próxima consulta
+        if estado['removidos'] > estado['filtro'].total // 4:
+            estado['valido'] = False
+
+    def invalidar(self, db_path: str):
+        """Cadastro substituído (importação): o filtro é refeito na próxima consulta"""
+        estado = self._estados.get(db_path)
+        if estado is not None:
+            estado['valido'] = False
+
+    def estatisticas(self) -> Dict:
+        contadores = dict(self._contadores)
+        consultas = contadores['consultas'] or 1
+        contadores['taxa_rejeicao'] = round((contadores['rejeitados_filtro'] + contadores['rejeitados_cache']) / consultas, 4)
+        contadores['numeros'] = {db_path: estado['filtro'].total for db_path, estado in self._estados.items()}
+        return contadores
+
+    # ------------------------------
+    # Funcionamento interno
+    # ------------------------------
+    def _negativar(self, estado: Dict, chave: str):
+        with self._lock:
+            negativos = estado['negativos']
+            negativos[chave] = time.monotonic() + TTL_NEGATIVO
+            negativos.move_to_end(chave)
+            while len(negativos) > MAX_NEGATIVOS:
+                negativos.popitem(last=False)
+
+    def _atualizar(self, db_path: str) -> Dict:
+        estado = self._estados.get(db_path)
+        agora = time.monotonic()
+        if estado is not None and estado['valido'] and agora < estado['proxima_verificacao']:
+            return estado
+
+        with self._lock:
+            estado = self._estados.get(db_path)
+            if estado is not None and estado['valido'] and agora < estado['proxima_verificacao']:
+                return estado
+
+            conn = sqlite3.connect(db_path)
+            try:
+                versao, reinicio = conn.execute(
+                    "SELECT versao, versao_reinicio FROM controle_versao WHERE id = 1").fetchone()
+                if estado is None or not estado['valido'] or estado['reinicio'] != reinicio:
+                    estado = self._construir(conn, db_path)
+                elif versao != estado['versao']:
+                    # Números alterados desde a última verificação (inclusive cadastrados em outro processo);
+                    # a versão gravada pelo gatilho é a de antes do incremento da própria transação
+                    for (numero,) in conn.execute("SELECT numero FROM alteracoes_bens WHERE versao >= ?",
+                                                  (estado['versao'],)):
+                        chave = normalizar_numero(numero)
+                        estado['negativos'].pop(chave, None)
+                        estado['filtro'].adicionar(chave)
+                    estado['versao'] = versao
+                    if estado['filtro'].total > estado['filtro'].capacidade:
+                        estado = self._construir(conn, db_path)
+            finally:
+                conn.close()
+
+            estado['proxima_verificacao'] = agora + INTERVALO_VERIFICACAO
+            return estado
+
+    def _construir(self, conn: sqlite3.Connection, db_path: str) -> Dict:
+        # Versão e números lidos na mesma transação
+        conn.execute("BEGIN")
+        try:
+            versao, reinicio = conn.execute("SELECT versao, versao_reinicio FROM controle_versao WHERE id = 1").fetchone()
+            total = conn.execute("SELECT COUNT(*) FROM bens").fetchone()[0]
+            filtro = _FiltroBloom(int(total * FOLGA_CAPACIDADE))
+            for (numero,) in conn.execute("SELECT numero FROM bens"):
+                filtro.adicionar(normalizar_numero(numero))
+        finally:
+            conn.rollback()
+
+        estado = {'filtro': filtro, 'versao': versao, 'reinicio': reinicio, 'valido': True,
+                  'negativos': OrderedDict(), 'removidos': 0, 'proxima_verificacao': 0.0}
+        self._estados[db_path] = estado
+        self._contadores['reconstrucoes'] += 1
+        logger.info(f"Filtro de números construído: {filtro.total} números ({len(filtro.tabela) // 1024} KiB)")
+        return estado
+
+
+# Instância única por processo
+filtro_numeros = FiltroNumeros()
@@ -0,0 +1,266 @@
+import json
+import os
+import sqlite3
+import sys
+import threading
+import time
+from typing import Dict, List, Optional
+from utils.logger import logger
+from utils.db_handler import get_db_connection, garantir_estrutura, _ESTRUTURA_VERIFICADA
+
+# Tarefas agendadas: intervalo mínimo (segundos) entre execuções de cada uma.
+# Só operações que não bloqueiam as leituras/gravações das campanhas (em WAL o quick_check
+# é uma transação de leitura: os escritores seguem gravando)
+TAREFAS = {
+    'checkpoint': 30 * 60,
+    'optimize': 6 * 3600,
+    'incremental_vacuum': 24 * 3600,
+    'quick_check': 24 * 3600,
+}
+
+# Tarefas apenas sob demanda (linha de comando): reescrevem o arquivo inteiro
+TAREFAS_AVULSAS = ('converter_incremental',)
+
+# Páginas liberadas por execução do incremental_vacuum (limita o tempo com o banco travado)
+PAGINAS_POR_VACUUM = 2000
+
+# Banco considerado ocioso após esse tempo sem escritas
+SEGUNDOS_OCIOSO = 120
+
+# Espera máxima do checkpoint TRUNCATE por leitores/escritores antes de desistir (ms)
+ESPERA_TRUNCATE_MS = 2000
+
+# Linhas mantidas no histórico de manutenção
+MAX_HISTORICO = 500
+
+def _ocioso(conn: sqlite3.Connection, segundos: int = SEGUNDOS_OCIOSO) -> bool:
+    resultado = conn.execute("""
+        SELECT strftime('%s', 'now') - strftime('%s', atualizado_em) >= ?
+        FROM controle_versao WHERE id = 1
+    """, (segundos,)).fetchone()
+    return bool(resultado[0]) if resultado and resultado[0] is not None else True
+
+def _checkpoint(conn: sqlite3.Connection) -> Dict:
+    """
+    Ocioso: TRUNCATE, que copia todo o WAL e zera o arquivo (PASSIVE nunca o encolhe),
+    com espera curta. Em uso, ou se o TRUNCATE não conseguir, PASSIVE: copia o que
+    puder sem esperar leitores nem bloquear escritores.
+    """
+    modo, ocupado = 'PASSIVE', True
+    if _ocioso(conn):
+        espera = conn.execute("PRAGMA busy_timeout").fetchone()[0]
+        conn.execute(f"PRAGMA busy_timeout = {ESPERA_TRUNCATE_MS}")
+        try:
+            ocupado, paginas_wal, copiadas = conn.execute("PRAGMA wal_checkpoint(TRUNCATE)").fetchone()
+            modo = 'TRUNCATE'
+        except sqlite3.OperationalError:
+            pass  # banco travado além da espera: fica o PASSIVE
+        finally:
+            conn.execute(f"PRAGMA busy_timeout = {espera}")
+    if ocupado:
+        modo = 'PASSIVE'
+        ocupado, paginas_wal, copiadas = conn.execute("PRAGMA wal_checkpoint(PASSIVE)").fetchone()
+    return {'modo': modo, 'bloqueado': bool(ocupado), 'paginas_wal': paginas_wal, 'paginas_copiadas': copiadas}
+
+def _optimize(conn: sqlite3.Connection) -> Dict:
+    # Sem estatísticas ainda (banco novo): um ANALYZE completo; depois, optimize só refaz as defasadas
+    analisado = not conn.execute("SELECT 1 FROM sqlite_master WHERE name = 'sqlite_stat1'").fetchone()
+    conn.execute("ANALYZE" if analisado else "PRAGMA optimize")
+    return {'analyze_completo': analisado,
+            'estatisticas': conn.execute("SELECT COUNT(*) FROM sqlite_stat1").fetchone()[0]}
+
+def _incremental_vacuum(conn: sqlite3.Connection) -> Dict:
+    livres_antes = conn.execute("PRAGMA freelist_count").fetchone()[0]
+    if conn.execute("PRAGMA auto_vacuum").fetchone()[0] != 2:
+        # Bancos antigos precisam da conversão única (VACUUM completo): ver converter_incremental
+        return {'paginas_livres_antes': livres_antes, 'paginas_livres_depois': livres_antes,
+                'ignorado': "auto_vacuum não é incremental (execute: python -m utils.manutencao converter_incremental)"}
+    # executescript avança o PRAGMA até o fim (execute libera só uma página por chamada)
+    conn.executescript(f"PRAGMA incremental_vacuum({PAGINAS_POR_VACUUM});")
+    return {
+        'paginas_livres_antes': livres_antes,
+        'paginas_livres_depois': conn.execute("PRAGMA freelist_count").fetchone()[0]
+    }
+
+def _converter_incremental(conn: sqlite3.Connection) -> Dict:
+    """
+    Conversão única para auto_vacuum incremental. O VACUUM completo reescreve o arquivo com
+    o banco travado para escrita: executar fora do horário de leituras.
+    """
+    if conn.execute("PRAGMA auto_vacuum").fetchone()[0] == 2:
+        return {'convertido': False, 'motivo': 'já é incremental'}
+    conn.execute("PRAGMA auto_vacuum = INCREMENTAL")
+    conn.execute("VACUUM")
+    return {'convertido': True, 'paginas_livres_depois': conn.execute("PRAGMA freelist_count").fetchone()[0]}
+
+def _quick_check(conn: sqlite3.Connection) -> Dict:
+    problemas = [linha[0] for linha in conn.execute("PRAGMA quick_check(20)").fetchall()]
+    if problemas != ['ok']:
+        raise sqlite3.DatabaseError("; ".join(problemas))
+    return {'resultado': 'ok'}
+
+_EXECUTORES = {
+    'checkpoint': _checkpoint,
+    'optimize': _optimize,
+    'incremental_vacuum': _incremental_vacuum,
+    'quick_check': _quick_check,
+    'converter_incremental': _converter_incremental,
+}
+
+def executar_manutencao(db_path: str, tarefas: Optional[List[str]] = None) -> List[Dict]:
+    """
+    Executa as tarefas de manutenção indicadas (ou todas as agendadas) e grava o resultado no histórico.
+    Usa uma conexão própria em autocommit: VACUUM e checkpoint não rodam dentro de transação.
+    """
+    resultados = []
+    if not os.path.exists(db_path):
+        return resultados
+
+    conn = sqlite3.connect(db_path, isolation_level=None, timeout=30)
+    try:
+        if db_path not in _ESTRUTURA_VERIFICADA:
+            garantir_estrutura(conn, db_path)
+
+        for tarefa in tarefas or list(TAREFAS):
+            if tarefa not in _EXECUTORES:
+                raise ValueError(f"Tarefa inválida: {tarefa}. Use: {', '.join(_EXECUTORES)}")
+
+            inicio = time.perf_counter()
+            try:
+                detalhes, sucesso = _EXECUTORES[tarefa](conn), True
+            except sqlite3.Error as e:
+                detalhes, sucesso = {'erro': str(e)}, False
+            duracao_ms = int((time.perf_counter() - inicio) * 1000)
+
+            resultado = {'tarefa': tarefa, 'sucesso': sucesso, 'duracao_ms': duracao_ms, 'detalhes': detalhes}
+            resultados.append(resultado)
+            (logger.info if sucesso else logger.error)(f"Manutenção '{tarefa}' em {duracao_ms} ms: {detalhes}")
+
+            conn.execute("""
+                INSERT INTO manutencao (tarefa, data_execucao, duracao_ms, sucesso, resultado)
+                VALUES (?, datetime('now'), ?, ?, ?)
+            """, (tarefa, duracao_ms, 1 if sucesso else 0, json.dumps(detalhes, ensure_ascii=False)))
+
+        conn.execute("DELETE FROM manutencao WHERE id <= (SELECT MAX(id) FROM manutencao) - ?", (MAX_HISTORICO,))
+    finally:
+        conn.close()
+
+    return resultados
+
+def tarefas_pendentes(db_path: str) -> List[str]:
+    """Tarefas cujo intervalo já passou desde a última execução bem-sucedida"""
+    try:
+        with get_db_connection(db_path) as conn:
+            cursor = conn.cursor()
+            cursor.execute("""
+                SELECT tarefa, CAST(strftime('%s', 'now') - strftime('%s', MAX(data_execucao)) AS INTEGER) AS idade
+                FROM manutencao WHERE sucesso = 1
+                GROUP BY tarefa
+            """)
+            idades = {row['tarefa']: row['idade'] for row in cursor.fetchall()}
+        return [tarefa for tarefa, intervalo in TAREFAS.items()
+                if idades.get(tarefa) is None or idades[tarefa] >= intervalo]
+
+    except Exception as e:
+        logger.error(f"Erro ao verificar tarefas de manutenção: {str(e)}")
+        return []
+
+def banco_ocioso(db_path: str, segundos: int = SEGUNDOS_OCIOSO) -> bool:
+    """Verdadeiro se não houve escrita nos últimos `segundos`"""
+    try:
+        with get_db_connection(db_path) as conn:
+            return _ocioso(conn, segundos)
+
+    except Exception as e:
+        logger.error(f"Erro ao verificar ociosidade do banco: {str(e)}")
+        return False
+
+def obter_status_manutencao(db_path: str, limite: int = 50) -> Dict:
+    """Situação do arquivo do banco e últimas execuções de manutenção (para administradores)"""
+    try:
+        with get_db_connection(db_path) as conn:
+            cursor = conn.cursor()
+            paginas = cursor.execute("PRAGMA page_count").fetchone()[0]
+            tamanho_pagina = cursor.execute("PRAGMA page_size").fetchone()[0]
+            banco = {
+                'tamanho_bytes': paginas * tamanho_pagina,
+                'paginas_livres': cursor.execute("PRAGMA freelist_count").fetchone()[0],
+                'journal_mode': cursor.execute("PRAGMA journal_mode").fetchone()[0],
+                'auto_vacuum': {0: 'none', 1: 'full', 2: 'incremental'}.get(
+                    cursor.execute("PRAGMA auto_vacuum").fetchone()[0]),
+                'tamanho_wal_bytes': os.path.getsize(db_path + '-wal') if os.path.exists(db_path + '-wal') else 0
+            }
+            cursor.execute("""
+                SELECT tarefa, data_execucao, duracao_ms, sucesso, resultado
+                FROM manutencao ORDER BY id DESC LIMIT ?
+            """, (limite,))
+            historico = [dict(row, sucesso=bool(row['sucesso']), resultado=json.loads(row['resultado'] or '{}'))
+                         for row in cursor.fetchall()]
+        return {'banco': banco, 'pendentes': tarefas_pendentes(db_path), 'historico': historico}
+
+    except Exception as e:
+        logger.error(f"Erro ao obter status de manutenção: {str(e)}")
+        return {'banco': {}, 'pendentes': [], 'historico': []}
+
+
+class AgendadorManutencao:
+    """
+    Executa as tarefas vencidas em uma thread de fundo, apenas quando o banco está ocioso.
+    O histórico no próprio banco evita repetir tarefas entre processos (workers).
+    """
+
+    def __init__(self, db_path: str, intervalo_verificacao: int = 300):
+        self.db_path = db_path
+        self.intervalo_verificacao = intervalo_verificacao
+        self._parar = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def iniciar(self):
+        if self._thread is None or not self._thread.is_alive():
+            self._thread = threading.Thread(target=self._executar, name='agendador-manutencao', daemon=True)
+            self._thread.start()
+
+    def parar(self):
+        self._parar.set()
+
+    def _executar(self):
+        while not self._parar.wait(self.intervalo_verificacao):
+            try:
+                if not os.path.exists(self.db_path) or not banco_ocioso(self.db_path):
+                    continue
+                pendentes = tarefas_pendentes(self.db_path)
+                if pendentes:
+                    executar_manutencao(self.db_path, pendentes)
+            except Exception as e:
+                logger.error(f"Erro no agendador de manutenção: {str(e)}")
+
+
+def main(argumentos: List[str]) -> int:
+    """Linha de comando (python -m utils.manutencao): executa tarefas ou mostra o status"""
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Manutenção do banco de controle patrimonial")
+    parser.add_argument('--banco', default="relatorios/controle_patrimonial.db")
+    parser.add_argument('--status', action='store_true', help="mostra o estado do banco e o histórico")
+    parser.add_argument('tarefas', nargs='*',
+                        help=f"tarefas a executar: {', '.join(list(TAREFAS) + list(TAREFAS_AVULSAS))} "
+                             f"(padrão: as agendadas; converter_incremental trava o banco durante o VACUUM)")
+    args = parser.parse_args(argumentos)
+
+    if args.status:
+        print(json.dumps(obter_status_manutencao(args.banco, limite=10), ensure_ascii=False, indent=2))
+        return 0
+
+    try:
+        resultados = executar_manutencao(args.banco, args.tarefas or None)
+    except ValueError as e:
+        print(f"❌ {str(e)}")
+        return 2
+    for resultado in resultados:
+        print(f"{'✅' if resultado['sucesso'] else '❌'} {resultado['tarefa']:<20} "
+              f"{resultado['duracao_ms']:>6} ms  {resultado['detalhes']}")
+    return 0 if resultados and all(r['sucesso'] for r in resultados) else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
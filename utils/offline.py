@@ -0,0 +1,142 @@
+import re
+from datetime import datetime, timedelta, timezone
+from typing import Dict, List, Optional
+from utils.logger import logger
+from utils.eventos import difusor
+from utils.escritor import escritor
+from utils.db_handler import (get_db_connection, registrar_estado_campanha, registrar_leitura, obter_versao_escrita,
+                              JUNCAO_CAMPANHA, COLUNA_SITUACAO, COLUNA_LOCALIZACAO)
+
+# Leituras aceitas por envio do cliente offline
+MAX_LEITURAS_POR_LOTE = 1000
+
+# Colunas de cada bem no snapshot compacto (listas, não objetos, para reduzir o tamanho)
+COLUNAS_SNAPSHOT = ['id', 'numero', 'nome', 'localizacao', 'localizado']
+
+_SELECT_BENS = f"""
+    SELECT b.id, b.numero, b.nome, {COLUNA_LOCALIZACAO} AS localizacao,
+           CASE WHEN {COLUNA_SITUACAO} = 'OK' THEN 1 ELSE 0 END AS localizado
+    FROM {JUNCAO_CAMPANHA}
+"""
+
+def _versoes(cursor) -> Dict:
+    cursor.execute("SELECT versao, versao_reinicio FROM controle_versao WHERE id = 1")
+    versao, reinicio = cursor.fetchone()
+    return {'versao': versao, 'reinicio': reinicio}
+
+def obter_snapshot(db_path: str) -> Dict:
+    """Todos os bens da campanha ativa em formato compacto, com a versão correspondente"""
+    with get_db_connection(db_path) as conn:
+        cursor = conn.cursor()
+        # Versão e dados lidos na mesma transação (WAL: leitura consistente)
+        cursor.execute("BEGIN")
+        try:
+            versoes = _versoes(cursor)
+            cursor.execute(_SELECT_BENS)
+            bens = [list(row) for row in cursor.fetchall()]
+        finally:
+            conn.rollback()
+    return {'versao': versoes['versao'], 'colunas': COLUNAS_SNAPSHOT, 'bens': bens}
+
+def obter_alteracoes(db_path: str, desde: int) -> Dict:
+    """
+    Bens alterados/removidos desde a versão informada pelo cliente.
+    Se houve alteração em massa depois dela, responde completo=True (baixar o snapshot).
+    """
+    with get_db_connection(db_path) as conn:
+        cursor = conn.cursor()
+        cursor.execute("BEGIN")
+        try:
+            versoes = _versoes(cursor)
+            if desde < versoes['reinicio'] or desde > versoes['versao']:
+                return {'versao': versoes['versao'], 'completo': True}
+
+            # >= desde: a versão gravada pelo gatilho é a de antes do incremento da própria transação
+            cursor.execute(f"""
+                SELECT a.numero, b.id, b.nome, {COLUNA_LOCALIZACAO} AS localizacao,
+                       CASE WHEN {COLUNA_SITUACAO} = 'OK' THEN 1 ELSE 0 END AS localizado
+                FROM alteracoes_bens a
+                LEFT JOIN bens b ON b.numero = a.numero
+                LEFT JOIN estado_campanha e
+                       ON e.campanha_id = (SELECT id FROM campanhas WHERE ativa = 1) AND e.numero = a.numero
+                WHERE a.versao >= ?
+            """, (desde,))
+            alterados, removidos = [], []
+            for row in cursor.fetchall():
+                if row['id'] is None:
+                    removidos.append(row['numero'])
+                else:
+                    alterados.append([row['id'], row['numero'], row['nome'], row['localizacao'], row['localizado']])
+        finally:
+            conn.rollback()
+
+    return {'versao': versoes['versao'], 'completo': False, 'colunas': COLUNAS_SNAPSHOT,
+            'alterados': alterados, 'removidos': removidos}
+
+def _data_leitura(valor: Optional[str]) -> Optional[str]:
+    """Horário informado pelo cliente (ISO) em UTC; inválido ou no futuro vira None ('agora')"""
+    if not valor:
+        return None
+    try:
+        data = datetime.fromisoformat(str(valor).replace('Z', '+00:00'))
+    except ValueError:
+        return None
+    if data.tzinfo is not None:
+        data = data.astimezone(timezone.utc).replace(tzinfo=None)
+    if data > datetime.now(timezone.utc).replace(tzinfo=None) + timedelta(minutes=5):
+        return None
+    return data.strftime('%Y-%m-%d %H:%M:%S')
+
+@escritor.operacao('aplicar_leituras_offline')
+def _gravar_leituras(cursor, leituras: List[Dict]) -> Dict:
+    aplicadas, ignoradas, rejeitadas = [], [], []
+    for leitura in leituras:
+        origem_id = str(leitura.get('id') or '').strip()[:64]
+        numero = str(leitura.get('numero') or '').strip()
+        localizacao = str(leitura.get('localizacao') or '').strip() or None
+        if not origem_id or not re.fullmatch(r'[A-Za-z0-9-]+', numero):
+            rejeitadas.append({'id': origem_id, 'motivo': 'Leitura inválida'})
+            continue
+
+        cursor.execute("SELECT 1 FROM leituras WHERE origem_id = ?", (origem_id,))
+        if cursor.fetchone():
+            ignoradas.append(origem_id)
+            continue
+
+        cursor.execute(f"""
+            SELECT {COLUNA_SITUACAO} AS situacao, {COLUNA_LOCALIZACAO} AS localizacao
+            FROM {JUNCAO_CAMPANHA}
+            WHERE b.numero = ?
+        """, (numero,))
+        anterior = cursor.fetchone()
+        if anterior is None:
+            rejeitadas.append({'id': origem_id, 'motivo': f"Bem {numero} não encontrado"})
+            continue
+
+        registrar_estado_campanha(cursor, numero, 'OK', localizacao, localizado_agora=True)
+        registrar_leitura(cursor, numero, localizacao or anterior['localizacao'], anterior['situacao'],
+                          data_leitura=_data_leitura(leitura.get('lida_em')), origem_id=origem_id)
+        aplicadas.append({'id': origem_id, 'numero': numero, 'localizacao': localizacao})
+
+    return {'aplicadas': aplicadas, 'ignoradas': ignoradas, 'rejeitadas': rejeitadas}
+
+def aplicar_leituras(db_path: str, leituras: List[Dict]) -> Dict:
+    """
+    Aplica em uma transação (do escritor) as leituras enfileiradas offline.
+    Cada leitura tem um id gerado no cliente: reenvios são ignorados sem duplicar o histórico.
+    Retorna os ids aplicados, ignorados (já recebidos) e rejeitados (com o motivo).
+    """
+    if len(leituras) > MAX_LEITURAS_POR_LOTE:
+        raise ValueError(f"Envie no máximo {MAX_LEITURAS_POR_LOTE} leituras por lote")
+
+    resultado = escritor.executar(db_path, 'aplicar_leituras_offline', leituras)
+    aplicadas, ignoradas, rejeitadas = resultado['aplicadas'], resultado['ignoradas'], resultado['rejeitadas']
+
+    for leitura in aplicadas:
+        difusor.publicar(db_path, 'leitura', {'numero': leitura['numero'], 'localizacao': leitura['localizacao']})
+    if aplicadas or rejeitadas:
+        logger.info(f"Leituras offline: {len(aplicadas)} aplicadas, {len(ignoradas)} repetidas, "
+                    f"{len(rejeitadas)} rejeitadas")
+
+    return {'aplicadas': [leitura['id'] for leitura in aplicadas], 'ignoradas': ignoradas,
+            'rejeitadas': rejeitadas, 'versao': obter_versao_escrita(db_path)[0]}
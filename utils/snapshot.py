@@ -0,0 +1,124 @@
+import csv
+import glob
+import gzip
+import os
+import tempfile
+from typing import List, Tuple
+from utils.logger import logger
+from utils.db_handler import get_db_connection, JUNCAO_CAMPANHA, COLUNA_SITUACAO, COLUNA_LOCALIZACAO, COLUNA_LOCAL_ID
+
+try:
+    import pyarrow as pa  # Opcional: pip install pyarrow (formato Parquet)
+    import pyarrow.parquet as pq
+except ImportError:
+    pa = pq = None
+
+# Linhas lidas do SQLite e gravadas por vez (um row group no Parquet)
+LINHAS_POR_GRUPO = 50000
+NIVEL_GZIP = 6
+
+# Tabelas do snapshot: colunas (nome, tipo) e consulta na mesma ordem
+TABELAS_SNAPSHOT = {
+    'bens': (
+        [('id', 'int'), ('numero', 'str'), ('nome', 'str'), ('situacao', 'str'), ('localizacao', 'str'),
+         ('local_id', 'int'), ('data_criacao', 'str'), ('data_localizacao', 'str')],
+        f"""
+        SELECT b.id, b.numero, b.nome, {COLUNA_SITUACAO}, {COLUNA_LOCALIZACAO}, {COLUNA_LOCAL_ID},
+               b.data_criacao, e.data_localizacao
+        FROM {JUNCAO_CAMPANHA}
+        ORDER BY b.id
+        """
+    ),
+    'leituras': (
+        [('id', 'int'), ('numero', 'str'), ('localizacao', 'str'), ('local_id', 'int'),
+         ('situacao_anterior', 'str'), ('campanha_id', 'int'), ('data_leitura', 'str')],
+        """
+        SELECT id, numero, localizacao, local_id, situacao_anterior, campanha_id, data_leitura
+        FROM leituras
+        ORDER BY id
+        """
+    ),
+}
+
+def formatos_disponiveis() -> List[str]:
+    """'csv.gz' sempre; 'parquet' se o pyarrow estiver instalado"""
+    return ['parquet', 'csv.gz'] if pq is not None else ['csv.gz']
+
+def _gravar_csv_gz(caminho: str, colunas: List[str], cursor) -> int:
+    total = 0
+    with gzip.open(caminho, 'wt', encoding='utf-8', newline='', compresslevel=NIVEL_GZIP) as arquivo:
+        escritor = csv.writer(arquivo)
+        escritor.writerow(colunas)
+        while True:
+            linhas = cursor.fetchmany(LINHAS_POR_GRUPO)
+            if not linhas:
+                break
+            escritor.writerows(linhas)
+            total += len(linhas)
+    return total
+
+def _gravar_parquet(caminho: str, colunas: List[Tuple[str, str]], cursor) -> int:
+    tipos = {'int': pa.int64(), 'str': pa.string()}
+    esquema = pa.schema([(nome, tipos[tipo]) for nome, tipo in colunas])
+    total = 0
+    with pq.ParquetWriter(caminho, esquema, compression='zstd') as escritor:
+        while True:
+            linhas = cursor.fetchmany(LINHAS_POR_GRUPO)
+            if not linhas:
+                break
+            # Linhas -> colunas: cada grupo lido vira um row group
+            valores = list(zip(*linhas))
+            escritor.write_table(pa.table([pa.array(valores[i], type=esquema.field(i).type) for i in range(len(colunas))],
+                                          schema=esquema))
+            total += len(linhas)
+    return total
+
+def gerar_snapshot(db_path: str, tabela: str, formato: str, pasta: str) -> Tuple[str, int]:
+    """
+    Arquivo com a tabela inteira na versão atual do banco (gerado uma vez por versão e
+    reaproveitado pelos downloads seguintes). Retorna (caminho, versão).
+    """
+    if tabela not in TABELAS_SNAPSHOT:
+        raise ValueError(f"Tabela inválida. Use: {', '.join(TABELAS_SNAPSHOT)}")
+    if formato not in formatos_disponiveis():
+        raise ValueError(f"Formato indisponível. Use: {', '.join(formatos_disponiveis())}")
+
+    colunas, consulta = TABELAS_SNAPSHOT[tabela]
+    os.makedirs(pasta, exist_ok=True)
+    with get_db_connection(db_path) as conn:
+        cursor = conn.cursor()
+        # Versão e dados lidos na mesma transação (WAL: leitura consistente, sem bloquear escritas)
+        cursor.execute("BEGIN")
+        try:
+            cursor.execute("SELECT versao FROM controle_versao WHERE id = 1")
+            versao = cursor.fetchone()[0]
+            caminho = os.path.join(pasta, f"{tabela}-v{versao}.{formato}")
+            if os.path.exists(caminho):
+                return caminho, versao
+
+            # Arquivo temporário na mesma pasta: outro processo nunca vê um snapshot pela metade
+            descritor, temporario = tempfile.mkstemp(prefix=f".{tabela}-", suffix=f".{formato}", dir=pasta)
+            os.close(descritor)
+            try:
+                cursor.execute(consulta)
+                if formato == 'parquet':
+                    total = _gravar_parquet(temporario, colunas, cursor)
+                else:
+                    total = _gravar_csv_gz(temporario, [nome for nome, _ in colunas], cursor)
+                os.replace(temporario, caminho)
+            except Exception:
+                os.remove(temporario)
+                raise
+        finally:
+            conn.rollback()
+
+    # Versões anteriores não são mais servidas
+    for antigo in glob.glob(os.path.join(pasta, f"{tabela}-v*.{formato}")):
+        if antigo != caminho:
+            try:
+                os.remove(antigo)
+            except OSError:
+                pass
+
+    logger.info(f"Snapshot gerado: {os.path.basename(caminho)} ({total} linhas, {os.path.getsize(caminho)} bytes)")
+    return caminho, versao
@@ -0,0 +1,74 @@
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Optional, Tuple
+from utils.logger import logger
+
+# Janela (segundos) em que a mesma leitura repetida é respondida da memória; 0 desativa
+JANELA_PADRAO = float(os.environ.get('LEITURA_JANELA_REPETICAO', '2.0'))
+MAX_ENTRADAS = 1000
+
+
+class SupressorLeituras:
+    """
+    Leitores de código de barras costumam disparar a mesma etiqueta 2 ou 3 vezes em um
+    segundo. A primeira leitura de (número, localização) é gravada normalmente; as repetições
+    dentro da janela recebem o mesmo resultado, sem nova gravação nem consultas ao banco.
+    Só a última leitura de cada número fica guardada: lido em A, depois em B e de novo em A,
+    o terceiro disparo é gravado (o bem volta para A). Edição ou exclusão do bem neste
+    processo descarta o resultado guardado.
+    """
+
+    def __init__(self, janela: float = JANELA_PADRAO, max_entradas: int = MAX_ENTRADAS):
+        self.janela = janela
+        self.max_entradas = max_entradas
+        self._lock = threading.Lock()
+        self._resultados: 'OrderedDict[str, Tuple[float, str, Any]]' = OrderedDict()
+        self._contadores = {'leituras': 0, 'suprimidas': 0}
+
+    def obter(self, numero: str, localizacao: Optional[str]) -> Optional[Any]:
+        """Resultado da mesma leitura feita há menos de 'janela' segundos, ou None"""
+        self._contadores['leituras'] += 1
+        if self.janela <= 0:
+            return None
+        with self._lock:
+            guardado = self._resultados.get(numero)
+            if guardado is None:
+                return None
+            if guardado[0] <= time.monotonic():
+                del self._resultados[numero]
+                return None
+            if guardado[1] != (localizacao or ''):
+                return None
+        self._contadores['suprimidas'] += 1
+        logger.info(f"Leitura repetida de {numero} suprimida (janela de {self.janela:g}s)")
+        return guardado[2]
+
+    def guardar(self, numero: str, localizacao: Optional[str], resultado: Any):
+        """Guarda o resultado de uma leitura gravada (substitui o de outra localização do mesmo número)"""
+        if self.janela <= 0:
+            return
+        with self._lock:
+            self._resultados[numero] = (time.monotonic() + self.janela, localizacao or '', resultado)
+            self._resultados.move_to_end(numero)
+            while len(self._resultados) > self.max_entradas:
+                self._resultados.popitem(last=False)
+
+    def descartar(self, numero: Optional[str] = None):
+        """O bem mudou (edição, exclusão) ou o cadastro inteiro (numero=None): a próxima leitura vai ao banco"""
+        with self._lock:
+            if numero is None:
+                self._resultados.clear()
+                return
+            self._resultados.pop(numero, None)
+
+    def estatisticas(self) -> Dict:
+        contadores = dict(self._contadores)
+        contadores['janela_s'] = self.janela
+        contadores['taxa_supressao'] = round(contadores['suprimidas'] / (contadores['leituras'] or 1), 4)
+        return contadores
+
+
+# Instância única por processo
+supressor_leituras = SupressorLeituras()